@@ -4,9 +4,12 @@ from config.config import Config, ProductionConfig
 from extensions import db
 from flask_jwt_extended import JWTManager
 import logging
+import time
+import json
+import click
 from datetime import datetime
 from flask_cors import CORS
-from sqlalchemy import text
+from sqlalchemy import text, inspect
 from pathlib import Path
 
 def configure_logging():
@@ -38,12 +41,27 @@ def get_allowed_origins():
 
 def create_app(config_class=ProductionConfig):
     """Factory de aplicação Flask com configuração robusta"""
+    phases_ms = {}
+    phase_started = time.perf_counter()
+
+    def mark_phase(name):
+        nonlocal phase_started
+        now = time.perf_counter()
+        phases_ms[name] = round((now - phase_started) * 1000, 1)
+        phase_started = now
+
     app = Flask(__name__)
     app.config.from_object(config_class)
+
+    # Uploads validados durante o streaming do corpo (assinatura, dimensões, pixels)
+    from schemas.fileSchema import ImageUploadRequest
+    app.request_class = ImageUploadRequest
+    app.config['STARTUP_PHASES_MS'] = phases_ms
     
     # Configuração inicial
     config_class.init_app(app)
     logger = configure_logging()
+    mark_phase('config')
     
     try:
         # ✅ CORS seguro com origens validadas
@@ -63,11 +81,15 @@ def create_app(config_class=ProductionConfig):
         
         # Configuração do JWT
         configure_jwt_handlers(jwt, logger)
+        mark_phase('extensions')
         
         with app.app_context():
             # Registro de blueprints e banco de dados
             register_blueprints(app, logger)
+            register_cli_commands(app, logger)
+            mark_phase('blueprints')
             initialize_database(app, db, logger)
+            mark_phase('database')
             
             # Cria diretório para uploads se não existir
             upload_dir = Path(Config.UPLOAD_FOLDER) / 'public'
@@ -76,6 +98,11 @@ def create_app(config_class=ProductionConfig):
 
         # Endpoints utilitários
         register_utility_endpoints(app, db, logger)
+
+        # Workers em segundo plano (iniciados por processo, após o fork)
+        register_background_workers(app, logger)
+        mark_phase('endpoints')
+        logger.info(f"Aplicação criada - tempos por fase (ms): {phases_ms}")
         
     except Exception as e:
         logger.critical(f"Falha na inicialização da aplicação: {str(e)}", exc_info=True)
@@ -115,32 +142,88 @@ def configure_jwt_handlers(jwt, logger):
 
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        return False
+        # Consulta em memória (sem ida ao banco); ver tokenBlocklistService
+        from services.tokenBlocklistService import is_token_revoked
+        return is_token_revoked(jwt_payload)
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        logger.warning(f"Token revogado tentou acessar: {jwt_payload.get('sub', 'N/A')}")
+        return jsonify({
+            "status": "error",
+            "message": "Token revogado",
+            "code": 401
+        }), 401
+
+    @jwt.user_lookup_loader
+    def user_lookup_callback(jwt_header, jwt_payload):
+        # Cache com TTL curto: o caminho autenticado não consulta o banco a cada requisição
+        from repositories.userRepository import get_user_by_id
+        return get_user_by_id(jwt_payload['sub'])
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error_callback(jwt_header, jwt_payload):
+        logger.warning(f"Token de usuário inexistente: {jwt_payload.get('sub', 'N/A')}")
+        return jsonify({
+            "status": "error",
+            "message": "Usuário não encontrado",
+            "code": 401
+        }), 401
 
 def register_blueprints(app, logger):
     """Registra todos os blueprints da aplicação"""
     try:
         from controllers.userController import user_bp
         from controllers.neuralNetworkController import neural_bp
+        from controllers.adminController import admin_bp
 
         app.register_blueprint(user_bp, url_prefix='/api/users')
         app.register_blueprint(neural_bp, url_prefix='/api/neural')
+        app.register_blueprint(admin_bp, url_prefix='/api/admin')
         
         logger.info("Blueprints registrados com sucesso")
     except Exception as e:
         logger.error(f"Erro ao registrar blueprints: {str(e)}", exc_info=True)
         raise
 
+def register_cli_commands(app, logger):
+    """Comandos de manutenção (flask --app app <comando>)"""
+
+    @app.cli.command('backfill-detections')
+    @click.option('--batch-size', default=500, show_default=True, help="Resultados por transação")
+    def backfill_detections_command(batch_size):
+        """Migra o JSON antigo dos resultados para a tabela Detections"""
+        from repositories.detectionRepository import backfill_detections
+        stats = backfill_detections(batch_size)
+        logger.info(f"Backfill de detecções concluído: {stats}")
+        click.echo(json.dumps(stats))
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """Recalcula do zero as tabelas de resumo por usuário/dia/classe"""
+        from repositories.statsRepository import rebuild_stats
+        stats = rebuild_stats()
+        logger.info(f"Resumos de estatísticas reconstruídos: {stats}")
+        click.echo(json.dumps(stats))
+
 def initialize_database(app, db, logger):
     """Inicializa e verifica o banco de dados"""
     try:
         from models.userModel import User
         from models.imageModel import Image
         from models.ObjectRecognitionResultModel import ObjectRecognitionResult
+        from models.detectionCacheModel import DetectionCacheEntry
+        from models.uploadTaskModel import UploadTask
+        from models.analysisJobModel import AnalysisJob
+        from models.modelVersionModel import ModelVersion
+        from models.imageDerivativeModel import ImageDerivative
+        from models.detectionModel import Detection
+        from models.detectionStatsModel import UserDailyStats, UserClassDailyStats
 
         # Cria tabelas se não existirem
         db.create_all()
         logger.info("Tabelas verificadas/criadas")
+        upgrade_schema(db, logger)
         
         # Testa a conexão
         db.session.execute(text("SELECT 1"))
@@ -150,8 +233,74 @@ def initialize_database(app, db, logger):
         logger.critical(f"Erro na inicialização do banco: {str(e)}", exc_info=True)
         raise
 
+# Colunas adicionadas a tabelas existentes (db.create_all não altera tabelas já criadas)
+SCHEMA_UPGRADES = [
+    ('ObjectRecognitionResults', 'ModelVersion', 'VARCHAR(64)'),
+    ('DetectionCache', 'ImageWidth', 'INTEGER'),
+    ('DetectionCache', 'ImageHeight', 'INTEGER'),
+    ('DetectionCache', 'ProcessedWidth', 'INTEGER'),
+    ('DetectionCache', 'ProcessedHeight', 'INTEGER'),
+]
+
+# Índices adicionados a tabelas existentes (nome, tabela, colunas)
+INDEX_UPGRADES = [
+    ('ix_images_user_uploaded', 'Images', ('UserID', 'UploadedAt', 'ImageID')),
+    ('ix_ObjectRecognitionResults_ModelVersion', 'ObjectRecognitionResults', ('ModelVersion',)),
+]
+
+def upgrade_schema(db, logger):
+    """Adiciona colunas e índices novos que ainda não existem no banco"""
+    inspector = inspect(db.engine)
+    for table, column, ddl in SCHEMA_UPGRADES:
+        if not inspector.has_table(table):
+            continue
+        if column in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        db.session.commit()
+        logger.info(f"Coluna {table}.{column} adicionada")
+
+    for name, table, columns in INDEX_UPGRADES:
+        if not inspector.has_table(table):
+            continue
+        if name in {i['name'] for i in inspector.get_indexes(table)}:
+            continue
+        db.session.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+        db.session.commit()
+        logger.info(f"Índice {name} criado em {table}")
+
+def register_background_workers(app, logger):
+    """Garante que os workers em segundo plano rodem no processo que atende requisições"""
+
+    @app.before_request
+    def ensure_background_workers():
+        from services.detectObjectService import start_model_loading
+        from services.uploadQueueService import upload_queue
+        from services.jobService import job_pool
+        from services.modelRegistryService import sync_active_model
+        from services.imageStoreService import image_store
+        from services.renderService import pending_purger
+        start_model_loading()
+        upload_queue.ensure_started(app)
+        image_store.ensure_retention_started(app)
+        pending_purger.ensure_started()
+        job_pool.ensure_started()
+        try:
+            sync_active_model()
+        except Exception as e:
+            logger.error(f"Falha ao sincronizar a versão ativa do modelo: {str(e)}")
+
 def register_utility_endpoints(app, db, logger):
     """Registra endpoints utilitários"""
+    from schemas.fileSchema import UploadRejected
+
+    @app.errorhandler(UploadRejected)
+    def upload_rejected(error):
+        logger.warning(f"Upload recusado durante o streaming: {error.description}")
+        return jsonify({
+            "error": "Erro de validação",
+            "details": {error.field_name: [error.description]}
+        }), 400
     
     @app.route('/health')
     def health_check():
@@ -169,6 +318,19 @@ def register_utility_endpoints(app, db, logger):
         logger.debug("Health check realizado")
         return jsonify(status)
 
+    @app.route('/ready')
+    def readiness_check():
+        """Prontidão do worker: 200 só depois de o modelo estar carregado e aquecido"""
+        from services.detectObjectService import get_model_status, start_model_loading
+        start_model_loading()
+        model = get_model_status()
+        ready = model['state'] == 'ready'
+        return jsonify({
+            "status": "ready" if ready else "starting",
+            "model": model,
+            "startup_phases_ms": app.config.get('STARTUP_PHASES_MS', {})
+        }), 200 if ready else 503
+
     @app.route('/version')
     def version():
         """Endpoint de versão da API"""
@@ -178,15 +340,33 @@ def register_utility_endpoints(app, db, logger):
             "environment": app.config.get("ENVIRONMENT", "production")
         })
 
-    @app.route('/uploads/public/<filename>')
+    @app.route('/uploads/public/<path:filename>')
     def serve_uploaded_file(filename):
-        """Endpoint para servir arquivos uploadados localmente"""
+        """
+        Serve arquivos do armazenamento local com ETag forte, Cache-Control longo
+        e suporte a requisições condicionais e Range (send_file com sendfile/X-Sendfile)
+        """
+        from services.imageStoreService import image_store
         try:
-            return send_from_directory(
-                directory=os.path.join(Config.UPLOAD_FOLDER, 'public'),
+            # O acesso conta para a retenção (menos usados recentemente saem primeiro)
+            if not image_store.touch(filename):
+                # Imagens anotadas do modo render=false são desenhadas no primeiro acesso
+                from services.renderService import render_pending
+                render_pending(filename)
+
+            # Arquivos endereçados por conteúdo usam o próprio hash como ETag
+            etag = image_store.content_etag(filename)
+            response = send_from_directory(
+                directory=image_store.root,
                 path=filename,
-                as_attachment=False
+                as_attachment=False,
+                conditional=True,
+                etag=etag or True,
+                max_age=Config.IMAGE_CACHE_MAX_AGE
             )
+            if etag:
+                response.cache_control.immutable = True
+            return response
         except FileNotFoundError:
             return jsonify({"error": "Arquivo não encontrado"}), 404
 
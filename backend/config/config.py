@@ -27,6 +27,12 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', "super_secret_key_123!@#")
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=30)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7)
+    # Tokens revogados (logout): dict em memória + arquivo SQLite compartilhado pelos workers
+    JWT_BLOCKLIST_DB_PATH = os.environ.get('JWT_BLOCKLIST_DB_PATH', 'jwt_blocklist.sqlite3')
+    JWT_BLOCKLIST_SYNC_SECONDS = float(os.environ.get('JWT_BLOCKLIST_SYNC_SECONDS', 1))
+    # Cache de usuários (get_user_by_id/get_user_by_email) para o caminho autenticado
+    USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
 
     # === Servidor ===
     APP_HOST = os.environ.get('APP_HOST', '0.0.0.0')
@@ -37,22 +43,166 @@ class Config:
     # === Imgur ===
     IMGUR_CLIENT_ID = os.environ.get('IMGUR_CLIENT_ID', 'f74f3693feeb900')
     IMGUR_CLIENT_SECRET = os.environ.get('IMGUR_CLIENT_SECRET', '4f9584bae90e4087a2857da6cb28f0412cc0b403')
+    IMGUR_API_URL = os.environ.get('IMGUR_API_URL', 'https://api.imgur.com')  # Pode apontar para um servidor local de testes
+
+    # === Fila de uploads em segundo plano ===
+    UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 2))
+    UPLOAD_MAX_ATTEMPTS = int(os.environ.get('UPLOAD_MAX_ATTEMPTS', 8))
+    UPLOAD_RETRY_BASE_SECONDS = float(os.environ.get('UPLOAD_RETRY_BASE_SECONDS', 5))
+    UPLOAD_POLL_INTERVAL_SECONDS = float(os.environ.get('UPLOAD_POLL_INTERVAL_SECONDS', 2))
+    UPLOAD_REQUEST_TIMEOUT = float(os.environ.get('UPLOAD_REQUEST_TIMEOUT', 30))
 
     # === YOLO ===
     YOLO_WEIGHTS_DIR = Path(__file__).resolve().parent.parent / 'model_weights'
     YOLO_WEIGHTS_PATH = YOLO_WEIGHTS_DIR / 'best.pt'
     YOLO_WEIGHTS_URL = os.environ.get('YOLO_WEIGHTS_URL', '')  # Opcional: URL para baixar pesos
+    # Backend de inferência: torch (.pt), onnx (best.onnx) ou openvino (best_openvino_model/)
+    YOLO_BACKEND = os.environ.get('YOLO_BACKEND', 'torch').lower()
+    YOLO_EXPORT_IMGSZ = int(os.environ.get('YOLO_EXPORT_IMGSZ', 640))
+    # Inicialização rápida: pesos e modelo são preparados após o fork, não na factory
+    YOLO_LAZY_STARTUP = os.environ.get('YOLO_LAZY_STARTUP', 'True').lower() == 'true'
+    YOLO_WARMUP_RUNS = int(os.environ.get('YOLO_WARMUP_RUNS', 1))
+    # Dataset de treino (mesmo de services/yoloV8.py), usado na calibração INT8 e na validação
+    YOLO_DATASET_YAML = Path(os.environ.get(
+        'YOLO_DATASET_YAML',
+        Path(__file__).resolve().parent.parent / 'dataset' / 'dataset_config.yaml'
+    ))
+    YOLO_TRAINING_RUNS_DIR = Path(os.environ.get(
+        'YOLO_TRAINING_RUNS_DIR',
+        Path(__file__).resolve().parent.parent.parent / 'treino-rede-neural-yolov8'
+    ))
+
+    # === Redimensionamento das entradas ===
+    # Uploads grandes são reduzidos já na decodificação (maior lado em pixels; 0 desabilita)
+    IMAGE_DECODE_MAX_SIDE = int(os.environ.get('IMAGE_DECODE_MAX_SIDE', 1280))
+    # Limites do imgsz por requisição (múltiplos de 32); o padrão é YOLO_EXPORT_IMGSZ
+    INFERENCE_IMGSZ_MIN = int(os.environ.get('INFERENCE_IMGSZ_MIN', 320))
+    INFERENCE_IMGSZ_MAX = int(os.environ.get('INFERENCE_IMGSZ_MAX', 1280))
+
+    # === Cascata: modelo pequeno primeiro, grande (YOLO_WEIGHTS_PATH) só quando necessário ===
+    YOLO_CASCADE_ENABLED = os.environ.get('YOLO_CASCADE_ENABLED', 'False').lower() == 'true'
+    YOLO_CASCADE_SMALL_WEIGHTS = Path(os.environ.get(
+        'YOLO_CASCADE_SMALL_WEIGHTS',
+        Path(__file__).resolve().parent.parent / 'YOLOv8' / 'yolov8n' / 'weights' / 'best.pt'
+    ))
+    # Escalona quando a confiança média fica abaixo do limiar ou há menos objetos que o mínimo
+    YOLO_CASCADE_MIN_CONFIDENCE = float(os.environ.get('YOLO_CASCADE_MIN_CONFIDENCE', 0.5))
+    YOLO_CASCADE_MIN_OBJECTS = int(os.environ.get('YOLO_CASCADE_MIN_OBJECTS', 1))
+
+    # === Registro de versões do modelo / troca a quente ===
+    MODEL_REGISTRY_SEARCH_DIRS = [
+        YOLO_WEIGHTS_DIR,
+        Path(__file__).resolve().parent.parent / 'YOLOv8',
+        YOLO_TRAINING_RUNS_DIR
+    ]
+    MODEL_REGISTRY_POLL_SECONDS = float(os.environ.get('MODEL_REGISTRY_POLL_SECONDS', 10))
+    MODEL_SWAP_DRAIN_TIMEOUT_SECONDS = float(os.environ.get('MODEL_SWAP_DRAIN_TIMEOUT_SECONDS', 60))
+    ADMIN_USER_IDS = {uid.strip() for uid in os.environ.get('ADMIN_USER_IDS', '').split(',') if uid.strip()}
+
+    # === Inferência em lote (micro-batching) ===
+    # Lotes só se formam com chamadas concorrentes no mesmo processo: threads dos workers
+    # gthread do gunicorn (GUNICORN_THREADS) ou o servidor de modelo atendendo vários workers
+    GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+    INFERENCE_BATCHING_ENABLED = os.environ.get(
+        'INFERENCE_BATCHING_ENABLED',
+        str(GUNICORN_THREADS > 1 or os.environ.get('MODEL_SERVER_ENABLED', 'False').lower() == 'true')
+    ).lower() == 'true'
+    INFERENCE_BATCH_MAX_SIZE = int(os.environ.get('INFERENCE_BATCH_MAX_SIZE', 8))
+    INFERENCE_BATCH_MAX_WAIT_MS = float(os.environ.get('INFERENCE_BATCH_MAX_WAIT_MS', 10))
+
+    # === Réplicas do detector (cada uma com sua fatia de núcleos) ===
+    DETECTOR_REPLICAS = int(os.environ.get('DETECTOR_REPLICAS', 1))
+    DETECTOR_THREADS_PER_REPLICA = int(os.environ.get('DETECTOR_THREADS_PER_REPLICA', 0)) or None  # 0 = núcleos / réplicas
+    DETECTOR_PIN_CORES = os.environ.get('DETECTOR_PIN_CORES', 'True').lower() == 'true'
+
+    # === Servidor de modelo dedicado (compartilhado pelos workers do gunicorn) ===
+    # Cada conexão de cliente arrenda um slot: WEB_CONCURRENCY x conexões por worker <= slots.
+    # Cada slot comporta uma imagem no limite de decodificação (lado máximo² x 3 canais; sem
+    # limite, IMAGE_DECODE_MAX_SIDE=0, um lado de 4096); o segmento inteiro (slots x bytes
+    # por slot) precisa caber no /dev/shm
+    MODEL_SERVER_ENABLED = os.environ.get('MODEL_SERVER_ENABLED', 'False').lower() == 'true'
+    MODEL_SERVER_SOCKET = os.environ.get('MODEL_SERVER_SOCKET', '/tmp/neurovision-model.sock')
+    MODEL_SERVER_SHM_NAME = os.environ.get('MODEL_SERVER_SHM_NAME', 'neurovision-model')
+    MODEL_SERVER_SLOTS = int(os.environ.get('MODEL_SERVER_SLOTS', 8))
+    MODEL_SERVER_SLOT_BYTES = int(os.environ.get('MODEL_SERVER_SLOT_BYTES', (IMAGE_DECODE_MAX_SIDE or 4096) ** 2 * 3))
+    # Espera máxima por um slot livre ao aceitar uma conexão; depois dela o cliente recebe um erro
+    MODEL_SERVER_SLOT_WAIT_SECONDS = float(os.environ.get('MODEL_SERVER_SLOT_WAIT_SECONDS', 30))
+    MODEL_SERVER_CLIENT_CONNECTIONS = int(os.environ.get('MODEL_SERVER_CLIENT_CONNECTIONS', 4))
+
+    # === Cache de resultados ===
+    RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+    RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 1024))
 
     # === Upload ===
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads/images')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    # Validação durante o streaming do corpo: assinatura e dimensões lidas dos primeiros bytes
+    UPLOAD_MAX_PIXELS = int(os.environ.get('UPLOAD_MAX_PIXELS', 40_000_000))
+    UPLOAD_SNIFF_MAX_BYTES = int(os.environ.get('UPLOAD_SNIFF_MAX_BYTES', 256 * 1024))  # Cabeçalhos JPEG com EXIF/ICC longos
+    # Armazenamento local endereçado por conteúdo (uploads/public/<aa>/<bb>/<sha256>.jpg)
+    IMAGE_STORE_MAX_BYTES = int(os.environ.get('IMAGE_STORE_MAX_BYTES', 0))  # 0 = sem limite de retenção
+    IMAGE_STORE_MIN_AGE_SECONDS = float(os.environ.get('IMAGE_STORE_MIN_AGE_SECONDS', 86400))
+    IMAGE_STORE_RETENTION_INTERVAL_SECONDS = float(os.environ.get('IMAGE_STORE_RETENTION_INTERVAL_SECONDS', 3600))
+    IMAGE_CACHE_MAX_AGE = int(os.environ.get('IMAGE_CACHE_MAX_AGE', 365 * 24 * 3600))
+    # X-Sendfile: o proxy reverso (nginx/Apache) envia o arquivo no lugar do Python
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'False').lower() == 'true'
+    # Variantes das imagens processadas (maior lado em pixels), geradas em segundo plano
+    DERIVATIVES_ENABLED = os.environ.get('DERIVATIVES_ENABLED', 'True').lower() == 'true'
+    DERIVATIVE_SIZES = {
+        'thumb': int(os.environ.get('DERIVATIVE_THUMB_SIDE', 256)),
+        'medium': int(os.environ.get('DERIVATIVE_MEDIUM_SIDE', 1024))
+    }
+    DERIVATIVE_FORMATS = [f.strip() for f in os.environ.get('DERIVATIVE_FORMATS', 'jpeg,webp').split(',') if f.strip()]
+    DERIVATIVE_WORKERS = int(os.environ.get('DERIVATIVE_WORKERS', 1))
+    DERIVATIVE_MAX_PENDING = int(os.environ.get('DERIVATIVE_MAX_PENDING', 64))
+    # Originais + detecções aguardando a renderização preguiçosa (modo render=false)
+    RENDER_PENDING_FOLDER = os.environ.get('RENDER_PENDING_FOLDER', os.path.join(UPLOAD_FOLDER, 'pending'))
+    # Pendências nunca acessadas expiram (a URL passa a responder 404)
+    RENDER_PENDING_MAX_AGE_SECONDS = float(os.environ.get('RENDER_PENDING_MAX_AGE_SECONDS', 7 * 86400))
+    RENDER_PENDING_PURGE_INTERVAL_SECONDS = float(os.environ.get('RENDER_PENDING_PURGE_INTERVAL_SECONDS', 3600))
+
+    # === Análise em lote ===
+    BATCH_MAX_IMAGES = int(os.environ.get('BATCH_MAX_IMAGES', 500))
+    BATCH_MAX_CONTENT_LENGTH = int(os.environ.get('BATCH_MAX_CONTENT_LENGTH', 512 * 1024 * 1024))  # 512MB
+
+    # === Histórico de análises (paginação por cursor) ===
+    HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 20))
+    HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 100))
+
+    # === Exportação de resultados (CSV/NDJSON/Parquet em streaming) ===
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+
+    # === Estatísticas para dashboards (tabelas de resumo) ===
+    STATS_DEFAULT_DAYS = int(os.environ.get('STATS_DEFAULT_DAYS', 30))
+    STATS_MAX_DAYS = int(os.environ.get('STATS_MAX_DAYS', 366))
+
+    # === Jobs assíncronos de análise ===
+    # Workers dedicados: python -m services.jobService, iniciado e reiniciado pelo mestre do gunicorn.
+    # Workers embutidos (por processo web) carregam um modelo cada: desabilitados por padrão
+    JOB_DEDICATED_WORKER_PROCESSES = int(os.environ.get('JOB_DEDICATED_WORKER_PROCESSES', 1))
+    JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 0))
+    JOB_WORKER_MAX_RESTARTS = int(os.environ.get('JOB_WORKER_MAX_RESTARTS', 5))
+    JOB_WORKER_RESTART_BACKOFF_MAX_SECONDS = float(os.environ.get('JOB_WORKER_RESTART_BACKOFF_MAX_SECONDS', 300))
+    JOB_INPUT_FOLDER = os.environ.get('JOB_INPUT_FOLDER', os.path.join(UPLOAD_FOLDER, 'jobs'))
+    JOB_POLL_INTERVAL_SECONDS = float(os.environ.get('JOB_POLL_INTERVAL_SECONDS', 1))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 600))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    # Jobs reservados de uma vez: inferidos num lote e gravados numa única transação
+    JOB_CLAIM_BATCH_SIZE = int(os.environ.get('JOB_CLAIM_BATCH_SIZE', 8))
 
     @classmethod
     def init_app(cls, app):
         """Inicialização adicional"""
         os.makedirs(cls.UPLOAD_FOLDER, exist_ok=True)
         cls.YOLO_WEIGHTS_DIR.mkdir(exist_ok=True)
+        if not cls.YOLO_LAZY_STARTUP:
+            cls._ensure_yolo_weights()
+
+    @classmethod
+    def ensure_yolo_weights(cls):
+        """Verifica (ou baixa) os pesos YOLO; chamado pelo carregamento do modelo"""
+        cls.YOLO_WEIGHTS_DIR.mkdir(exist_ok=True)
         cls._ensure_yolo_weights()
 
     @classmethod
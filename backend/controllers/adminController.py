@@ -0,0 +1,94 @@
+from functools import wraps
+from flask import Blueprint, request, jsonify
+from config.config import Config
+from services.modelRegistryService import (
+    list_models, register_weights, discover_models, activate_model
+)
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+def admin_required(fn):
+    """Restringe a rota aos usuários listados em ADMIN_USER_IDS"""
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if str(get_jwt_identity()) not in Config.ADMIN_USER_IDS:
+            return jsonify({"error": "Acesso restrito a administradores"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+@admin_bp.route('/models', methods=['GET'])
+@admin_required
+def get_models():
+    try:
+        return jsonify({"data": list_models()}), 200
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao listar modelos",
+            "message": str(e)
+        }), 500
+
+@admin_bp.route('/models', methods=['POST'])
+@admin_required
+def register_model():
+    try:
+        data = request.get_json()
+        if not data or not data.get('weights_path'):
+            return jsonify({"error": "Informe weights_path"}), 400
+
+        version = register_weights(data['weights_path'], data.get('name'), data.get('backend'))
+        return jsonify({
+            "message": "Modelo registrado",
+            "data": version
+        }), 201
+
+    except ValueError as e:
+        return jsonify({
+            "error": "Erro de validação",
+            "message": str(e)
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao registrar modelo",
+            "message": str(e)
+        }), 500
+
+@admin_bp.route('/models/discover', methods=['POST'])
+@admin_required
+def discover():
+    try:
+        data = request.get_json(silent=True) or {}
+        versions = discover_models(data.get('backend'))
+        return jsonify({
+            "message": f"{len(versions)} modelo(s) registrados",
+            "data": versions
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao descobrir modelos",
+            "message": str(e)
+        }), 500
+
+@admin_bp.route('/models/<int:version_id>/activate', methods=['POST'])
+@admin_required
+def activate(version_id):
+    try:
+        version = activate_model(version_id)
+        if not version:
+            return jsonify({"error": "Versão não encontrada"}), 404
+
+        # A carga e o aquecimento seguem em segundo plano; o progresso aparece em GET /models
+        return jsonify({
+            "message": "Troca de modelo iniciada",
+            "data": version
+        }), 202
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao ativar modelo",
+            "message": str(e)
+        }), 500
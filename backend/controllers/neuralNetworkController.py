@@ -1,17 +1,26 @@
-from flask import Blueprint, request, jsonify
-from schemas.fileSchema import validate_image_upload
-from services.neuralNetworkService import analyze_image
+from flask import Blueprint, Response, request, jsonify, redirect, stream_with_context
+from marshmallow import ValidationError
+from config.config import Config
+import json
+from schemas.fileSchema import validate_image_upload, collect_batch_uploads, per_item_upload_errors, UploadRejected
+from services.neuralNetworkService import analyze_image, analyze_images_batch
+from services.detectObjectService import get_batching_stats, get_replica_stats, get_cascade_stats
+from services.resultCacheService import get_cache_stats
+from services.imageDecodeService import validate_requested_imgsz
+from services.uploadQueueService import get_upload_stats
+from services.imageStoreService import get_image_store_stats
+from services.derivativeService import get_derivative_stats
+from services.tokenBlocklistService import get_blocklist_stats
+from repositories.imageDerivativeRepository import get_result_image
+from repositories.detectionRepository import find_images_with_class
+from services.jobService import submit_job, get_job_status
+from services.historyService import get_history, parse_date
+from services.statsService import get_dashboard_stats
+from services.exportService import export_user_results, parquet_available
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import os
-import uuid
-from werkzeug.utils import secure_filename
-from datetime import datetime
 
 neural_bp = Blueprint('neural', __name__, url_prefix='/api/neural')
 
-UPLOAD_FOLDER = 'uploads/images'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
 @neural_bp.route('/analyze', methods=['POST'])
 @jwt_required()
 @validate_image_upload 
@@ -19,32 +28,298 @@ def analyze():
     try:
         current_user_id = get_jwt_identity()
         file = request.files['image'] 
-        image_uuid = request.form['uuid']  
-        
-        filename = secure_filename(f"{image_uuid}_{file.filename}")
-        temp_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(temp_path)
 
         try:
-            result = analyze_image(temp_path, current_user_id)
-            
-            return jsonify({
-                "message": "Análise concluída",
-                "data": {
-                    "image_id": result['image_id'],
-                    "image_url": result['image_url'],
-                    "objects": result['objects'],
-                    "accuracy": result['accuracy'],
-                    "metrics": result['metrics'],
-                    "objects_count": result['objects_count']
-                }
-            }), 200
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+            imgsz = validate_requested_imgsz(request.form.get('imgsz'))
+        except ValueError as e:
+            return jsonify({"error": "Erro de validação", "message": str(e)}), 400
+
+        # render=false: só as detecções; a imagem anotada é desenhada no primeiro GET da URL
+        render = request.form.get('render', 'true').lower() not in ('false', '0', 'no')
+
+        # A imagem é processada em memória, sem arquivo temporário em disco
+        image_bytes = file.read()
+        result = analyze_image(image_bytes, current_user_id, imgsz=imgsz, render=render)
+        
+        return jsonify({
+            "message": "Análise concluída",
+            "data": {
+                "image_id": result['image_id'],
+                "result_id": result['result_id'],
+                "image_url": result['image_url'],
+                "objects": result['objects'],
+                "detections": result['detections'],
+                "image_size": result['image_size'],
+                "processed_image_size": result['processed_image_size'],
+                "accuracy": result['accuracy'],
+                "metrics": result['metrics'],
+                "objects_count": result['objects_count'],
+                "cached": result['cached'],
+                "tier": result['tier']
+            }
+        }), 200
 
     except Exception as e:
         return jsonify({
             "error": "Erro ao processar imagem",
             "message": str(e)
         }), 500
+
+@neural_bp.route('/batch', methods=['POST'])
+@jwt_required()
+@per_item_upload_errors
+def analyze_batch():
+    try:
+        current_user_id = get_jwt_identity()
+
+        # Lotes podem ultrapassar o limite global de uma única imagem
+        request.max_content_length = Config.BATCH_MAX_CONTENT_LENGTH
+        uploads = collect_batch_uploads(
+            request.files,
+            max_images=Config.BATCH_MAX_IMAGES,
+            max_image_bytes=Config.MAX_CONTENT_LENGTH
+        )
+
+    except UploadRejected as e:
+        # Só o próprio corpo (ex.: tamanho) recusa o lote inteiro; imagens ruins viram itens com erro
+        return jsonify({
+            "error": "Erro de validação",
+            "details": {e.field_name: [e.description]}
+        }), 400
+
+    except ValidationError as e:
+        return jsonify({
+            "error": "Erro de validação",
+            "details": e.messages
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao processar lote",
+            "message": str(e)
+        }), 500
+
+    def read_uploads():
+        for filename, read in uploads:
+            try:
+                yield filename, read()
+            except Exception as e:
+                # A falha de leitura (ou a recusa na inspeção) vira a linha de erro desta imagem
+                yield filename, e
+
+    def generate():
+        images = read_uploads()
+        for item in analyze_images_batch(images, current_user_id):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    # Uma linha NDJSON por imagem, enviada assim que o resultado fica pronto
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@neural_bp.route('/jobs', methods=['POST'])
+@jwt_required()
+@validate_image_upload
+def create_analysis_job():
+    try:
+        current_user_id = get_jwt_identity()
+        file = request.files['image']
+
+        job = submit_job(file.read(), current_user_id)
+
+        return jsonify({
+            "message": "Análise enfileirada",
+            "data": {
+                "job_id": job['job_id'],
+                "status": job['status'],
+                "status_url": f"/api/neural/jobs/{job['job_id']}"
+            }
+        }), 202
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao enfileirar análise",
+            "message": str(e)
+        }), 500
+
+@neural_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_analysis_job(job_id):
+    try:
+        current_user_id = get_jwt_identity()
+        job = get_job_status(job_id, current_user_id)
+
+        if not job:
+            return jsonify({"error": "Job não encontrado"}), 404
+
+        return jsonify({"data": job}), 200
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao consultar job",
+            "message": str(e)
+        }), 500
+
+@neural_bp.route('/results/<int:result_id>/image', methods=['GET'])
+@jwt_required()
+def get_result_image_variant(result_id):
+    """
+    Redireciona para a variante pedida (size=thumb|medium|full, format=jpeg|webp).
+    Sem format explícito, usa WebP quando o cliente o aceita. Variantes ainda
+    não geradas caem na imagem processada em tamanho original.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        size = request.args.get('size', 'full')
+        image_format = request.args.get('format') or (
+            'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg')
+
+        if size != 'full' and size not in Config.DERIVATIVE_SIZES:
+            return jsonify({"error": f"Tamanho inválido. Use: full, {', '.join(Config.DERIVATIVE_SIZES)}"}), 400
+        if image_format not in ('jpeg', 'webp'):
+            return jsonify({"error": "Formato inválido. Use: jpeg ou webp"}), 400
+
+        found = get_result_image(result_id, current_user_id, size, image_format)
+        if not found:
+            return jsonify({"error": "Resultado não encontrado"}), 404
+
+        processed_path, derivative_path = found
+        return redirect(derivative_path or processed_path, code=302)
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao obter imagem",
+            "message": str(e)
+        }), 500
+
+@neural_bp.route('/history', methods=['GET'])
+@jwt_required()
+def analysis_history():
+    """
+    Histórico de análises do usuário, mais recentes primeiro. Paginação por
+    cursor (next_cursor da resposta anterior); filtros opcionais from
+    (inclusivo), to (exclusivo), ambos ISO 8601, e class_name.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        try:
+            limit = request.args.get('limit', type=int)
+            date_from = parse_date(request.args.get('from'), 'from')
+            date_to = parse_date(request.args.get('to'), 'to')
+            page = get_history(
+                current_user_id,
+                cursor=request.args.get('cursor'),
+                limit=limit,
+                date_from=date_from,
+                date_to=date_to,
+                class_name=request.args.get('class_name', '').strip() or None
+            )
+        except ValueError as e:
+            return jsonify({"error": "Erro de validação", "message": str(e)}), 400
+
+        return jsonify({"data": page['items'], "next_cursor": page['next_cursor'],
+                        "limit": page['limit']}), 200
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao obter histórico",
+            "message": str(e)
+        }), 500
+
+@neural_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_results():
+    """
+    Exporta todas as imagens, resultados e detecções do usuário
+    (format=csv|ndjson|parquet; from/to opcionais) numa resposta em streaming.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format == 'parquet' and not parquet_available():
+            return jsonify({"error": "Exportação em Parquet indisponível (pyarrow não instalado)"}), 501
+        try:
+            date_from = parse_date(request.args.get('from'), 'from')
+            date_to = parse_date(request.args.get('to'), 'to')
+            content, mimetype, filename = export_user_results(current_user_id, export_format,
+                                                              date_from, date_to)
+        except ValueError as e:
+            return jsonify({"error": "Erro de validação", "message": str(e)}), 400
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao exportar resultados",
+            "message": str(e)
+        }), 500
+
+    # Resposta chunked: cada bloco do cursor no servidor é enviado assim que lido
+    return Response(stream_with_context(content), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@neural_bp.route('/stats', methods=['GET'])
+@jwt_required()
+def dashboard_stats():
+    """Totais, série diária e contagem por classe do usuário entre from e to (YYYY-MM-DD, inclusivos)"""
+    try:
+        current_user_id = get_jwt_identity()
+        try:
+            date_from = parse_date(request.args.get('from'), 'from')
+            date_to = parse_date(request.args.get('to'), 'to')
+            stats = get_dashboard_stats(
+                current_user_id,
+                date_from.date() if date_from else None,
+                date_to.date() if date_to else None
+            )
+        except ValueError as e:
+            return jsonify({"error": "Erro de validação", "message": str(e)}), 400
+
+        return jsonify({"data": stats}), 200
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao obter estatísticas",
+            "message": str(e)
+        }), 500
+
+@neural_bp.route('/detections/search', methods=['GET'])
+@jwt_required()
+def search_detections():
+    """Resultados do usuário com a classe pedida (class_name) acima de min_confidence"""
+    try:
+        current_user_id = get_jwt_identity()
+        class_name = request.args.get('class_name', '').strip()
+        if not class_name:
+            return jsonify({"error": "Parâmetro class_name é obrigatório"}), 400
+        try:
+            min_confidence = float(request.args.get('min_confidence', 0))
+            limit = min(int(request.args.get('limit', 100)), 500)
+        except ValueError:
+            return jsonify({"error": "min_confidence e limit devem ser numéricos"}), 400
+
+        results = find_images_with_class(current_user_id, class_name, min_confidence, limit)
+        return jsonify({"data": results, "count": len(results)}), 200
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao buscar detecções",
+            "message": str(e)
+        }), 500
+
+@neural_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+def metrics():
+    try:
+        return jsonify({
+            "batching": get_batching_stats(),
+            "replicas": get_replica_stats(),
+            "cascade": get_cascade_stats(),
+            "result_cache": get_cache_stats(),
+            "uploads": get_upload_stats(),
+            "image_store": get_image_store_stats(),
+            "derivatives": get_derivative_stats(),
+            "token_blocklist": get_blocklist_stats()
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "error": "Erro ao obter métricas",
+            "message": str(e)
+        }), 500
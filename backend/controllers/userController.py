@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
-from services.userService import register_user, login_user
+from services.userService import register_user, login_user, logout_user
 from marshmallow import ValidationError
-from flask_jwt_extended import (create_access_token, jwt_required, get_jwt_identity)
+from flask_jwt_extended import (create_access_token, jwt_required, get_jwt_identity, get_jwt)
 
 user_bp = Blueprint('user', __name__, url_prefix='/api/users')
 
@@ -91,7 +91,16 @@ def check_auth():
 @jwt_required()  
 def logout():
     try:
+        data = request.get_json(silent=True) or {}
+        # O token de acesso atual (e o refresh token, se enviado) deixa de valer em todos os workers
+        logout_user(get_jwt(), data.get('refresh_token'))
         return jsonify({"message": "Logout bem-sucedido"}), 200
+
+    except ValidationError as e:
+        return jsonify({
+            "error": "Erro de validação",
+            "details": e.messages
+        }), 400
     
     except Exception as e:
         return jsonify({"error": "Erro ao realizar logout", "message": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,74 @@
+# Configuração do Gunicorn (carregada automaticamente a partir do diretório de trabalho)
+import os
+import sys
+import threading
+import subprocess
+
+# Com o servidor de modelo habilitado, os workers HTTP não carregam o modelo
+# e podem escalar independentemente da memória do modelo
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Workers com threads: requisições /analyze simultâneas no mesmo processo chegam
+# juntas ao agendador de micro-lotes (Config.INFERENCE_BATCHING_ENABLED)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Processos auxiliares supervisionados pelo mestre (SupervisedProcess)
+_children = []
+_stopping = threading.Event()
+
+
+def _model_server_enabled():
+    return os.environ.get('MODEL_SERVER_ENABLED', 'False').lower() == 'true'
+
+
+def _job_workers_enabled():
+    return int(os.environ.get('JOB_DEDICATED_WORKER_PROCESSES', 1)) > 0
+
+
+def _supervise_module(server, name, module):
+    from services.supervisorService import SupervisedProcess
+
+    def start():
+        process = subprocess.Popen([sys.executable, '-m', module])
+        server.log.info(f"{name} iniciado (pid={process.pid})")
+        return process
+
+    child = SupervisedProcess(name, start, lambda process: process.poll() is None)
+    child.check()
+    _children.append(child)
+
+
+def _watch_children():
+    while not _stopping.wait(1):
+        for child in _children:
+            child.check()
+
+
+def on_starting(server):
+    """Sobe os processos dedicados (modelo e jobs) antes dos workers HTTP"""
+    if _model_server_enabled():
+        _supervise_module(server, 'Servidor de modelo', 'services.modelServerService')
+    if _job_workers_enabled():
+        _supervise_module(server, 'Supervisor de jobs', 'services.jobService')
+    if _children:
+        threading.Thread(target=_watch_children, name='child-supervisor', daemon=True).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    for child in _children:
+        if child.process and child.process.poll() is None:
+            child.process.terminate()
+            child.process.wait(timeout=30)
+
+
+def post_fork(server, worker):
+    """
+    Com --preload a aplicação é importada no processo mestre, sem o modelo.
+    Cada worker inicia o carregamento e o aquecimento do modelo logo após o
+    fork; /ready responde 200 quando o worker estiver pronto. Com o servidor
+    de modelo habilitado, a chamada não carrega nada localmente.
+    """
+    from services.detectObjectService import start_model_loading
+    start_model_loading()
@@ -12,7 +12,7 @@ class ObjectRecognitionResult(db.Model):
         db.ForeignKey('Images.ImageID', ondelete='CASCADE'),  # Remova 'dbo.' se não usar esquema
         nullable=False
     )
-    RecognizedObjects = db.Column(db.String(255), nullable=False)  # Usando String no lugar de TEXT
+    RecognizedObjects = db.Column(db.String(255), nullable=False)  # Resumo das classes; detecções completas em Detections
     ProcessedImagePath = db.Column(db.String(255), nullable=False)
     AnalyzedAt = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -21,9 +21,17 @@ class ObjectRecognitionResult(db.Model):
     TotalTimeMs = db.Column(db.Integer, nullable=True)  
     ConfidenceAvg = db.Column(db.Float, nullable=True)
     ObjectsCount = db.Column(db.Integer, nullable=True)
-    DetectionDetails = db.Column(db.String(255), nullable=True)  # Usando String no lugar de TEXT
+    DetectionDetails = db.Column(db.String(255), nullable=True)  # Legado (JSON truncado); migrado para Detections
+    ModelVersion = db.Column(db.String(64), nullable=True, index=True)  # Checksum da versão do modelo (ModelVersions)
     
     image = db.relationship('Image', back_populates='recognition_results')
+    detections = db.relationship(
+        'Detection',
+        back_populates='result',
+        cascade='all, delete-orphan',
+        passive_deletes=True,
+        lazy=True
+    )
 
     def __repr__(self):
         return f'<ObjectRecognitionResult {self.ResultID} - Image {self.ImageID}>'
\ No newline at end of file
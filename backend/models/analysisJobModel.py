@@ -0,0 +1,24 @@
+from extensions import db
+from datetime import datetime
+
+class AnalysisJob(db.Model):
+    __tablename__ = 'AnalysisJobs'
+    __table_args__ = (
+        db.Index('ix_analysis_jobs_status_created', 'Status', 'CreatedAt'),
+        {'extend_existing': True}
+    )
+
+    JobID = db.Column(db.String(36), primary_key=True)  # UUID exposto na API
+    UserID = db.Column(db.Integer, db.ForeignKey('Users.UserID'), nullable=False)
+    Status = db.Column(db.String(20), nullable=False, default='queued')  # queued | running | done | failed
+    InputPath = db.Column(db.String(500), nullable=False)  # Bytes enviados, persistidos em disco
+    ResultJson = db.Column(db.Text, nullable=True)
+    Error = db.Column(db.String(500), nullable=True)
+    Attempts = db.Column(db.Integer, nullable=False, default=0)
+    CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
+    StartedAt = db.Column(db.DateTime, nullable=True)
+    FinishedAt = db.Column(db.DateTime, nullable=True)
+    UpdatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AnalysisJob {self.JobID} - {self.Status}>'
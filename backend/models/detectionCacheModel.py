@@ -0,0 +1,36 @@
+from extensions import db
+from datetime import datetime
+
+class DetectionCacheEntry(db.Model):
+    __tablename__ = 'DetectionCache'
+    __table_args__ = (
+        # Uma entrada por conteúdo de imagem e versão de modelo
+        db.UniqueConstraint('ContentHash', 'ModelVersion', name='uq_detection_cache_content_model'),
+        {'extend_existing': True}
+    )
+
+    CacheID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    ContentHash = db.Column(db.String(64), nullable=False)  # SHA-256 dos bytes enviados
+    ModelVersion = db.Column(db.String(64), nullable=False)  # Checksum dos pesos carregados
+    ResultID = db.Column(
+        db.Integer,
+        db.ForeignKey('ObjectRecognitionResults.ResultID', ondelete='CASCADE'),
+        nullable=False
+    )
+    DetectionsJson = db.Column(db.Text, nullable=False)
+    ProcessedImagePath = db.Column(db.String(500), nullable=False)
+    Accuracy = db.Column(db.Float, nullable=True)
+    InferenceTimeMs = db.Column(db.Integer, nullable=True)
+    TotalTimeMs = db.Column(db.Integer, nullable=True)
+    # Dimensões da original (espaço das caixas) e da imagem processada
+    ImageWidth = db.Column(db.Integer, nullable=True)
+    ImageHeight = db.Column(db.Integer, nullable=True)
+    ProcessedWidth = db.Column(db.Integer, nullable=True)
+    ProcessedHeight = db.Column(db.Integer, nullable=True)
+    HitCount = db.Column(db.Integer, nullable=False, default=0)
+    CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
+
+    result = db.relationship('ObjectRecognitionResult')
+
+    def __repr__(self):
+        return f'<DetectionCacheEntry {self.ContentHash[:12]} - {self.ModelVersion[:12]}>'
@@ -0,0 +1,41 @@
+from extensions import db
+
+class Detection(db.Model):
+    __tablename__ = 'Detections'
+    __table_args__ = (
+        db.Index('ix_detections_class_confidence', 'ClassName', 'Confidence'),
+        # Consultas por usuário ("imagens com pessoa >= 0.8") sem juntar Images
+        db.Index('ix_detections_user_class_confidence', 'UserID', 'ClassName', 'Confidence'),
+        {'extend_existing': True}
+    )
+
+    DetectionID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    ResultID = db.Column(
+        db.Integer,
+        db.ForeignKey('ObjectRecognitionResults.ResultID', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+    # Desnormalizados a partir de Images para que os filtros usem apenas os índices acima
+    ImageID = db.Column(db.Integer, nullable=False)
+    UserID = db.Column(db.Integer, nullable=False)
+    ClassID = db.Column(db.Integer, nullable=True)
+    ClassName = db.Column(db.String(100), nullable=False)
+    Confidence = db.Column(db.Float, nullable=False)
+    X1 = db.Column(db.Float, nullable=True)
+    Y1 = db.Column(db.Float, nullable=True)
+    X2 = db.Column(db.Float, nullable=True)
+    Y2 = db.Column(db.Float, nullable=True)
+
+    result = db.relationship('ObjectRecognitionResult', back_populates='detections')
+
+    def to_dict(self) -> dict:
+        return {
+            'class_id': self.ClassID,
+            'class_name': self.ClassName,
+            'confidence': self.Confidence,
+            'bbox': [self.X1, self.Y1, self.X2, self.Y2]
+        }
+
+    def __repr__(self):
+        return f'<Detection {self.DetectionID} - {self.ClassName} {self.Confidence:.2f}>'
@@ -0,0 +1,34 @@
+from extensions import db
+
+class UserDailyStats(db.Model):
+    """Totais por usuário e dia (UTC), somados a cada análise gravada"""
+    __tablename__ = 'UserDailyStats'
+    __table_args__ = {'extend_existing': True}
+
+    UserID = db.Column(db.Integer, primary_key=True)
+    Day = db.Column(db.Date, primary_key=True)
+    Analyses = db.Column(db.Integer, nullable=False, default=0)
+    Objects = db.Column(db.Integer, nullable=False, default=0)
+    ConfidenceSum = db.Column(db.Float, nullable=False, default=0.0)  # Soma das confianças de todas as detecções
+    InferenceTimeSumMs = db.Column(db.Float, nullable=False, default=0.0)
+    InferenceTimeCount = db.Column(db.Integer, nullable=False, default=0)  # Análises com InferenceTimeMs
+    TotalTimeSumMs = db.Column(db.Float, nullable=False, default=0.0)
+    TotalTimeCount = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<UserDailyStats {self.UserID} - {self.Day}>'
+
+
+class UserClassDailyStats(db.Model):
+    """Detecções por usuário, dia (UTC) e classe"""
+    __tablename__ = 'UserClassDailyStats'
+    __table_args__ = {'extend_existing': True}
+
+    UserID = db.Column(db.Integer, primary_key=True)
+    Day = db.Column(db.Date, primary_key=True)
+    ClassName = db.Column(db.String(100), primary_key=True)
+    Detections = db.Column(db.Integer, nullable=False, default=0)
+    ConfidenceSum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<UserClassDailyStats {self.UserID} - {self.Day} - {self.ClassName}>'
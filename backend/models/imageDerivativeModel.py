@@ -0,0 +1,26 @@
+from extensions import db
+from datetime import datetime
+
+class ImageDerivative(db.Model):
+    __tablename__ = 'ImageDerivatives'
+    __table_args__ = (
+        db.UniqueConstraint('ResultID', 'Size', 'Format', name='uq_image_derivatives_variant'),
+        {'extend_existing': True}
+    )
+
+    DerivativeID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    ResultID = db.Column(
+        db.Integer,
+        db.ForeignKey('ObjectRecognitionResults.ResultID', ondelete='CASCADE'),
+        nullable=False
+    )
+    Size = db.Column(db.String(20), nullable=False)  # thumb | medium
+    Format = db.Column(db.String(10), nullable=False)  # jpeg | webp
+    Path = db.Column(db.String(500), nullable=False)  # URL local (/uploads/public/...)
+    Width = db.Column(db.Integer, nullable=False)
+    Height = db.Column(db.Integer, nullable=False)
+    SizeBytes = db.Column(db.Integer, nullable=False)
+    CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ImageDerivative {self.ResultID} - {self.Size}/{self.Format}>'
@@ -4,7 +4,10 @@ from datetime import datetime
 class Image(db.Model):
     __tablename__ = 'Images'
     # Remover o uso de 'schema' no MySQL
-    __table_args__ = {}  # Não é necessário usar schema no MySQL
+    __table_args__ = (
+        # Paginação por cursor do histórico: WHERE UserID = ? ORDER BY UploadedAt, ImageID
+        db.Index('ix_images_user_uploaded', 'UserID', 'UploadedAt', 'ImageID'),
+    )
     
     ImageID = db.Column(db.Integer, primary_key=True)
     UserID = db.Column(db.Integer, db.ForeignKey('Users.UserID'), nullable=False)  # Remover 'dbo.' se não for usado
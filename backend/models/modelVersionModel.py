@@ -0,0 +1,23 @@
+from extensions import db
+from datetime import datetime
+
+class ModelVersion(db.Model):
+    __tablename__ = 'ModelVersions'
+    __table_args__ = (
+        db.UniqueConstraint('Checksum', name='uq_model_versions_checksum'),
+        {'extend_existing': True}
+    )
+
+    VersionID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    Name = db.Column(db.String(100), nullable=False)
+    WeightsPath = db.Column(db.String(500), nullable=False)
+    Backend = db.Column(db.String(20), nullable=False, default='torch')
+    Checksum = db.Column(db.String(64), nullable=False)  # Mesmo valor gravado em ObjectRecognitionResults.ModelVersion
+    SizeBytes = db.Column(db.BigInteger, nullable=True)
+    MetadataJson = db.Column(db.Text, nullable=True)  # Argumentos e métricas do treino, quando disponíveis
+    Status = db.Column(db.String(20), nullable=False, default='registered')  # registered | active | retired
+    CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
+    ActivatedAt = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<ModelVersion {self.VersionID} - {self.Name} ({self.Status})>'
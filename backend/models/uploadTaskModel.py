@@ -0,0 +1,28 @@
+from extensions import db
+from datetime import datetime
+
+class UploadTask(db.Model):
+    __tablename__ = 'UploadTasks'
+    __table_args__ = (
+        db.Index('ix_upload_tasks_status_next', 'Status', 'NextAttemptAt'),
+        {'extend_existing': True}
+    )
+
+    TaskID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    ImageID = db.Column(
+        db.Integer,
+        db.ForeignKey('Images.ImageID', ondelete='CASCADE'),
+        nullable=False
+    )
+    ImageUUID = db.Column(db.String(64), nullable=False)
+    LocalPath = db.Column(db.String(500), nullable=False)  # URL local (/uploads/public/...)
+    RemoteUrl = db.Column(db.String(500), nullable=True)
+    Status = db.Column(db.String(20), nullable=False, default='pending')  # pending | in_progress | done | failed
+    Attempts = db.Column(db.Integer, nullable=False, default=0)
+    NextAttemptAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    LastError = db.Column(db.String(500), nullable=True)
+    CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
+    UpdatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UploadTask {self.TaskID} - {self.Status}>'
@@ -0,0 +1,120 @@
+from extensions import db
+from models.analysisJobModel import AnalysisJob
+from sqlalchemy import and_, or_
+from datetime import datetime, timedelta
+from typing import List, Optional
+import json
+
+def create_job(job_id: str, user_id: int, input_path: str) -> AnalysisJob:
+    """Registra um job de análise na fila"""
+    try:
+        job = AnalysisJob(
+            JobID=job_id,
+            UserID=user_id,
+            Status='queued',
+            InputPath=input_path,
+            Attempts=0,
+            CreatedAt=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def get_job(job_id: str, user_id: int) -> Optional[AnalysisJob]:
+    """Busca um job pertencente ao usuário"""
+    return AnalysisJob.query.filter_by(JobID=job_id, UserID=user_id).first()
+
+def claim_jobs(limit: int, lease_seconds: int, max_attempts: int) -> List[AnalysisJob]:
+    """
+    Reserva até `limit` jobs da fila, cada um com um UPDATE condicional (seguro
+    entre processos), num único commit. Jobs 'running' cujo lease expirou
+    (worker reiniciado) voltam a ser elegíveis.
+    """
+    now = datetime.utcnow()
+    ready = and_(
+        AnalysisJob.Attempts < max_attempts,
+        or_(
+            AnalysisJob.Status == 'queued',
+            and_(AnalysisJob.Status == 'running',
+                 AnalysisJob.UpdatedAt <= now - timedelta(seconds=lease_seconds))
+        )
+    )
+    try:
+        candidates = (db.session.query(AnalysisJob.JobID)
+                      .filter(ready)
+                      .order_by(AnalysisJob.CreatedAt)
+                      .limit(limit)
+                      .all())
+        if not candidates:
+            db.session.rollback()
+            return []
+
+        claimed_ids = []
+        for candidate in candidates:
+            claimed = (AnalysisJob.query
+                       .filter(AnalysisJob.JobID == candidate.JobID, ready)
+                       .update({
+                           AnalysisJob.Status: 'running',
+                           AnalysisJob.Attempts: AnalysisJob.Attempts + 1,
+                           AnalysisJob.StartedAt: now,
+                           AnalysisJob.UpdatedAt: now
+                       }, synchronize_session=False))
+            # Outro worker pode ter reservado o mesmo job entre o SELECT e o UPDATE
+            if claimed == 1:
+                claimed_ids.append(candidate.JobID)
+        db.session.commit()
+        if not claimed_ids:
+            return []
+        jobs = AnalysisJob.query.filter(AnalysisJob.JobID.in_(claimed_ids)).all()
+        return sorted(jobs, key=lambda job: claimed_ids.index(job.JobID))
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def complete_job(job_id: str, result: dict) -> None:
+    """Grava o resultado e marca o job como concluído"""
+    try:
+        AnalysisJob.query.filter_by(JobID=job_id).update({
+            AnalysisJob.Status: 'done',
+            AnalysisJob.ResultJson: json.dumps(result),
+            AnalysisJob.Error: None,
+            AnalysisJob.FinishedAt: datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def fail_job(job_id: str, error: str) -> None:
+    """Marca o job como falho"""
+    try:
+        AnalysisJob.query.filter_by(JobID=job_id).update({
+            AnalysisJob.Status: 'failed',
+            AnalysisJob.Error: error[:500],
+            AnalysisJob.FinishedAt: datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def fail_abandoned_jobs(lease_seconds: int, max_attempts: int) -> int:
+    """Marca como falhos os jobs que esgotaram as tentativas após quedas do worker"""
+    try:
+        failed = AnalysisJob.query.filter(
+            AnalysisJob.Status == 'running',
+            AnalysisJob.Attempts >= max_attempts,
+            AnalysisJob.UpdatedAt <= datetime.utcnow() - timedelta(seconds=lease_seconds)
+        ).update({
+            AnalysisJob.Status: 'failed',
+            AnalysisJob.Error: 'Worker interrompido repetidamente durante o processamento',
+            AnalysisJob.FinishedAt: datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        return failed
+    except Exception as e:
+        db.session.rollback()
+        raise e
@@ -0,0 +1,68 @@
+from extensions import db
+from models.detectionCacheModel import DetectionCacheEntry
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from typing import Optional, Tuple
+import json
+
+def get_cache_entry(content_hash: str, model_version: str) -> Optional[DetectionCacheEntry]:
+    """Busca uma entrada do cache persistente pelo hash do conteúdo e versão do modelo"""
+    return DetectionCacheEntry.query.filter_by(
+        ContentHash=content_hash,
+        ModelVersion=model_version
+    ).first()
+
+def increment_cache_hits(cache_id: int) -> None:
+    """Incrementa o contador de acertos de uma entrada sem carregá-la"""
+    try:
+        DetectionCacheEntry.query.filter_by(CacheID=cache_id).update(
+            {DetectionCacheEntry.HitCount: DetectionCacheEntry.HitCount + 1},
+            synchronize_session=False
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def save_cache_entry(
+    content_hash: str,
+    model_version: str,
+    result_id: int,
+    detections: list,
+    processed_image_path: str,
+    accuracy: float,
+    inference_time: float,
+    total_time: float,
+    image_size: Optional[Tuple[int, int]] = None,
+    processed_size: Optional[Tuple[int, int]] = None
+) -> Optional[int]:
+    """
+    Salva uma entrada no cache persistente.
+    Retorna None se outra requisição já gravou o mesmo conteúdo/modelo.
+    """
+    try:
+        entry = DetectionCacheEntry(
+            ContentHash=content_hash,
+            ModelVersion=model_version,
+            ResultID=result_id,
+            DetectionsJson=json.dumps(detections),
+            ProcessedImagePath=processed_image_path,
+            Accuracy=accuracy,
+            InferenceTimeMs=inference_time,
+            TotalTimeMs=total_time,
+            ImageWidth=image_size[0] if image_size else None,
+            ImageHeight=image_size[1] if image_size else None,
+            ProcessedWidth=processed_size[0] if processed_size else None,
+            ProcessedHeight=processed_size[1] if processed_size else None,
+            HitCount=0,
+            CreatedAt=datetime.utcnow()
+        )
+        db.session.add(entry)
+        db.session.commit()
+        return entry.CacheID
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    except Exception as e:
+        db.session.rollback()
+        raise e
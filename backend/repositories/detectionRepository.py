@@ -0,0 +1,121 @@
+from extensions import db
+from models.imageModel import Image
+from models.ObjectRecognitionResultModel import ObjectRecognitionResult
+from models.detectionModel import Detection
+from repositories.neuralNetworkRepository import detection_rows
+from sqlalchemy import func, insert
+from typing import Dict, List, Optional
+import json
+import re
+
+def find_images_with_class(user_id: int, class_name: str, min_confidence: float = 0.0,
+                           limit: int = 100) -> List[Dict]:
+    """
+    Resultados do usuário com ao menos uma detecção da classe com confiança >= min_confidence.
+    Filtra apenas pelo índice (UserID, ClassName, Confidence) de Detections.
+    """
+    rows = (db.session.query(
+                Detection.ResultID,
+                Detection.ImageID,
+                func.max(Detection.Confidence).label('max_confidence'),
+                func.count(Detection.DetectionID).label('matches'))
+            .filter(Detection.UserID == user_id,
+                    Detection.ClassName == class_name,
+                    Detection.Confidence >= min_confidence)
+            .group_by(Detection.ResultID, Detection.ImageID)
+            .order_by(Detection.ResultID.desc())
+            .limit(limit)
+            .all())
+    if not rows:
+        return []
+
+    paths = dict(db.session.query(ObjectRecognitionResult.ResultID, ObjectRecognitionResult.ProcessedImagePath)
+                 .filter(ObjectRecognitionResult.ResultID.in_([row.ResultID for row in rows]))
+                 .all())
+    return [
+        {
+            'result_id': row.ResultID,
+            'image_id': row.ImageID,
+            'image_url': paths.get(row.ResultID),
+            'max_confidence': round(row.max_confidence, 4),
+            'matches': row.matches
+        }
+        for row in rows
+    ]
+
+def get_result_detections(result_id: int) -> List[Dict]:
+    """Detecções de um resultado, na ordem em que foram gravadas"""
+    detections = Detection.query.filter_by(ResultID=result_id).order_by(Detection.DetectionID).all()
+    return [detection.to_dict() for detection in detections]
+
+
+_OBJECT_PATTERN = re.compile(r'\{[^{}]*\}')
+
+def parse_legacy_detections(raw: Optional[str]) -> List[Dict]:
+    """
+    Lê o JSON antigo de DetectionDetails/RecognizedObjects. As gravações antigas
+    serializavam duas vezes e eram truncadas em 255 caracteres: quando o JSON está
+    incompleto, recupera os objetos que chegaram inteiros.
+    """
+    if not raw:
+        return []
+    try:
+        value = json.loads(raw)
+        if isinstance(value, str):
+            value = json.loads(value)
+    except (TypeError, ValueError):
+        value = []
+        for match in _OBJECT_PATTERN.findall(raw.replace('\\"', '"')):
+            try:
+                value.append(json.loads(match))
+            except ValueError:
+                continue
+
+    if not isinstance(value, list):
+        return []
+    return [obj for obj in value
+            if isinstance(obj, dict) and 'class_name' in obj and 'confidence' in obj]
+
+def backfill_detections(batch_size: int = 500) -> Dict[str, int]:
+    """
+    Migra os resultados antigos (JSON nas colunas String(255)) para a tabela
+    Detections. Idempotente: resultados que já têm detecções são ignorados.
+    """
+    stats = {'results': 0, 'detections': 0, 'empty': 0}
+    last_id = 0
+    while True:
+        has_detections = db.session.query(Detection.DetectionID).filter(
+            Detection.ResultID == ObjectRecognitionResult.ResultID).exists()
+        batch = (db.session.query(
+                    ObjectRecognitionResult.ResultID,
+                    ObjectRecognitionResult.ImageID,
+                    ObjectRecognitionResult.DetectionDetails,
+                    ObjectRecognitionResult.RecognizedObjects,
+                    Image.UserID)
+                 .join(Image, Image.ImageID == ObjectRecognitionResult.ImageID)
+                 .filter(ObjectRecognitionResult.ResultID > last_id, ~has_detections)
+                 .order_by(ObjectRecognitionResult.ResultID)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            return stats
+
+        rows = []
+        for result in batch:
+            objects = (parse_legacy_detections(result.DetectionDetails)
+                       or parse_legacy_detections(result.RecognizedObjects))
+            stats['results'] += 1
+            if not objects:
+                stats['empty'] += 1
+            rows.extend(detection_rows(result.ResultID, result.ImageID, result.UserID, objects))
+
+        try:
+            if rows:
+                db.session.execute(insert(Detection), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+        stats['detections'] += len(rows)
+        last_id = batch[-1].ResultID
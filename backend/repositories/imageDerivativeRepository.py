@@ -0,0 +1,76 @@
+from extensions import db
+from models.imageDerivativeModel import ImageDerivative
+from models.imageModel import Image
+from models.ObjectRecognitionResultModel import ObjectRecognitionResult
+from repositories.uploadTaskRepository import get_remote_url
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+def save_derivatives(result_id: int, derivatives: List[dict]) -> None:
+    """Grava as variantes geradas para um resultado (size, format, path, width, height, size_bytes)"""
+    try:
+        now = datetime.utcnow()
+        db.session.add_all([
+            ImageDerivative(
+                ResultID=result_id,
+                Size=d['size'],
+                Format=d['format'],
+                Path=d['path'],
+                Width=d['width'],
+                Height=d['height'],
+                SizeBytes=d['size_bytes'],
+                CreatedAt=now
+            )
+            for d in derivatives
+        ])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def copy_derivatives_from_source(result_id: int, processed_image_path: str) -> int:
+    """
+    Reaproveita as variantes de outro resultado com a mesma imagem processada
+    (acerto no cache de resultados). A imagem pode estar registrada pela URL
+    local ou, depois do upload, pela remota; as duas são procuradas.
+    Retorna quantas variantes foram copiadas (0 se a origem ainda não tiver variantes).
+    """
+    paths = [processed_image_path]
+    remote_url = get_remote_url(processed_image_path)
+    if remote_url:
+        paths.append(remote_url)
+
+    source = (db.session.query(ImageDerivative.ResultID)
+              .join(ObjectRecognitionResult, ObjectRecognitionResult.ResultID == ImageDerivative.ResultID)
+              .filter(ObjectRecognitionResult.ProcessedImagePath.in_(paths),
+                      ImageDerivative.ResultID != result_id)
+              .first())
+    if source is None:
+        return 0
+
+    derivatives = ImageDerivative.query.filter_by(ResultID=source.ResultID).all()
+    save_derivatives(result_id, [
+        {'size': d.Size, 'format': d.Format, 'path': d.Path, 'width': d.Width,
+         'height': d.Height, 'size_bytes': d.SizeBytes}
+        for d in derivatives
+    ])
+    return len(derivatives)
+
+def get_result_image(result_id: int, user_id: int, size: str,
+                     image_format: str) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Imagem processada de um resultado do usuário e, se existir, a variante pedida.
+    Retorna None se o resultado não existir ou pertencer a outro usuário.
+    """
+    result = (db.session.query(ObjectRecognitionResult.ProcessedImagePath)
+              .join(Image, Image.ImageID == ObjectRecognitionResult.ImageID)
+              .filter(ObjectRecognitionResult.ResultID == result_id, Image.UserID == user_id)
+              .first())
+    if result is None:
+        return None
+
+    derivative = ImageDerivative.query.filter_by(ResultID=result_id, Size=size, Format=image_format).first()
+    return result.ProcessedImagePath, derivative.Path if derivative else None
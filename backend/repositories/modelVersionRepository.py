@@ -0,0 +1,72 @@
+from extensions import db
+from models.modelVersionModel import ModelVersion
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from typing import List, Optional
+import json
+
+def register_model_version(
+    name: str,
+    weights_path: str,
+    backend: str,
+    checksum: str,
+    size_bytes: int,
+    metadata: dict
+) -> ModelVersion:
+    """
+    Registra uma versão de pesos no registro de modelos.
+    Pesos já registrados (mesmo checksum) retornam a entrada existente.
+    """
+    existing = ModelVersion.query.filter_by(Checksum=checksum).first()
+    if existing:
+        return existing
+    try:
+        version = ModelVersion(
+            Name=name,
+            WeightsPath=weights_path,
+            Backend=backend,
+            Checksum=checksum,
+            SizeBytes=size_bytes,
+            MetadataJson=json.dumps(metadata),
+            Status='registered',
+            CreatedAt=datetime.utcnow()
+        )
+        db.session.add(version)
+        db.session.commit()
+        return version
+    except IntegrityError:
+        db.session.rollback()
+        return ModelVersion.query.filter_by(Checksum=checksum).first()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def list_model_versions() -> List[ModelVersion]:
+    """Todas as versões registradas, da mais recente para a mais antiga"""
+    return ModelVersion.query.order_by(ModelVersion.CreatedAt.desc()).all()
+
+def get_model_version_by_id(version_id: int) -> Optional[ModelVersion]:
+    return ModelVersion.query.filter_by(VersionID=version_id).first()
+
+def get_active_model_version() -> Optional[ModelVersion]:
+    return ModelVersion.query.filter_by(Status='active').first()
+
+def activate_model_version(version_id: int) -> Optional[ModelVersion]:
+    """Marca a versão como ativa e aposenta a anterior, na mesma transação"""
+    try:
+        version = ModelVersion.query.filter_by(VersionID=version_id).first()
+        if version is None:
+            return None
+
+        ModelVersion.query.filter(
+            ModelVersion.Status == 'active',
+            ModelVersion.VersionID != version_id
+        ).update({ModelVersion.Status: 'retired'}, synchronize_session=False)
+
+        version.Status = 'active'
+        version.ActivatedAt = datetime.utcnow()
+        db.session.commit()
+        return version
+    except Exception as e:
+        db.session.rollback()
+        raise e
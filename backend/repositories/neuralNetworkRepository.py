@@ -1,56 +1,170 @@
 from extensions import db
 from models.imageModel import Image
 from models.ObjectRecognitionResultModel import ObjectRecognitionResult
+from models.detectionModel import Detection
+from repositories.statsRepository import record_analyses_stats
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.orm import selectinload
 from datetime import datetime
-import json
+from typing import Dict, Iterator, List, Optional, Tuple
 
-def save_image(user_id: int, image_path: str) -> int:
+# Tamanho da coluna RecognizedObjects (String(255))
+_SUMMARY_MAX_LENGTH = 255
+
+def summarize_classes(detected_objects: List[Dict]) -> str:
+    """Classes distintas, em ordem de aparição, cortadas no tamanho da coluna"""
+    names = list(dict.fromkeys(obj['class_name'] for obj in detected_objects))
+    summary = ','.join(names)
+    if len(summary) <= _SUMMARY_MAX_LENGTH:
+        return summary
+    return summary[:_SUMMARY_MAX_LENGTH].rsplit(',', 1)[0]
+
+def detection_rows(result_id: int, image_id: int, user_id: int, detected_objects: List[Dict]) -> List[Dict]:
+    """Linhas da tabela Detections para inserção em massa (uma por detecção)"""
+    rows = []
+    for obj in detected_objects:
+        bbox = obj.get('bbox') or [None] * 4
+        rows.append({
+            'ResultID': result_id,
+            'ImageID': image_id,
+            'UserID': user_id,
+            'ClassID': obj.get('class_id'),
+            'ClassName': obj['class_name'],
+            'Confidence': float(obj['confidence']),
+            'X1': bbox[0],
+            'Y1': bbox[1],
+            'X2': bbox[2],
+            'Y2': bbox[3]
+        })
+    return rows
+
+def save_analyses(analyses: List[Dict]) -> List[Tuple[int, int]]:
     """
-    Salva a imagem no banco de dados e retorna o ID
+    Unidade de trabalho: grava Images, ObjectRecognitionResults, Detections e os
+    resumos diários de uma ou mais análises numa única transação (um commit,
+    nenhum Images órfão).
+    Cada análise é um dict com user_id, image_path, detected_objects,
+    processed_image_path, accuracy, inference_time, total_time, confidence_avg,
+    objects_count e model_version. Retorna (ImageID, ResultID) na mesma ordem.
     """
     try:
-        new_image = Image(
-            UserID=user_id,
-            ImagePath=image_path,
-            UploadedAt=datetime.utcnow()
-        )
-        db.session.add(new_image)
+        now = datetime.utcnow()
+        images = []
+        results = []
+        for analysis in analyses:
+            image = Image(
+                UserID=analysis['user_id'],
+                ImagePath=analysis['image_path'],
+                UploadedAt=now
+            )
+            results.append(ObjectRecognitionResult(
+                image=image,
+                RecognizedObjects=summarize_classes(analysis['detected_objects']),
+                ProcessedImagePath=analysis['processed_image_path'],
+                Accuracy=analysis['accuracy'],
+                InferenceTimeMs=analysis['inference_time'],
+                TotalTimeMs=analysis['total_time'],
+                ConfidenceAvg=analysis['confidence_avg'],
+                ObjectsCount=analysis['objects_count'],
+                ModelVersion=analysis.get('model_version'),
+                AnalyzedAt=now
+            ))
+            images.append(image)
+
+        # Um flush: o unit of work agrupa os INSERTs de Images e depois os de resultados
+        db.session.add_all(images)
+        db.session.flush()
+
+        rows = []
+        for analysis, image, result in zip(analyses, images, results):
+            rows.extend(detection_rows(result.ResultID, image.ImageID, analysis['user_id'],
+                                       analysis['detected_objects']))
+        if rows:
+            # executemany sem PKs de retorno: INSERT multi-linha no driver
+            db.session.execute(insert(Detection), rows)
+
+        # Resumos para os dashboards, na mesma transação
+        record_analyses_stats(analyses, now)
         db.session.commit()
-        return new_image.ImageID
+        return [(image.ImageID, result.ResultID) for image, result in zip(images, results)]
     except Exception as e:
         db.session.rollback()
         raise e
 
-def save_recognition_result(
-    image_id: int,
-    recognized_objects: list,
-    processed_image_path: str,
-    accuracy: float,
-    inference_time: float,
-    total_time: float,
-    confidence_avg: float,
-    objects_count: int,
-    detection_details: list  # <- Aqui corrigido: espera lista, não string
-) -> int:
+def save_analysis(analysis: Dict) -> Tuple[int, int]:
+    """Grava uma única análise (ver save_analyses); retorna (ImageID, ResultID)"""
+    return save_analyses([analysis])[0]
+
+def get_image_id_by_path(image_path: str) -> Optional[int]:
+    """ImageID da imagem registrada com a URL informada, ou None"""
+    image = db.session.query(Image.ImageID).filter(Image.ImagePath == image_path).first()
+    return image.ImageID if image else None
+
+def list_user_history(user_id: int, limit: int, after: Optional[Tuple[datetime, int]] = None,
+                      date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                      class_name: Optional[str] = None) -> List[Image]:
+    """
+    Uma página do histórico do usuário, da análise mais recente para a mais antiga.
+    Paginação por cursor: `after` é o (UploadedAt, ImageID) do último item da página
+    anterior, de modo que cada página custa o mesmo no índice (UserID, UploadedAt, ImageID).
+    Resultados e detecções da página inteira vêm em duas consultas (selectinload).
+    """
+    query = (Image.query
+             .filter(Image.UserID == user_id, Image.UploadedAt.isnot(None))
+             .options(selectinload(Image.recognition_results)
+                      .selectinload(ObjectRecognitionResult.detections)))
+
+    if date_from is not None:
+        query = query.filter(Image.UploadedAt >= date_from)
+    if date_to is not None:
+        query = query.filter(Image.UploadedAt < date_to)
+    if class_name:
+        # Usa o índice (UserID, ClassName, Confidence) de Detections
+        with_class = (db.session.query(Detection.ImageID)
+                      .filter(Detection.UserID == user_id, Detection.ClassName == class_name))
+        query = query.filter(Image.ImageID.in_(with_class))
+    if after is not None:
+        uploaded_at, image_id = after
+        query = query.filter(or_(
+            Image.UploadedAt < uploaded_at,
+            and_(Image.UploadedAt == uploaded_at, Image.ImageID < image_id)
+        ))
+
+    return (query
+            .order_by(Image.UploadedAt.desc(), Image.ImageID.desc())
+            .limit(limit)
+            .all())
+
+def iter_user_export_rows(user_id: int, date_from: Optional[datetime] = None,
+                          date_to: Optional[datetime] = None, chunk_size: int = 1000) -> Iterator[List]:
     """
-    Salva os resultados da análise com todas as novas métricas.
+    Todas as imagens, resultados e detecções do usuário, uma linha por detecção
+    (imagens/resultados sem detecções aparecem uma vez, com colunas nulas),
+    em blocos de `chunk_size` linhas. Usa cursor no servidor (yield_per):
+    a memória não cresce com o tamanho do histórico.
     """
+    stmt = (select(
+                Image.ImageID, Image.ImagePath, Image.UploadedAt,
+                ObjectRecognitionResult.ResultID, ObjectRecognitionResult.AnalyzedAt,
+                ObjectRecognitionResult.Accuracy, ObjectRecognitionResult.ObjectsCount,
+                ObjectRecognitionResult.InferenceTimeMs, ObjectRecognitionResult.TotalTimeMs,
+                ObjectRecognitionResult.ModelVersion,
+                Detection.DetectionID, Detection.ClassID, Detection.ClassName, Detection.Confidence,
+                Detection.X1, Detection.Y1, Detection.X2, Detection.Y2)
+            .select_from(Image)
+            .outerjoin(ObjectRecognitionResult, ObjectRecognitionResult.ImageID == Image.ImageID)
+            .outerjoin(Detection, Detection.ResultID == ObjectRecognitionResult.ResultID)
+            .where(Image.UserID == user_id))
+    if date_from is not None:
+        stmt = stmt.where(Image.UploadedAt >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(Image.UploadedAt < date_to)
+    stmt = stmt.order_by(Image.UploadedAt, Image.ImageID, ObjectRecognitionResult.ResultID,
+                         Detection.DetectionID)
+
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
     try:
-        new_result = ObjectRecognitionResult(
-            ImageID=image_id,
-            RecognizedObjects=json.dumps(recognized_objects),  # serializa lista
-            ProcessedImagePath=processed_image_path,
-            Accuracy=accuracy,
-            InferenceTimeMs=inference_time,
-            TotalTimeMs=total_time,
-            ConfidenceAvg=confidence_avg,
-            ObjectsCount=objects_count,
-            DetectionDetails=json.dumps(detection_details),  # <- serializa lista
-            AnalyzedAt=datetime.utcnow()
-        )
-        db.session.add(new_result)
-        db.session.commit()
-        return new_result.ResultID
-    except Exception as e:
-        db.session.rollback()
-        raise e
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
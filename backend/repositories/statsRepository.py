@@ -0,0 +1,158 @@
+from extensions import db
+from models.imageModel import Image
+from models.ObjectRecognitionResultModel import ObjectRecognitionResult
+from models.detectionModel import Detection
+from models.detectionStatsModel import UserDailyStats, UserClassDailyStats
+from sqlalchemy import delete, func, insert, select
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+_DAILY_COUNTERS = ('Analyses', 'Objects', 'ConfidenceSum', 'InferenceTimeSumMs',
+                   'InferenceTimeCount', 'TotalTimeSumMs', 'TotalTimeCount')
+_CLASS_COUNTERS = ('Detections', 'ConfidenceSum')
+
+def _upsert_increments(model, keys: Tuple[str, ...], counters: Tuple[str, ...], rows: List[Dict]) -> None:
+    """
+    Soma os contadores das linhas às já existentes com um único INSERT ... ON
+    DUPLICATE KEY / ON CONFLICT (atômico entre workers). Não faz commit.
+    """
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(model).values(rows)
+        stmt = stmt.on_duplicate_key_update({
+            counter: getattr(model, counter) + stmt.inserted[counter] for counter in counters
+        })
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_={
+            counter: getattr(model, counter) + stmt.excluded[counter] for counter in counters
+        })
+    else:
+        # Bancos sem upsert: leitura e escrita dentro da transação corrente
+        for row in rows:
+            current = db.session.get(model, tuple(row[key] for key in keys))
+            if current is None:
+                db.session.add(model(**row))
+            else:
+                for counter in counters:
+                    setattr(current, counter, getattr(current, counter) + row[counter])
+        return
+    db.session.execute(stmt)
+
+def record_analyses_stats(analyses: List[Dict], analyzed_at: datetime) -> None:
+    """
+    Acrescenta as análises recém-gravadas aos resumos diários, dentro da
+    transação de quem chama (save_analyses). As linhas são agregadas antes,
+    de modo que cada chave aparece uma única vez no upsert.
+    """
+    day = analyzed_at.date()
+    daily: Dict[Tuple, Dict] = {}
+    classes: Dict[Tuple, Dict] = {}
+
+    for analysis in analyses:
+        user_id = int(analysis['user_id'])
+        row = daily.setdefault((user_id, day), dict(
+            {'UserID': user_id, 'Day': day}, **{counter: 0 for counter in _DAILY_COUNTERS}))
+        row['Analyses'] += 1
+        row['Objects'] += len(analysis['detected_objects'])
+        if analysis.get('inference_time') is not None:
+            row['InferenceTimeSumMs'] += analysis['inference_time']
+            row['InferenceTimeCount'] += 1
+        if analysis.get('total_time') is not None:
+            row['TotalTimeSumMs'] += analysis['total_time']
+            row['TotalTimeCount'] += 1
+
+        for obj in analysis['detected_objects']:
+            confidence = float(obj['confidence'])
+            row['ConfidenceSum'] += confidence
+            class_row = classes.setdefault((user_id, day, obj['class_name']), {
+                'UserID': user_id, 'Day': day, 'ClassName': obj['class_name'],
+                'Detections': 0, 'ConfidenceSum': 0.0})
+            class_row['Detections'] += 1
+            class_row['ConfidenceSum'] += confidence
+
+    # Ordem fixa das chaves reduz deadlocks entre upserts concorrentes
+    _upsert_increments(UserDailyStats, ('UserID', 'Day'), _DAILY_COUNTERS,
+                       [daily[key] for key in sorted(daily)])
+    _upsert_increments(UserClassDailyStats, ('UserID', 'Day', 'ClassName'), _CLASS_COUNTERS,
+                       [classes[key] for key in sorted(classes)])
+
+def rebuild_stats() -> Dict[str, int]:
+    """
+    Recalcula os resumos do zero a partir de ObjectRecognitionResults e Detections,
+    numa única transação. Rode depois do backfill de detecções; análises gravadas
+    durante a reconstrução podem ficar de fora até a próxima execução.
+    """
+    day = func.date(ObjectRecognitionResult.AnalyzedAt)
+    daily_select = (
+        select(
+            Image.UserID,
+            day,
+            func.count(ObjectRecognitionResult.ResultID),
+            func.coalesce(func.sum(ObjectRecognitionResult.ObjectsCount), 0),
+            # ConfidenceAvg = soma das confianças / número de objetos
+            func.coalesce(func.sum(ObjectRecognitionResult.ConfidenceAvg * ObjectRecognitionResult.ObjectsCount), 0),
+            func.coalesce(func.sum(ObjectRecognitionResult.InferenceTimeMs), 0),
+            func.count(ObjectRecognitionResult.InferenceTimeMs),
+            func.coalesce(func.sum(ObjectRecognitionResult.TotalTimeMs), 0),
+            func.count(ObjectRecognitionResult.TotalTimeMs)
+        )
+        .join(Image, Image.ImageID == ObjectRecognitionResult.ImageID)
+        .where(ObjectRecognitionResult.AnalyzedAt.isnot(None))
+        .group_by(Image.UserID, day)
+    )
+    class_day = func.date(ObjectRecognitionResult.AnalyzedAt)
+    class_select = (
+        select(
+            Detection.UserID,
+            class_day,
+            Detection.ClassName,
+            func.count(Detection.DetectionID),
+            func.sum(Detection.Confidence)
+        )
+        .join(ObjectRecognitionResult, ObjectRecognitionResult.ResultID == Detection.ResultID)
+        .where(ObjectRecognitionResult.AnalyzedAt.isnot(None))
+        .group_by(Detection.UserID, class_day, Detection.ClassName)
+    )
+
+    try:
+        db.session.execute(delete(UserClassDailyStats))
+        db.session.execute(delete(UserDailyStats))
+        daily = db.session.execute(insert(UserDailyStats).from_select(
+            ['UserID', 'Day', *_DAILY_COUNTERS], daily_select))
+        classes = db.session.execute(insert(UserClassDailyStats).from_select(
+            ['UserID', 'Day', 'ClassName', *_CLASS_COUNTERS], class_select))
+        db.session.commit()
+        return {'daily_rows': daily.rowcount, 'class_rows': classes.rowcount}
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def get_daily_stats(user_id: int, date_from: date, date_to: date) -> List[UserDailyStats]:
+    """Linhas diárias do usuário em [date_from, date_to], pela chave primária"""
+    return (UserDailyStats.query
+            .filter(UserDailyStats.UserID == user_id,
+                    UserDailyStats.Day >= date_from,
+                    UserDailyStats.Day <= date_to)
+            .order_by(UserDailyStats.Day)
+            .all())
+
+def get_class_stats(user_id: int, date_from: date, date_to: date) -> List[Tuple[str, int, float]]:
+    """(classe, detecções, soma das confianças) do usuário em [date_from, date_to]"""
+    return (db.session.query(
+                UserClassDailyStats.ClassName,
+                func.sum(UserClassDailyStats.Detections),
+                func.sum(UserClassDailyStats.ConfidenceSum))
+            .filter(UserClassDailyStats.UserID == user_id,
+                    UserClassDailyStats.Day >= date_from,
+                    UserClassDailyStats.Day <= date_to)
+            .group_by(UserClassDailyStats.ClassName)
+            .order_by(func.sum(UserClassDailyStats.Detections).desc())
+            .all())
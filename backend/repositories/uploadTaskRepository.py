@@ -0,0 +1,162 @@
+from extensions import db
+from models.imageModel import Image
+from models.ObjectRecognitionResultModel import ObjectRecognitionResult
+from models.detectionCacheModel import DetectionCacheEntry
+from models.uploadTaskModel import UploadTask
+from models.imageDerivativeModel import ImageDerivative
+from sqlalchemy import and_, func, or_
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+def create_upload_task(image_id: int, image_uuid: str, local_path: str) -> int:
+    """Registra uma tarefa de upload pendente e retorna o ID"""
+    try:
+        task = UploadTask(
+            ImageID=image_id,
+            ImageUUID=image_uuid,
+            LocalPath=local_path,
+            Status='pending',
+            Attempts=0,
+            NextAttemptAt=datetime.utcnow()
+        )
+        db.session.add(task)
+        db.session.commit()
+        return task.TaskID
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def claim_next_task(lease_seconds: int) -> Optional[UploadTask]:
+    """
+    Reserva a próxima tarefa pronta para execução.
+    Tarefas 'in_progress' com lease expirado (worker morto) voltam a ser elegíveis.
+    A reserva é um UPDATE condicional, seguro entre vários processos.
+    """
+    now = datetime.utcnow()
+    ready = or_(
+        and_(UploadTask.Status == 'pending', UploadTask.NextAttemptAt <= now),
+        and_(UploadTask.Status == 'in_progress',
+             UploadTask.UpdatedAt <= now - timedelta(seconds=lease_seconds))
+    )
+    try:
+        candidate = (db.session.query(UploadTask.TaskID)
+                     .filter(ready)
+                     .order_by(UploadTask.NextAttemptAt)
+                     .first())
+        if candidate is None:
+            db.session.rollback()
+            return None
+
+        claimed = (UploadTask.query
+                   .filter(UploadTask.TaskID == candidate.TaskID, ready)
+                   .update({
+                       UploadTask.Status: 'in_progress',
+                       UploadTask.Attempts: UploadTask.Attempts + 1,
+                       UploadTask.UpdatedAt: now
+                   }, synchronize_session=False))
+        db.session.commit()
+        if claimed != 1:
+            return None
+        return db.session.get(UploadTask, candidate.TaskID)
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def complete_task(task_id: int, remote_url: str) -> None:
+    """
+    Marca a tarefa como concluída e troca a URL local pela remota
+    em Images, ObjectRecognitionResults e DetectionCache, numa única transação.
+    """
+    try:
+        task = db.session.get(UploadTask, task_id)
+        local_path = task.LocalPath
+
+        Image.query.filter(Image.ImagePath == local_path).update(
+            {Image.ImagePath: remote_url}, synchronize_session=False)
+        ObjectRecognitionResult.query.filter(
+            ObjectRecognitionResult.ProcessedImagePath == local_path
+        ).update({ObjectRecognitionResult.ProcessedImagePath: remote_url}, synchronize_session=False)
+        DetectionCacheEntry.query.filter(
+            DetectionCacheEntry.ProcessedImagePath == local_path
+        ).update({DetectionCacheEntry.ProcessedImagePath: remote_url}, synchronize_session=False)
+
+        task.Status = 'done'
+        task.RemoteUrl = remote_url
+        task.LastError = None
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def reschedule_task(task_id: int, error: str, delay_seconds: float) -> None:
+    """Devolve a tarefa à fila com nova tentativa agendada"""
+    try:
+        UploadTask.query.filter_by(TaskID=task_id).update({
+            UploadTask.Status: 'pending',
+            UploadTask.LastError: error[:500],
+            UploadTask.NextAttemptAt: datetime.utcnow() + timedelta(seconds=delay_seconds)
+        }, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def fail_task(task_id: int, error: str) -> None:
+    """Marca a tarefa como falha definitiva; a imagem continua servida localmente"""
+    try:
+        UploadTask.query.filter_by(TaskID=task_id).update({
+            UploadTask.Status: 'failed',
+            UploadTask.LastError: error[:500]
+        }, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def get_remote_url(local_path: str) -> Optional[str]:
+    """URL remota de um arquivo local cujo upload já foi concluído, ou None"""
+    task = (db.session.query(UploadTask.RemoteUrl)
+            .filter(UploadTask.LocalPath == local_path, UploadTask.Status == 'done')
+            .first())
+    return task.RemoteUrl if task else None
+
+def find_unreferenced_paths(local_paths: List[str]) -> List[str]:
+    """
+    Dos arquivos locais informados, os que nenhuma imagem, resultado, entrada
+    do cache ou upload ainda pendente referencia. Uploads concluídos já
+    trocaram essas URLs pela remota, então seus arquivos entram aqui.
+    Variantes (ImageDerivatives) não contam: ver delete_derivatives_by_path.
+    """
+    if not local_paths:
+        return []
+    queries = [
+        db.session.query(Image.ImagePath).filter(Image.ImagePath.in_(local_paths)),
+        db.session.query(ObjectRecognitionResult.ProcessedImagePath)
+        .filter(ObjectRecognitionResult.ProcessedImagePath.in_(local_paths)),
+        db.session.query(DetectionCacheEntry.ProcessedImagePath)
+        .filter(DetectionCacheEntry.ProcessedImagePath.in_(local_paths)),
+        db.session.query(UploadTask.LocalPath)
+        .filter(UploadTask.LocalPath.in_(local_paths), UploadTask.Status.in_(('pending', 'in_progress')))
+    ]
+    referenced = {row[0] for query in queries for row in query.distinct()}
+    return [path for path in local_paths if path not in referenced]
+
+def delete_derivatives_by_path(local_paths: List[str]) -> int:
+    """Apaga as variantes que apontam para arquivos locais prestes a ser removidos"""
+    if not local_paths:
+        return 0
+    try:
+        deleted = ImageDerivative.query.filter(ImageDerivative.Path.in_(local_paths)).delete(
+            synchronize_session=False)
+        db.session.commit()
+        return deleted
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+def count_tasks_by_status() -> Dict[str, int]:
+    """Quantidade de tarefas por status"""
+    rows = (db.session.query(UploadTask.Status, func.count(UploadTask.TaskID))
+            .group_by(UploadTask.Status)
+            .all())
+    return {status: count for status, count in rows}
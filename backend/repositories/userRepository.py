@@ -1,5 +1,63 @@
 from models.userModel import User
-from extensions import db 
+from extensions import db
+from config.config import Config
+from collections import OrderedDict
+import threading
+import time
+
+
+class _UserCache:
+    """
+    Cache LRU com TTL curto de usuários já carregados, por id e por email.
+    Guarda instâncias desanexadas da sessão (expunge), que continuam legíveis
+    depois que a sessão da requisição é encerrada.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def put(self, user) -> None:
+        if self.ttl_seconds <= 0 or user is None:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key in (('id', user.UserID), ('email', user.Email)):
+                self._entries[key] = (user, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None, email=None) -> None:
+        with self._lock:
+            self._entries.pop(('id', user_id), None)
+            self._entries.pop(('email', email), None)
+
+
+_user_cache = _UserCache(Config.USER_CACHE_TTL_SECONDS, Config.USER_CACHE_MAX_ENTRIES)
+
+def _remember(user):
+    if user is not None:
+        # Desanexa para que commits de outras operações não expirem os atributos
+        db.session.expunge(user)
+        _user_cache.put(user)
+    return user
 
 def create_user(email, password_hash, name):
     try:
@@ -8,16 +66,31 @@ def create_user(email, password_hash, name):
             FullName=name,
             PasswordHash=password_hash
         )
-        
+
         db.session.add(new_user)
         db.session.commit()
+        _user_cache.invalidate(new_user.UserID, email)
         return new_user
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Erro ao salvar o usuário: {str(e)}")
 
 def get_user_by_email(email):
-    return User.query.filter_by(Email=email).first()
+    cached = _user_cache.get(('email', email))
+    if cached is not None:
+        return cached
+    return _remember(User.query.filter_by(Email=email).first())
 
 def get_user_by_id(user_id):
-    return User.query.get(user_id)
\ No newline at end of file
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    cached = _user_cache.get(('id', user_id))
+    if cached is not None:
+        return cached
+    return _remember(db.session.get(User, user_id))
+
+def invalidate_user_cache(user_id=None, email=None):
+    """Descarta as entradas em cache de um usuário (após alterações)"""
+    _user_cache.invalidate(user_id, email)
@@ -1,7 +1,118 @@
 from marshmallow import Schema, ValidationError, fields, validates_schema
-from flask import request, jsonify
+from flask import Request, current_app, request, jsonify
 from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import BadRequest
+from config.config import Config
+from services.imageDecodeService import probe_image_size
 import os
+import zipfile
+
+ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+IMAGE_SIGNATURES = (b'\x89PNG\r\n\x1a\n', b'\xff\xd8\xff')  # PNG, JPEG
+ZIP_SIGNATURE = b'PK\x03\x04'
+
+class UploadRejected(BadRequest):
+    """Upload recusado durante o streaming do corpo, antes de o restante ser lido"""
+
+    def __init__(self, message: str, field_name: str = 'image'):
+        super().__init__(description=message)
+        self.field_name = field_name
+
+class ImageSniffingStream:
+    """
+    Destino de um arquivo do multipart que inspeciona os primeiros bytes à
+    medida que chegam: assinatura (PNG/JPEG, ou ZIP para .zip) e dimensões
+    declaradas no cabeçalho, com limite de pixels. Com `fail_fast` uma falha
+    interrompe o parsing do corpo na hora; sem ele (lotes) a falha fica em
+    `rejection` e é informada só para este arquivo. O conteúdo vai para o
+    stream padrão do Werkzeug.
+    """
+
+    def __init__(self, stream, filename: str, max_pixels: int, sniff_bytes: int, fail_fast: bool = True):
+        self._stream = stream
+        self.is_archive = (filename or '').lower().endswith('.zip')
+        self.max_pixels = max_pixels
+        self.sniff_bytes = sniff_bytes
+        self.fail_fast = fail_fast
+        self._head = bytearray()
+        self.dimensions = None
+        self.rejection = None
+        self._validated = False
+
+    def _reject(self, message: str, field_name: str = 'image') -> None:
+        if self.fail_fast:
+            raise UploadRejected(message, field_name=field_name)
+        # Nada mais a inspecionar: o restante do arquivo só é repassado ao stream
+        self.rejection = message
+        self._validated = True
+
+    def _inspect(self, complete: bool = False) -> None:
+        head = bytes(self._head)
+        if complete and not head:
+            return self._reject("O arquivo enviado está vazio", field_name='archive' if self.is_archive else 'image')
+        if self.is_archive:
+            if len(head) >= len(ZIP_SIGNATURE) or complete:
+                if not head.startswith(ZIP_SIGNATURE):
+                    return self._reject("O arquivo enviado não é um .zip válido", field_name='archive')
+                self._validated = True
+            return
+
+        if len(head) < 8 and not complete:
+            return
+        if not head.startswith(IMAGE_SIGNATURES):
+            return self._reject("O conteúdo do arquivo não é uma imagem PNG ou JPEG")
+
+        size = probe_image_size(head)
+        if size is None:
+            if complete or len(head) >= self.sniff_bytes:
+                return self._reject("Cabeçalho da imagem corrompido ou sem dimensões")
+            return
+
+        width, height = size
+        if width == 0 or height == 0:
+            return self._reject("A imagem declara dimensões inválidas")
+        if width * height > self.max_pixels:
+            return self._reject(f"Imagem de {width}x{height} excede o limite de {self.max_pixels} pixels")
+        self.dimensions = size
+        self._validated = True
+
+    def write(self, data) -> int:
+        if not self._validated:
+            self._head.extend(data)
+            self._inspect()
+            if self._validated:
+                self._head = bytearray()
+        return self._stream.write(data)
+
+    def seek(self, *args):
+        # O Werkzeug volta ao início quando o arquivo termina: cabeçalho incompleto é recusado aqui
+        if not self._validated:
+            self._inspect(complete=True)
+            self._head = bytearray()
+        return self._stream.seek(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def per_item_upload_errors(func):
+    """
+    Marca rotas de lote: arquivos recusados na inspeção não derrubam o envio
+    inteiro, cada um é informado no seu item (ver collect_batch_uploads)
+    """
+    func.per_item_upload_errors = True
+    return func
+
+class ImageUploadRequest(Request):
+    """Request cujos arquivos de formulário passam por ImageSniffingStream"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        if not filename:
+            # Campo de arquivo sem seleção: a validação do schema informa o erro
+            return stream
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        return ImageSniffingStream(stream, filename, Config.UPLOAD_MAX_PIXELS, Config.UPLOAD_SNIFF_MAX_BYTES,
+                                   fail_fast=not getattr(view, 'per_item_upload_errors', False))
 
 class FileValidationSchema(Schema):
     image = fields.Field(
@@ -25,7 +136,6 @@ class FileValidationSchema(Schema):
         if not isinstance(file, FileStorage):
             raise ValidationError("O arquivo enviado não é válido", field_name="image")
         
-        allowed_extensions = {'png', 'jpg', 'jpeg'}
         filename = file.filename.lower()
         
         if '.' not in filename:
@@ -33,7 +143,7 @@ class FileValidationSchema(Schema):
             
         extension = filename.rsplit('.', 1)[1]
         
-        if extension not in allowed_extensions:
+        if extension not in ALLOWED_IMAGE_EXTENSIONS:
             raise ValidationError(
                 "Formato de arquivo não suportado. Use apenas: PNG, JPG ou JPEG", 
                 field_name="image"
@@ -59,6 +169,15 @@ def validate_image_upload(func):
                 return jsonify(formatted_errors), 400
                 
             return func(*args, **kwargs)
+
+        except UploadRejected as err:
+            # Recusado durante o streaming: o restante do corpo não foi lido
+            return jsonify({
+                "erro": {
+                    "mensagem": "Validação falhou",
+                    "erros": {err.field_name: err.description}
+                }
+            }), 400
             
         except ValidationError as err:
             error_response = {
@@ -82,4 +201,59 @@ def validate_image_upload(func):
     
     wrapper.__name__ = func.__name__
     wrapper.__doc__ = func.__doc__
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def _has_allowed_extension(filename: str) -> bool:
+    filename = (filename or '').lower()
+    return '.' in filename and filename.rsplit('.', 1)[1] in ALLOWED_IMAGE_EXTENSIONS
+
+def _rejected_reader(message: str):
+    def read():
+        raise ValueError(message)
+    return read
+
+def collect_batch_uploads(files, max_images: int, max_image_bytes: int) -> list:
+    """
+    Valida um envio em lote (vários campos 'images' e/ou um 'archive' .zip)
+    e retorna uma lista de (nome, leitor) em que o leitor devolve os bytes
+    sob demanda, para que o conteúdo só seja lido quando processado.
+    Imagens recusadas na inspeção do streaming têm um leitor que levanta
+    ValueError com o motivo, informado no item correspondente.
+    """
+    uploads = []
+
+    for file in files.getlist('images'):
+        if not isinstance(file, FileStorage) or not file.filename.strip():
+            raise ValidationError("Arquivo de imagem inválido no lote", field_name="images")
+        if not _has_allowed_extension(file.filename):
+            raise ValidationError(
+                f"Formato não suportado em '{file.filename}'. Use apenas: PNG, JPG ou JPEG",
+                field_name="images"
+            )
+        rejection = getattr(file.stream, 'rejection', None)
+        uploads.append((file.filename, _rejected_reader(rejection) if rejection else file.read))
+
+    archive = files.get('archive')
+    if archive is not None and archive.filename:
+        if not archive.filename.lower().endswith('.zip'):
+            raise ValidationError("O arquivo compactado deve ser .zip", field_name="archive")
+        try:
+            zip_file = zipfile.ZipFile(archive.stream)
+        except zipfile.BadZipFile:
+            raise ValidationError("Arquivo .zip corrompido", field_name="archive")
+
+        for info in zip_file.infolist():
+            if info.is_dir() or not _has_allowed_extension(info.filename):
+                continue
+            if info.file_size > max_image_bytes:
+                raise ValidationError(
+                    f"'{info.filename}' excede o tamanho máximo por imagem", field_name="archive"
+                )
+            uploads.append((info.filename, lambda info=info: zip_file.read(info)))
+
+    if not uploads:
+        raise ValidationError("Nenhuma imagem foi enviada", field_name="images")
+    if len(uploads) > max_images:
+        raise ValidationError(f"O lote pode ter no máximo {max_images} imagens", field_name="images")
+
+    return uploads
@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from services.benchmarkUtils import percentile
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class BatchingStats:
+    """Estatísticas de tamanho de lote e tempo de espera na fila"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._waits_ms = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self._size_histogram: Dict[int, int] = {}
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+
+    def record_batch(self, size: int, waits_ms: List[float]) -> None:
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            self._batch_sizes.append(size)
+            self._size_histogram[size] = self._size_histogram.get(size, 0) + 1
+            self._waits_ms.extend(waits_ms)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            waits = list(self._waits_ms)
+            sizes = list(self._batch_sizes)
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'errors': self.errors,
+                'avg_batch_size': round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+                'batch_size_histogram': dict(sorted(self._size_histogram.items())),
+                'queue_wait_ms': {
+                    'avg': round(sum(waits) / len(waits), 3) if waits else 0.0,
+                    'p50': round(percentile(waits, 50), 3),
+                    'p95': round(percentile(waits, 95), 3),
+                    'max': round(max(waits), 3) if waits else 0.0
+                }
+            }
+
+
+class _PendingItem:
+    __slots__ = ('payload', 'future', 'enqueued_at')
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatchScheduler:
+    """
+    Agrupa requisições concorrentes em lotes: espera até `max_wait_ms` ou até
+    `max_batch_size` itens, executa uma única inferência em lote e devolve
+    cada resultado ao seu chamador através de um Future.
+    """
+
+    def __init__(self, runner: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0,
+                 name: str = 'inference-batcher', concurrency: int = 1):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size deve ser maior ou igual a 1")
+        self.runner = runner
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        # Lotes despachados em paralelo (ex.: um por réplica do detector)
+        self.concurrency = max(1, concurrency)
+        self._dispatch_slots = threading.Semaphore(self.concurrency)
+        self._executor = (ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=name)
+                          if self.concurrency > 1 else None)
+        self.stats = BatchingStats()
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+            logger.info(f"Agendador de lotes iniciado (lote máx={self.max_batch_size}, "
+                        f"espera máx={self.max_wait * 1000:.1f}ms)")
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def submit(self, payload: Any) -> Future:
+        """Enfileira um item e retorna um Future com o seu resultado"""
+        if not self._thread or not self._thread.is_alive():
+            self.start()
+        item = _PendingItem(payload)
+        with self._cond:
+            self._queue.append(item)
+            self._cond.notify()
+        return item.future
+
+    def _collect_batch(self) -> List[_PendingItem]:
+        with self._cond:
+            while not self._queue and not self._stopped:
+                self._cond.wait()
+            if self._stopped and not self._queue:
+                return []
+
+            # O prazo conta a partir da chegada do primeiro item do lote
+            deadline = self._queue[0].enqueued_at + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._stopped:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            while self._queue and len(batch) < self.max_batch_size:
+                batch.append(self._queue.popleft())
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            # Só forma o próximo lote quando houver capacidade para executá-lo
+            self._dispatch_slots.acquire()
+            batch = self._collect_batch()
+            if not batch:
+                self._dispatch_slots.release()
+                return
+
+            if self._executor:
+                self._executor.submit(self._run_batch, batch)
+            else:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_PendingItem]) -> None:
+        try:
+            started = time.perf_counter()
+            waits_ms = [(started - item.enqueued_at) * 1000 for item in batch]
+            try:
+                outputs = self.runner([item.payload for item in batch])
+                if len(outputs) != len(batch):
+                    raise RuntimeError(
+                        f"Lote retornou {len(outputs)} resultados para {len(batch)} entradas")
+            except Exception as e:
+                logger.error(f"Falha na inferência em lote: {str(e)}", exc_info=True)
+                self.stats.record_error()
+                for item in batch:
+                    item.future.set_exception(e)
+                return
+
+            self.stats.record_batch(len(batch), waits_ms)
+            for item, output in zip(batch, outputs):
+                item.future.set_result(output)
+        finally:
+            self._dispatch_slots.release()
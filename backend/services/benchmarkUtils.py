@@ -0,0 +1,31 @@
+import os
+from pathlib import Path
+from typing import List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil pelo vizinho mais próximo (0.0 para uma lista vazia)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def validation_images(data_yaml: Path, limit: int) -> List[str]:
+    """Imagens do split de validação declarado no YAML do dataset"""
+    import yaml
+
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    root = Path(data.get('path') or Path(data_yaml).parent)
+    val = Path(data['val'])
+    val_dir = val if val.is_absolute() else root / val
+
+    images = []
+    for dirpath, _, filenames in os.walk(val_dir):
+        for name in sorted(filenames):
+            if name.lower().endswith(('.jpg', '.jpeg', '.png')):
+                images.append(os.path.join(dirpath, name))
+                if len(images) >= limit:
+                    return images
+    return images
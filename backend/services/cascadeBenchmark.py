@@ -0,0 +1,119 @@
+import json
+import time
+import argparse
+import logging
+from pathlib import Path
+from typing import Dict, List
+from config.config import Config
+from services.benchmarkUtils import percentile, validation_images
+from services.inferenceBackends import compare_detections
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _latency_summary(values: List[float]) -> Dict:
+    return {
+        'mean': round(sum(values) / len(values), 2) if values else 0.0,
+        'p50': round(percentile(values, 50), 2),
+        'p95': round(percentile(values, 95), 2)
+    }
+
+def benchmark_cascade(small_weights: str, large_weights: str, data_yaml: str, images: int = 200,
+                      min_confidence: float = None, min_objects: int = None, warmup: int = 3) -> Dict:
+    """
+    Mede, nas mesmas imagens de validação, o modelo grande sozinho e a cascata:
+    taxa de escalonamento, latência e tempo de CPU por requisição em cada nível,
+    e a concordância das caixas da cascata com as do modelo grande.
+    """
+    from services.detectObjectService import YOLOv8Detector, CascadeDetector
+
+    small = YOLOv8Detector(small_weights)
+    large = YOLOv8Detector(large_weights)
+    small.load_model()
+    large.load_model()
+    cascade = CascadeDetector(
+        small, large,
+        min_confidence=Config.YOLO_CASCADE_MIN_CONFIDENCE if min_confidence is None else min_confidence,
+        min_objects=Config.YOLO_CASCADE_MIN_OBJECTS if min_objects is None else min_objects
+    )
+
+    paths = validation_images(Path(data_yaml), images + warmup)
+    for img_path in paths[:warmup]:
+        large.detect(img_path)
+        cascade.detect(img_path)
+
+    latencies = {'large_only': [], 'cascade': [], 'cascade_small': [], 'cascade_large': []}
+    cpu_ms = {'large_only': [], 'cascade': []}
+    agreement = {'small': [], 'large': []}
+
+    for img_path in paths[warmup:]:
+        cpu_started, started = time.process_time(), time.perf_counter()
+        _, large_objects, _ = large.detect(img_path)
+        latencies['large_only'].append((time.perf_counter() - started) * 1000)
+        cpu_ms['large_only'].append((time.process_time() - cpu_started) * 1000)
+
+        cpu_started, started = time.process_time(), time.perf_counter()
+        _, cascade_objects, metrics = cascade.detect(img_path)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        latencies['cascade'].append(elapsed_ms)
+        latencies[f"cascade_{metrics['tier']}"].append(elapsed_ms)
+        cpu_ms['cascade'].append((time.process_time() - cpu_started) * 1000)
+
+        comparison = compare_detections(large_objects, cascade_objects, min_iou=0.5, max_conf_delta=1.0)
+        agreement[metrics['tier']].append(comparison['passed'])
+
+    measured = len(latencies['cascade'])
+    escalated = len(latencies['cascade_large'])
+    return {
+        'small_weights': str(small_weights),
+        'large_weights': str(large_weights),
+        'min_confidence': cascade.min_confidence,
+        'min_objects': cascade.min_objects,
+        'images': measured,
+        'escalation_rate': round(escalated / measured, 4) if measured else 0.0,
+        'latency_ms': {name: _latency_summary(values) for name, values in latencies.items()},
+        'cpu_ms_per_request': {name: _latency_summary(values) for name, values in cpu_ms.items()},
+        # Fração das imagens em que a cascata encontrou as mesmas caixas (IoU >= 0.5) que o modelo grande
+        'agreement_with_large': {
+            tier: round(sum(values) / len(values), 4) if values else None
+            for tier, values in agreement.items()
+        }
+    }
+
+def format_report(report: Dict) -> str:
+    latency, cpu = report['latency_ms'], report['cpu_ms_per_request']
+    lines = [
+        f"Cascata {report['small_weights']} -> {report['large_weights']} "
+        f"(confiança mín.={report['min_confidence']}, objetos mín.={report['min_objects']})",
+        f"Imagens: {report['images']}  escalonamento: {report['escalation_rate'] * 100:.1f}%",
+        f"{'caminho':<16}{'média ms':>10}{'p50 ms':>9}{'p95 ms':>9}",
+    ]
+    for name in ('large_only', 'cascade', 'cascade_small', 'cascade_large'):
+        lines.append(f"{name:<16}{latency[name]['mean']:>10.1f}{latency[name]['p50']:>9.1f}{latency[name]['p95']:>9.1f}")
+    saving = 1 - cpu['cascade']['mean'] / cpu['large_only']['mean'] if cpu['large_only']['mean'] else 0.0
+    lines.append(f"CPU por requisição: grande={cpu['large_only']['mean']:.1f}ms "
+                 f"cascata={cpu['cascade']['mean']:.1f}ms ({saving * 100:.1f}% menos)")
+    lines.append(f"Concordância com o grande: {report['agreement_with_large']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python -m services.cascadeBenchmark --min-confidence 0.5 --min-objects 1
+    parser = argparse.ArgumentParser(description="Taxa de escalonamento e divisão de latência da cascata")
+    parser.add_argument('--small', default=str(Config.YOLO_CASCADE_SMALL_WEIGHTS))
+    parser.add_argument('--large', default=str(Config.YOLO_WEIGHTS_PATH))
+    parser.add_argument('--data', default=str(Config.YOLO_DATASET_YAML))
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--min-confidence', type=float, default=None)
+    parser.add_argument('--min-objects', type=int, default=None)
+    parser.add_argument('--output', default=None, help="Grava o relatório completo em JSON")
+    args = parser.parse_args()
+
+    report = benchmark_cascade(args.small, args.large, args.data, args.images,
+                               args.min_confidence, args.min_objects)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
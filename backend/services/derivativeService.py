@@ -0,0 +1,151 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import cv2
+import numpy as np
+from config.config import Config
+from repositories.imageDerivativeRepository import save_derivatives, copy_derivatives_from_source
+from services.imageStoreService import image_store, PUBLIC_URL_PREFIX
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_ENCODERS = {
+    'jpeg': ('.jpg', lambda quality: [cv2.IMWRITE_JPEG_QUALITY, quality]),
+    'webp': ('.webp', lambda quality: [cv2.IMWRITE_WEBP_QUALITY, quality])
+}
+
+
+def build_derivatives(image: np.ndarray, sizes: Dict[str, int], formats: List[str],
+                      quality: int = 80) -> List[Dict]:
+    """
+    Gera as variantes (maior lado limitado por tamanho, sem ampliar) em cada
+    formato e as grava no armazenamento endereçado por conteúdo.
+    """
+    height, width = image.shape[:2]
+    derivatives = []
+    for size, max_side in sorted(sizes.items(), key=lambda item: -item[1]):
+        ratio = min(1.0, max_side / max(width, height))
+        resized = image if ratio == 1.0 else cv2.resize(
+            image, (max(1, round(width * ratio)), max(1, round(height * ratio))),
+            interpolation=cv2.INTER_AREA
+        )
+        for image_format in formats:
+            extension, params = _ENCODERS[image_format]
+            success, encoded = cv2.imencode(extension, resized, params(quality))
+            if not success:
+                raise ValueError(f"Falha ao codificar a variante {size}/{image_format}")
+            data = encoded.tobytes()
+            derivatives.append({
+                'size': size,
+                'format': image_format,
+                'path': image_store.put(data, extension),
+                'width': resized.shape[1],
+                'height': resized.shape[0],
+                'size_bytes': len(data)
+            })
+    return derivatives
+
+
+class DerivativeGenerator:
+    """
+    Etapa em segundo plano que gera miniaturas/variantes das imagens processadas.
+    A fila é limitada: quando está cheia a variante é descartada e os clientes
+    continuam recebendo a imagem em tamanho original.
+    """
+
+    def __init__(self, sizes: Dict[str, int], formats: List[str], workers: int = 1,
+                 max_pending: int = 64, enabled: bool = True):
+        self.sizes = sizes
+        self.formats = formats
+        self.workers = workers
+        self.enabled = enabled
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._counters = {'generated': 0, 'copied': 0, 'dropped': 0, 'failed': 0}
+
+    def _ensure_executor(self) -> None:
+        # Threads não sobrevivem ao fork do gunicorn: um executor por processo
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers),
+                                                    thread_name_prefix='derivatives')
+                self._pending = threading.BoundedSemaphore(self.max_pending)
+                self._pid = os.getpid()
+
+    def _count(self, counter: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] += value
+
+    def submit(self, app, result_id: int, image: Optional[np.ndarray] = None,
+               source_url: Optional[str] = None) -> bool:
+        """
+        Agenda as variantes de um resultado: a partir da imagem anotada em memória
+        ou, em acertos de cache, copiando as de outro resultado com a mesma `source_url`.
+        """
+        if not self.enabled:
+            return False
+        self._ensure_executor()
+        if not self._pending.acquire(blocking=False):
+            self._count('dropped')
+            return False
+        self._executor.submit(self._run, app, result_id, image, source_url)
+        return True
+
+    @staticmethod
+    def _load_stored(source_url: str) -> Optional[np.ndarray]:
+        """Imagem processada gravada no armazenamento local, ou None se não estiver lá"""
+        if not source_url or not source_url.startswith(PUBLIC_URL_PREFIX):
+            return None
+        return cv2.imread(image_store.path_for_url(source_url), cv2.IMREAD_COLOR)
+
+    def _run(self, app, result_id: int, image: Optional[np.ndarray], source_url: Optional[str]) -> None:
+        from extensions import db
+        try:
+            derivatives = build_derivatives(image, self.sizes, self.formats) if image is not None else None
+            with app.app_context():
+                if derivatives is None:
+                    copied = copy_derivatives_from_source(result_id, source_url)
+                    self._count('copied', copied)
+                    if not copied:
+                        # Origem ainda sem variantes (ou não encontrada): gera a partir do arquivo gravado
+                        stored = self._load_stored(source_url)
+                        if stored is None:
+                            logger.warning(f"Sem origem para as variantes do resultado {result_id} ({source_url})")
+                        else:
+                            derivatives = build_derivatives(stored, self.sizes, self.formats)
+                if derivatives is not None:
+                    save_derivatives(result_id, derivatives)
+                    self._count('generated', len(derivatives))
+                db.session.remove()
+        except Exception as e:
+            logger.error(f"Falha ao gerar variantes do resultado {result_id}: {str(e)}", exc_info=True)
+            self._count('failed')
+        finally:
+            self._pending.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters.update({'enabled': self.enabled, 'sizes': self.sizes, 'formats': self.formats})
+        return counters
+
+
+# Instância global
+derivative_generator = DerivativeGenerator(
+    sizes=Config.DERIVATIVE_SIZES,
+    formats=Config.DERIVATIVE_FORMATS,
+    workers=Config.DERIVATIVE_WORKERS,
+    max_pending=Config.DERIVATIVE_MAX_PENDING,
+    enabled=Config.DERIVATIVES_ENABLED
+)
+
+def get_derivative_stats() -> Dict:
+    """Variantes geradas, copiadas, descartadas (fila cheia) e com falha"""
+    return derivative_generator.stats()
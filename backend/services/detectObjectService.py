@@ -1,82 +1,628 @@
 import os
+import hashlib
+import threading
 import cv2
-from ultralytics import YOLO
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import logging
-from typing import Tuple, List, Dict, Union
+import time
+from typing import Tuple, List, Dict, Iterator, Optional, Union
 import numpy as np
 from config.config import Config
+from services.batchSchedulerService import MicroBatchScheduler
+from services.inferenceBackends import resolve_model_artifact
+from services.detectorPoolService import DetectorPool, PoolRetiredError
 
 logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def compute_weights_checksum(weights_path: Union[str, os.PathLike], chunk_size: int = 1024 * 1024) -> str:
+    """Calcula o SHA-256 de um arquivo de pesos, lendo em blocos"""
+    digest = hashlib.sha256()
+    with open(weights_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def compute_model_version(weights_path: Union[str, os.PathLike], backend: str) -> str:
+    """
+    Identidade de um modelo: o checksum dos pesos. Backends exportados recebem
+    uma identidade própria, derivada do .pt de origem.
+    """
+    checksum = compute_weights_checksum(weights_path)
+    if backend != 'torch':
+        checksum = hashlib.sha256(f"{checksum}:{backend}".encode()).hexdigest()
+    return checksum
+
 class YOLOv8Detector:
-    def __init__(self, weights_path: str = None):
+    def __init__(self, weights_path: str = None, backend: str = None):
         self.weights_path = weights_path or Config.YOLO_WEIGHTS_PATH
+        self.backend = backend or Config.YOLO_BACKEND
         self.model = None
+        self._model_version = None
+
+    @property
+    def model_version(self) -> str:
+        """
+        Identidade dos pesos carregados (ver compute_model_version), calculada uma única vez
+        """
+        if self._model_version is None:
+            self._model_version = compute_model_version(self.weights_path, self.backend)
+        return self._model_version
+
+    def clone(self) -> 'YOLOv8Detector':
+        """Nova instância (ainda não carregada) com os mesmos pesos e backend"""
+        return YOLOv8Detector(self.weights_path, self.backend)
 
     def load_model(self) -> None:
-        """Carrega o modelo YOLOv8 a partir dos pesos fornecidos."""
-        if os.path.exists(self.weights_path):
-            logger.info(f"Carregando modelo de {self.weights_path}")
-            self.model = YOLO(self.weights_path)
+        """Carrega o modelo YOLOv8 a partir dos pesos fornecidos, no backend configurado."""
+        artifact = resolve_model_artifact(self.weights_path, self.backend)
+        if os.path.exists(artifact):
+            logger.info(f"Carregando modelo de {artifact} (backend: {self.backend})")
+            # Import tardio: ultralytics/torch só são carregados quando o modelo é necessário
+            from ultralytics import YOLO
+
+            # O ultralytics carrega .pt, .onnx e diretórios OpenVINO pela mesma API,
+            # o que mantém o formato de detected_objects idêntico entre backends
+            self.model = YOLO(str(artifact), task='detect')
         else:
-            logger.error(f"Arquivo de pesos não encontrado: {self.weights_path}")
-            raise FileNotFoundError(f"Arquivo de pesos não encontrado: {self.weights_path}")
+            logger.error(f"Arquivo de pesos não encontrado: {artifact}")
+            if self.backend != 'torch':
+                logger.error("Gere o artefato com: python -m services.inferenceBackends export "
+                             f"--backends {self.backend}")
+            raise FileNotFoundError(f"Arquivo de pesos não encontrado: {artifact}")
 
-    def detect(self, image_path: Union[str, np.ndarray]) -> Tuple[np.ndarray, List[Dict], Dict]:
+    def _parse_result(self, result, render: bool = True) -> Tuple[Optional[np.ndarray], List[Dict], Dict]:
         """
-        Detecta objetos em uma imagem e retorna a imagem com deteções,
-        os objetos detectados e as métricas de tempo.
+        Converte um resultado do ultralytics em imagem anotada, objetos e métricas.
+        Com render=False a imagem anotada não é desenhada (retorna None).
         """
-        if not self.model:
-            raise ValueError("Modelo não carregado. Chame load_model() primeiro.")
-
-        results = self.model(image_path)
-        detection_img = results[0].plot()
+        detection_img = result.plot() if render else None
         detected_objects = []
 
-        for box in results[0].boxes:
+        for box in result.boxes:
             detected_objects.append({
                 'class_id': int(box.cls),
-                'class_name': results[0].names[int(box.cls)],
+                'class_name': result.names[int(box.cls)],
                 'confidence': float(box.conf),
                 'bbox': box.xyxy[0].tolist()
             })
 
         metrics = {
-            'inference_time': results[0].speed.get('inference'),
-            'total_time': sum(results[0].speed.values())  
+            'inference_time': result.speed.get('inference'),
+            'total_time': sum(result.speed.values()),
+            'model_version': self.model_version  # Versão que de fato produziu o resultado
         }
 
         return detection_img, detected_objects, metrics
 
-    def batch_detect(self, images_dir: str, output_dir: str = None) -> List[Dict]:
-        """Detecta objetos em todas as imagens de um diretório."""
+    def detect(self, image_path: Union[str, np.ndarray], imgsz: int = None,
+               render: bool = True) -> Tuple[Optional[np.ndarray], List[Dict], Dict]:
+        """
+        Detecta objetos em uma imagem e retorna a imagem com deteções,
+        os objetos detectados e as métricas de tempo.
+        `imgsz` sobrepõe o tamanho de entrada padrão do modelo.
+        """
+        if not self.model:
+            raise ValueError("Modelo não carregado. Chame load_model() primeiro.")
+
+        results = self.model(image_path, **({'imgsz': imgsz} if imgsz else {}))
+        return self._parse_result(results[0], render)
+
+    def detect_batch(self, images: List[Union[str, np.ndarray]], imgsz: int = None,
+                     render: bool = True) -> List[Tuple[Optional[np.ndarray], List[Dict], Dict]]:
+        """
+        Detecta objetos em várias imagens com uma única passada do modelo.
+        Retorna uma tupla (imagem, objetos, métricas) por entrada, na mesma ordem.
+        """
+        if not self.model:
+            raise ValueError("Modelo não carregado. Chame load_model() primeiro.")
+        if not images:
+            return []
+
+        results = self.model(list(images), **({'imgsz': imgsz} if imgsz else {}))
+        return [self._parse_result(result, render) for result in results]
+
+    @staticmethod
+    def _iter_image_paths(images_dir: str) -> Iterator[str]:
+        """Lista o diretório de forma preguiçosa (os.scandir), sem montar a lista inteira"""
+        with os.scandir(images_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(('.jpg', '.png', '.jpeg')):
+                    yield entry.path
+
+    @staticmethod
+    def _read_image(img_path: str) -> np.ndarray:
+        image = cv2.imread(img_path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Não foi possível decodificar {img_path}")
+        return image
+
+    def iter_batch_detect(self, images_dir: str, output_dir: str = None, batch_size: int = 8,
+                          decode_workers: int = None, write_workers: int = 2,
+                          prefetch_batches: int = 2) -> Iterator[Dict]:
+        """
+        Versão em pipeline de batch_detect: um pool de threads lê e decodifica
+        imagens à frente, a inferência roda em lotes e as imagens anotadas são
+        gravadas por um pool separado. Os resultados são produzidos à medida que
+        cada lote termina, com memória limitada pela janela de prefetch e pela
+        fila de escrita.
+        """
         if not os.path.exists(images_dir):
             raise FileNotFoundError(f"Diretório não encontrado: {images_dir}")
 
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        results = []
-        for img_path in [os.path.join(images_dir, f) for f in os.listdir(images_dir) 
-                        if f.lower().endswith(('.jpg', '.png', '.jpeg'))]:
+        batch_size = max(1, batch_size)
+        decode_workers = decode_workers or min(8, os.cpu_count() or 1)
+        max_prefetch = batch_size * max(1, prefetch_batches)
+        write_slots = threading.BoundedSemaphore(max(1, write_workers) * 4)
+
+        def write_output(output_path: str, image: np.ndarray) -> None:
             try:
-                detection_img, objects, metrics = self.detect(img_path)
-                if output_dir:
-                    output_path = os.path.join(output_dir, os.path.basename(img_path))
-                    cv2.imwrite(output_path, detection_img)
-                results.append({'path': img_path, 'objects': objects, 'metrics': metrics})
+                if not cv2.imwrite(output_path, image):
+                    logger.error(f"Falha ao gravar {output_path}")
             except Exception as e:
-                logger.error(f"Erro ao processar {img_path}: {str(e)}")
+                logger.error(f"Erro ao gravar {output_path}: {str(e)}")
+            finally:
+                write_slots.release()
+
+        paths = self._iter_image_paths(images_dir)
+        decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix='batch-decode')
+        write_pool = ThreadPoolExecutor(max_workers=max(1, write_workers), thread_name_prefix='batch-write')
+        pending = deque()
+
+        def fill_prefetch() -> None:
+            while len(pending) < max_prefetch:
+                img_path = next(paths, None)
+                if img_path is None:
+                    return
+                pending.append((img_path, decode_pool.submit(self._read_image, img_path)))
+
+        try:
+            fill_prefetch()
+            while pending:
+                batch = []
+                while pending and len(batch) < batch_size:
+                    img_path, future = pending.popleft()
+                    try:
+                        batch.append((img_path, future.result()))
+                    except Exception as e:
+                        logger.error(f"Erro ao processar {img_path}: {str(e)}")
+
+                # Repõe a janela antes da inferência para que a decodificação siga em paralelo
+                fill_prefetch()
+                if not batch:
+                    continue
+
+                try:
+                    outputs = self.detect_batch([image for _, image in batch])
+                except Exception as e:
+                    logger.error(f"Erro na inferência do lote: {str(e)}")
+                    continue
+
+                for (img_path, _), (detection_img, objects, metrics) in zip(batch, outputs):
+                    if output_dir:
+                        output_path = os.path.join(output_dir, os.path.basename(img_path))
+                        write_slots.acquire()
+                        write_pool.submit(write_output, output_path, detection_img)
+                    yield {'path': img_path, 'objects': objects, 'metrics': metrics}
+        finally:
+            for _, future in pending:
+                future.cancel()
+            decode_pool.shutdown(wait=True)
+            write_pool.shutdown(wait=True)
+
+    def batch_detect(self, images_dir: str, output_dir: str = None) -> List[Dict]:
+        """Detecta objetos em todas as imagens de um diretório."""
+        return list(self.iter_batch_detect(images_dir, output_dir))
+
+    def warm_up(self, runs: int = 1, imgsz: int = 640) -> None:
+        """Inferências sobre uma imagem sintética para pagar o custo da primeira execução"""
+        synthetic = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+        for _ in range(max(0, runs)):
+            self.detect(synthetic)
+
+class CascadeStats:
+    """Contadores compartilhados pelas réplicas da cascata"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.images = 0
+        self.escalated = 0
+        self.small_ms = 0.0
+        self.large_ms = 0.0
+
+    def record(self, images: int, escalated: int, small_ms: float, large_ms: float) -> None:
+        with self._lock:
+            self.images += images
+            self.escalated += escalated
+            self.small_ms += small_ms
+            self.large_ms += large_ms
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'images': self.images,
+                'escalated': self.escalated,
+                'escalation_rate': round(self.escalated / self.images, 4) if self.images else 0.0,
+                'small_ms_per_image': round(self.small_ms / self.images, 2) if self.images else 0.0,
+                'large_ms_per_escalation': round(self.large_ms / self.escalated, 2) if self.escalated else 0.0
+            }
+
+
+class CascadeDetector:
+    """
+    Cascata de dois níveis com a mesma interface de YOLOv8Detector: o modelo
+    pequeno responde primeiro e o grande só roda nas imagens em que as detecções
+    do pequeno ficam abaixo dos limiares de confiança ou de quantidade.
+    """
+
+    def __init__(self, small: YOLOv8Detector, large: YOLOv8Detector,
+                 min_confidence: float = 0.5, min_objects: int = 1, stats: CascadeStats = None):
+        self.small = small
+        self.large = large
+        self.min_confidence = min_confidence
+        self.min_objects = min_objects
+        self.stats = stats or CascadeStats()
+        self._model_version = None
+
+    @property
+    def weights_path(self):
+        # A versão registrada/trocada a quente é a do nível grande
+        return self.large.weights_path
+
+    @property
+    def backend(self) -> str:
+        return self.large.backend
+
+    @property
+    def model_version(self) -> str:
+        """Identidade da cascata: os dois modelos e os limiares de escalonamento"""
+        if self._model_version is None:
+            identity = (f"cascade:{self.small.model_version}:{self.large.model_version}:"
+                        f"{self.min_confidence}:{self.min_objects}")
+            self._model_version = hashlib.sha256(identity.encode()).hexdigest()
+        return self._model_version
+
+    def clone(self) -> 'CascadeDetector':
+        return CascadeDetector(self.small.clone(), self.large.clone(),
+                               self.min_confidence, self.min_objects, self.stats)
+
+    def load_model(self) -> None:
+        self.small.load_model()
+        self.large.load_model()
+
+    def warm_up(self, runs: int = 1, imgsz: int = 640) -> None:
+        self.small.warm_up(runs, imgsz)
+        self.large.warm_up(runs, imgsz)
+
+    def should_escalate(self, detected_objects: List[Dict]) -> bool:
+        if len(detected_objects) < self.min_objects:
+            return True
+        if not detected_objects:
+            return False
+        mean_confidence = sum(obj['confidence'] for obj in detected_objects) / len(detected_objects)
+        return mean_confidence < self.min_confidence
+
+    def detect(self, image_path: Union[str, np.ndarray], imgsz: int = None,
+               render: bool = True) -> Tuple[Optional[np.ndarray], List[Dict], Dict]:
+        return self.detect_batch([image_path], imgsz, render)[0]
+
+    def detect_batch(self, images: List[Union[str, np.ndarray]], imgsz: int = None,
+                     render: bool = True) -> List[Tuple[Optional[np.ndarray], List[Dict], Dict]]:
+        if not images:
+            return []
+
+        started = time.perf_counter()
+        outputs = self.small.detect_batch(images, imgsz, render)
+        small_ms = (time.perf_counter() - started) * 1000
+
+        escalate = [i for i, (_, objects, _) in enumerate(outputs) if self.should_escalate(objects)]
+        large_ms = 0.0
+        if escalate:
+            started = time.perf_counter()
+            large_outputs = self.large.detect_batch([images[i] for i in escalate], imgsz, render)
+            large_ms = (time.perf_counter() - started) * 1000
+            for i, (detection_img, objects, metrics) in zip(escalate, large_outputs):
+                small_metrics = outputs[i][2]
+                metrics.update(
+                    inference_time=(small_metrics['inference_time'] or 0) + (metrics['inference_time'] or 0),
+                    total_time=small_metrics['total_time'] + metrics['total_time'],
+                    tier='large'
+                )
+                outputs[i] = (detection_img, objects, metrics)
+
+        for _, _, metrics in outputs:
+            metrics.setdefault('tier', 'small')
+            metrics['model_version'] = self.model_version
+        self.stats.record(len(images), len(escalate), small_ms, large_ms)
+        return outputs
+
+
+cascade_stats = CascadeStats()
+
+def create_detector(weights_path: Union[str, os.PathLike] = None, backend: str = None):
+    """Detector servido: YOLOv8Detector simples ou, com YOLO_CASCADE_ENABLED, a cascata pequeno -> grande"""
+    large = YOLOv8Detector(weights_path, backend)
+    if not Config.YOLO_CASCADE_ENABLED:
+        return large
+    return CascadeDetector(
+        YOLOv8Detector(Config.YOLO_CASCADE_SMALL_WEIGHTS, large.backend),
+        large,
+        min_confidence=Config.YOLO_CASCADE_MIN_CONFIDENCE,
+        min_objects=Config.YOLO_CASCADE_MIN_OBJECTS,
+        stats=cascade_stats
+    )
+
+# Instancia global; o modelo é carregado depois do fork, em segundo plano
+detector = create_detector()
+
+def _build_pool(primary) -> DetectorPool:
+    """Réplicas do detector, cada uma numa fatia própria de núcleos; a réplica 0 é o próprio `primary`"""
+    return DetectorPool(
+        lambda index: primary if index == 0 else primary.clone(),
+        size=Config.DETECTOR_REPLICAS,
+        threads_per_replica=Config.DETECTOR_THREADS_PER_REPLICA,
+        pin_cores=Config.DETECTOR_PIN_CORES
+    )
+
+# Versão servida; ambos são substituídos atomicamente por swap_model()
+detector_pool = _build_pool(detector)
+
+_model_lock = threading.Lock()
+_model_ready = threading.Event()
+model_status = {
+    'state': 'not_loaded',  # not_loaded | loading | ready | failed
+    'pid': None,
+    'error': None,
+    'phases_ms': {}
+}
+
+def _load_and_warm_up(ready: threading.Event) -> None:
+    phases = {}
+    try:
+        started = time.perf_counter()
+        Config.ensure_yolo_weights()
+        phases['weights'] = round((time.perf_counter() - started) * 1000, 1)
+
+        phases.update(detector_pool.load(Config.YOLO_WARMUP_RUNS, Config.YOLO_EXPORT_IMGSZ))
+
+        model_status.update(state='ready', phases_ms=phases)
+        logger.info(f"Modelo pronto (pid={os.getpid()}) - tempos por fase (ms): {phases}")
+    except Exception as e:
+        model_status.update(state='failed', error=str(e), phases_ms=phases)
+        logger.error(f"Falha ao carregar o modelo: {str(e)}", exc_info=True)
+    finally:
+        ready.set()
+
+_swap_lock = threading.Lock()
+swap_status = {
+    'state': 'idle',  # idle | loading | done | failed
+    'pid': None,
+    'weights_path': None,
+    'backend': None,
+    'error': None,
+    'phases_ms': {}
+}
+
+def _load_and_swap(weights_path: str, backend: str) -> None:
+    global detector, detector_pool
+    phases = {}
+    try:
+        new_detector = create_detector(weights_path, backend)
+        new_pool = _build_pool(new_detector)
+        phases.update(new_pool.load(Config.YOLO_WARMUP_RUNS, Config.YOLO_EXPORT_IMGSZ))
+
+        started = time.perf_counter()
+        new_detector.model_version  # Checksum calculado antes da troca, fora do caminho das requisições
+        phases['checksum'] = round((time.perf_counter() - started) * 1000, 1)
+
+        # Troca atômica: novas requisições passam a usar o novo pool imediatamente
+        old_pool = detector_pool
+        detector_pool, detector = new_pool, new_detector
+        model_status.update(state='ready', error=None)
+
+        started = time.perf_counter()
+        if not old_pool.retire(Config.MODEL_SWAP_DRAIN_TIMEOUT_SECONDS):
+            logger.warning("Prazo de drenagem expirou; réplicas antigas serão liberadas ao fim das requisições")
+        phases['drain'] = round((time.perf_counter() - started) * 1000, 1)
+
+        swap_status.update(state='done', phases_ms=phases)
+        logger.info(f"Modelo trocado para {weights_path} ({backend}) - tempos por fase (ms): {phases}")
+    except Exception as e:
+        swap_status.update(state='failed', error=str(e), phases_ms=phases)
+        logger.error(f"Falha ao trocar o modelo para {weights_path}: {str(e)}", exc_info=True)
+
+def swap_model(weights_path: Union[str, os.PathLike], backend: str = None) -> bool:
+    """
+    Carrega uma nova versão do modelo em segundo plano, aquece-a e a coloca em
+    serviço atomicamente; a versão anterior é liberada depois que as requisições
+    em andamento terminam. Retorna True se uma troca foi iniciada.
+    """
+    weights_path, backend = str(weights_path), backend or Config.YOLO_BACKEND
+    if uses_model_server():
+        return _get_model_server_client().swap(weights_path, backend)
+
+    with _swap_lock:
+        if model_status['pid'] != os.getpid() or model_status['state'] not in ('ready', 'failed'):
+            return False  # Carregamento inicial ainda em andamento
+        if str(detector.weights_path) == weights_path and detector.backend == backend:
+            return False
+        same_target = swap_status['weights_path'] == weights_path and swap_status['backend'] == backend
+        if swap_status['pid'] == os.getpid() and (
+                swap_status['state'] == 'loading' or (same_target and swap_status['state'] == 'failed')):
+            return False
+
+        swap_status.update(state='loading', pid=os.getpid(), weights_path=weights_path,
+                           backend=backend, error=None, phases_ms={})
+        threading.Thread(target=_load_and_swap, args=(weights_path, backend),
+                         name='model-swap', daemon=True).start()
+        return True
+
+_role = {'model_server': False}
+_model_server_client = None
+_remote_version = {'value': None, 'expires': 0.0}
+
+def set_model_server_role() -> None:
+    """Marca este processo como o servidor de modelo (dono do modelo carregado)"""
+    _role['model_server'] = True
+
+def uses_model_server() -> bool:
+    """Workers web delegam a inferência ao servidor de modelo quando habilitado"""
+    return Config.MODEL_SERVER_ENABLED and not _role['model_server']
+
+def _get_model_server_client():
+    global _model_server_client
+    if _model_server_client is None:
+        from services.modelServerService import ModelServerClient
+        _model_server_client = ModelServerClient(
+            Config.MODEL_SERVER_SOCKET,
+            max_connections=Config.MODEL_SERVER_CLIENT_CONNECTIONS
+        )
+    return _model_server_client
+
+def start_model_loading() -> None:
+    """
+    Inicia, uma vez por processo, o carregamento e o aquecimento do modelo em
+    segundo plano. Chamado após o fork (gunicorn post_fork) ou na primeira requisição.
+    """
+    global _model_ready
+    if uses_model_server():
+        return
+    with _model_lock:
+        if model_status['pid'] == os.getpid() and model_status['state'] in ('loading', 'ready'):
+            return
+        model_status.update(state='loading', pid=os.getpid(), error=None, phases_ms={})
+        _model_ready = threading.Event()
+        threading.Thread(target=_load_and_warm_up, args=(_model_ready,),
+                         name='model-loader', daemon=True).start()
+
+def ensure_model_ready(timeout: float = None) -> None:
+    """Bloqueia até o modelo estar pronto neste processo"""
+    start_model_loading()
+    if not _model_ready.wait(timeout):
+        raise TimeoutError("Modelo ainda está carregando")
+    if model_status['state'] != 'ready':
+        raise RuntimeError(f"Modelo indisponível: {model_status['error']}")
+
+def is_model_ready() -> bool:
+    return model_status['state'] == 'ready' and model_status['pid'] == os.getpid()
+
+def get_model_status() -> Dict:
+    """Estado de prontidão do modelo neste processo (ou do servidor de modelo)"""
+    if uses_model_server():
+        try:
+            status = _get_model_server_client().info()['status']
+        except Exception as e:
+            status = {'state': 'unreachable', 'error': str(e), 'phases_ms': {}, 'backend': detector.backend}
+        status['model_server'] = Config.MODEL_SERVER_SOCKET
+        return status
+    return {
+        'state': model_status['state'] if model_status['pid'] == os.getpid() else 'not_loaded',
+        'error': model_status['error'],
+        'phases_ms': dict(model_status['phases_ms']),
+        'backend': detector.backend,
+        'weights_path': str(detector.weights_path),
+        'swap': {k: v for k, v in swap_status.items() if k != 'pid'} if swap_status['pid'] == os.getpid() else None
+    }
+
+def _run_on_replica(method: str, *args):
+    while True:
+        pool = detector_pool
+        try:
+            with pool.checkout() as replica:
+                return getattr(replica, method)(*args)
+        except PoolRetiredError:
+            continue  # Uma troca de modelo aconteceu entre a leitura e o checkout
+
+def _detect_grouped(images: List[Union[str, np.ndarray]],
+                    options: List[Tuple[Optional[int], bool]]) -> List[Tuple[Optional[np.ndarray], List[Dict], Dict]]:
+    """Uma passada do modelo por combinação (imgsz, render) distinta, preservando a ordem"""
+    groups: Dict[Tuple[Optional[int], bool], List[int]] = {}
+    for index, option in enumerate(options):
+        groups.setdefault(option, []).append(index)
+
+    outputs = [None] * len(images)
+    for (imgsz, render), indexes in groups.items():
+        group_outputs = _run_on_replica('detect_batch', [images[i] for i in indexes], imgsz, render)
+        for index, output in zip(indexes, group_outputs):
+            outputs[index] = output
+    return outputs
+
+# Agendador de micro-lotes na frente do pool (um lote em execução por réplica);
+# cada item é (imagem, imgsz, render)
+batch_scheduler = MicroBatchScheduler(
+    lambda items: _detect_grouped([item[0] for item in items], [item[1:] for item in items]),
+    max_batch_size=Config.INFERENCE_BATCH_MAX_SIZE,
+    max_wait_ms=Config.INFERENCE_BATCH_MAX_WAIT_MS,
+    concurrency=Config.DETECTOR_REPLICAS
+)
+
+def get_detection_results(image_path: Union[str, np.ndarray], imgsz: int = None,
+                          render: bool = True) -> Tuple[Optional[np.ndarray], List[Dict], Dict]:
+    """
+    Interface padrão para outros serviços.
+    Com render=False apenas as detecções são produzidas (imagem anotada = None).
+    """
+    if uses_model_server():
+        return _get_model_server_client().detect(image_path, imgsz, render)
+    ensure_model_ready()
+    if Config.INFERENCE_BATCHING_ENABLED:
+        return batch_scheduler.submit((image_path, imgsz, render)).result()
+    return _run_on_replica('detect', image_path, imgsz, render)
+
+def get_batch_detection_results(images: List[Union[str, np.ndarray]], sizes: List[Optional[int]] = None,
+                                render: bool = True) -> List[Tuple[Optional[np.ndarray], List[Dict], Dict]]:
+    """Inferência de um lote já formado (uma passada do modelo por imgsz)"""
+    sizes = sizes or [None] * len(images)
+    if uses_model_server():
+        return _get_model_server_client().detect_batch(images, sizes, render)
+    ensure_model_ready()
+    return _detect_grouped(images, [(imgsz, render) for imgsz in sizes])
+
+def get_model_version() -> str:
+    """Checksum dos pesos servidos atualmente"""
+    if uses_model_server():
+        # Consulta curta em cache para não custar uma ida ao servidor por requisição
+        now = time.monotonic()
+        if _remote_version['value'] is None or now >= _remote_version['expires']:
+            info = _get_model_server_client().info()
+            if 'model_version' not in info:
+                raise RuntimeError(f"Servidor de modelo não está pronto: {info['status']['state']}")
+            _remote_version.update(value=info['model_version'], expires=now + 5)
+        return _remote_version['value']
+    ensure_model_ready()
+    return detector.model_version
 
-        return results
+def get_batching_stats() -> Dict:
+    """Estatísticas do agendador de lotes (tamanho de lote e espera na fila)"""
+    if uses_model_server():
+        return _get_model_server_client().stats()
+    stats = batch_scheduler.stats.snapshot()
+    stats.update({
+        'enabled': Config.INFERENCE_BATCHING_ENABLED,
+        'max_batch_size': batch_scheduler.max_batch_size,
+        'max_wait_ms': batch_scheduler.max_wait * 1000
+    })
+    return stats
 
-# Instancia global e carregamento do modelo
-detector = YOLOv8Detector()
-detector.load_model()
+def get_replica_stats() -> Dict:
+    """Utilização por réplica do detector, para dimensionar N frente ao número de núcleos"""
+    if uses_model_server():
+        return _get_model_server_client().replica_stats()
+    return detector_pool.stats()
 
-def get_detection_results(image_path: Union[str, np.ndarray]) -> Tuple[np.ndarray, List[Dict], Dict]:
-    """Interface padrão para outros serviços"""
-    return detector.detect(image_path)
+def get_cascade_stats() -> Dict:
+    """Taxa de escalonamento e divisão de latência entre os níveis da cascata"""
+    if uses_model_server():
+        return _get_model_server_client().cascade_stats()
+    stats = cascade_stats.snapshot()
+    stats.update({
+        'enabled': Config.YOLO_CASCADE_ENABLED,
+        'min_confidence': Config.YOLO_CASCADE_MIN_CONFIDENCE,
+        'min_objects': Config.YOLO_CASCADE_MIN_OBJECTS
+    })
+    return stats
@@ -0,0 +1,228 @@
+import os
+import queue
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class PoolRetiredError(RuntimeError):
+    """O pool foi substituído por uma nova versão do modelo; use o pool atual"""
+
+
+def partition_cores(replicas: int, threads_per_replica: Optional[int] = None) -> List[Set[int]]:
+    """
+    Divide os núcleos disponíveis para o processo em fatias disjuntas, uma por réplica.
+    Se não houver núcleos suficientes, as fatias passam a se sobrepor em rodízio.
+    """
+    try:
+        cores = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = list(range(os.cpu_count() or 1))
+
+    per_replica = threads_per_replica or max(1, len(cores) // max(1, replicas))
+    slices = []
+    for index in range(replicas):
+        start = (index * per_replica) % len(cores)
+        slices.append({cores[(start + offset) % len(cores)] for offset in range(per_replica)})
+    return slices
+
+
+class DetectorReplica:
+    """
+    Uma cópia do detector servida por uma thread dedicada. A thread fixa a própria
+    afinidade de CPU e o número de threads intra-op do torch, de modo que réplicas
+    concorrentes não disputem os mesmos núcleos.
+    """
+
+    def __init__(self, index: int, detector, cores: Set[int], pin_cores: bool = True):
+        self.index = index
+        self.detector = detector
+        self.cores = cores
+        self.pin_cores = pin_cores
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._created_at = time.perf_counter()
+        self._busy_seconds = 0.0
+        self.requests = 0
+        self.images = 0
+        self._thread = threading.Thread(target=self._loop, name=f"detector-replica-{index}", daemon=True)
+        self._thread.start()
+
+    def _configure_thread(self) -> None:
+        if self.pin_cores and hasattr(os, 'sched_setaffinity'):
+            try:
+                # No Linux, pid 0 aplica a afinidade apenas à thread chamadora
+                os.sched_setaffinity(0, self.cores)
+            except OSError as e:
+                logger.warning(f"Réplica {self.index}: não foi possível fixar núcleos: {str(e)}")
+        if self.detector.backend == 'torch':
+            import torch
+            torch.set_num_threads(len(self.cores))
+
+    def _loop(self) -> None:
+        self._configure_thread()
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            fn, args, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._busy_seconds += time.perf_counter() - started
+
+    def _run(self, fn, *args):
+        future = Future()
+        self._tasks.put((fn, args, future))
+        return future.result()
+
+    def load(self, warmup_runs: int, warmup_imgsz: int) -> Dict[str, float]:
+        """Carrega e aquece o modelo na própria thread da réplica; retorna os tempos (ms)"""
+        started = time.perf_counter()
+        self._run(self.detector.load_model)
+        loaded = time.perf_counter()
+        self._run(self.detector.warm_up, warmup_runs, warmup_imgsz)
+        return {
+            'load_model': (loaded - started) * 1000,
+            'warm_up': (time.perf_counter() - loaded) * 1000
+        }
+
+    def detect(self, image, imgsz: int = None, render: bool = True):
+        with self._lock:
+            self.requests += 1
+            self.images += 1
+        return self._run(self.detector.detect, image, imgsz, render)
+
+    def detect_batch(self, images, imgsz: int = None, render: bool = True):
+        with self._lock:
+            self.requests += 1
+            self.images += len(images)
+        return self._run(self.detector.detect_batch, images, imgsz, render)
+
+    def close(self) -> None:
+        """Encerra a thread da réplica depois das tarefas já enfileiradas"""
+        self._tasks.put(None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            elapsed = time.perf_counter() - self._created_at
+            return {
+                'replica': self.index,
+                'cores': sorted(self.cores),
+                'requests': self.requests,
+                'images': self.images,
+                'busy_seconds': round(self._busy_seconds, 3),
+                'utilization': round(self._busy_seconds / elapsed, 4) if elapsed > 0 else 0.0
+            }
+
+
+class DetectorPool:
+    """
+    Pool de N réplicas do detector. Cada requisição reserva uma réplica
+    (checkout), usa-a com exclusividade e a devolve ao terminar.
+    """
+
+    def __init__(self, detector_factory, size: int = 1, threads_per_replica: Optional[int] = None,
+                 pin_cores: bool = True):
+        self.detector_factory = detector_factory
+        self.size = max(1, size)
+        self.threads_per_replica = threads_per_replica
+        self.pin_cores = pin_cores
+        self.replicas: List[DetectorReplica] = []
+        self._available = queue.Queue()
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._checkouts = 0
+        self._wait_seconds = 0.0
+        self._pending = 0  # Checkouts em andamento (aguardando ou usando uma réplica)
+        self._retired = False
+
+    def load(self, warmup_runs: int = 1, warmup_imgsz: int = 640) -> Dict[str, float]:
+        """Cria, carrega e aquece todas as réplicas; retorna os tempos somados por fase (ms)"""
+        slices = partition_cores(self.size, self.threads_per_replica)
+        if self.size > 1:
+            try:
+                import torch
+                torch.set_num_interop_threads(1)
+            except (ImportError, RuntimeError):
+                pass
+
+        replicas = []
+        phases = {'load_model': 0.0, 'warm_up': 0.0}
+        for index, cores in enumerate(slices):
+            replica = DetectorReplica(index, self.detector_factory(index), cores, self.pin_cores)
+            for phase, elapsed_ms in replica.load(warmup_runs, warmup_imgsz).items():
+                phases[phase] += elapsed_ms
+            replicas.append(replica)
+            logger.info(f"Réplica {index} pronta nos núcleos {sorted(cores)}")
+
+        available = queue.Queue()
+        for replica in replicas:
+            available.put(replica)
+        self.replicas, self._available = replicas, available
+        return {phase: round(elapsed_ms, 1) for phase, elapsed_ms in phases.items()}
+
+    @contextmanager
+    def checkout(self, timeout: float = None):
+        """Reserva uma réplica livre, bloqueando até que alguma fique disponível"""
+        started = time.perf_counter()
+        with self._lock:
+            if self._retired:
+                raise PoolRetiredError("Pool de réplicas aposentado")
+            self._pending += 1
+            available = self._available
+        try:
+            try:
+                replica = available.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError("Nenhuma réplica do detector disponível")
+            with self._lock:
+                self._checkouts += 1
+                self._wait_seconds += time.perf_counter() - started
+            try:
+                yield replica
+            finally:
+                available.put(replica)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._drained.notify_all()
+
+    def retire(self, timeout: float = None) -> bool:
+        """
+        Recusa novos checkouts, espera as requisições em andamento devolverem
+        suas réplicas e encerra as threads. Retorna False se o prazo expirou
+        (as réplicas continuam vivas até o fim das requisições pendentes).
+        """
+        with self._lock:
+            self._retired = True
+            drained = self._drained.wait_for(lambda: self._pending == 0, timeout)
+        if drained:
+            for replica in self.replicas:
+                replica.close()
+        return drained
+
+    def stats(self) -> Dict:
+        with self._lock:
+            checkouts = self._checkouts
+            avg_wait_ms = (self._wait_seconds / checkouts * 1000) if checkouts else 0.0
+        return {
+            'size': len(self.replicas),
+            'available': self._available.qsize(),
+            'checkouts': checkouts,
+            'avg_checkout_wait_ms': round(avg_wait_ms, 3),
+            'replicas': [replica.stats() for replica in self.replicas]
+        }
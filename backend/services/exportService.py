@@ -0,0 +1,143 @@
+import io
+import csv
+import json
+import logging
+from datetime import datetime
+from itertools import groupby
+from typing import Iterator, List, Tuple
+from config.config import Config
+from repositories.neuralNetworkRepository import iter_user_export_rows
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Mesma ordem das colunas de iter_user_export_rows
+EXPORT_COLUMNS = [
+    'image_id', 'image_url', 'uploaded_at',
+    'result_id', 'analyzed_at', 'accuracy', 'objects_count', 'inference_time_ms', 'total_time_ms',
+    'model_version',
+    'detection_id', 'class_id', 'class_name', 'confidence', 'x1', 'y1', 'x2', 'y2'
+]
+_IMAGE_COLUMNS = EXPORT_COLUMNS[:3]
+_RESULT_COLUMNS = EXPORT_COLUMNS[3:10]
+_DETECTION_COLUMNS = EXPORT_COLUMNS[10:]
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _export_csv(chunks: Iterator[List]) -> Iterator[str]:
+    """Uma linha por detecção; cada bloco do cursor vira um pedaço da resposta"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows([_isoformat(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():
+        # Exportação vazia: só o cabeçalho
+        yield buffer.getvalue()
+
+def _export_ndjson(chunks: Iterator[List]) -> Iterator[str]:
+    """
+    Um objeto JSON por resultado, com as detecções aninhadas. As linhas chegam
+    ordenadas por imagem/resultado, então o agrupamento também é em streaming.
+    """
+    rows = (row for chunk in chunks for row in chunk)
+    lines = []
+    for _, group in groupby(rows, key=lambda row: (row[0], row[3])):
+        group = list(group)
+        first = group[0]
+        record = {column: _isoformat(value) for column, value in zip(_IMAGE_COLUMNS, first[:3])}
+        if first[3] is None:
+            record['result'] = None
+        else:
+            record['result'] = {column: _isoformat(value) for column, value in zip(_RESULT_COLUMNS, first[3:10])}
+            record['result']['detections'] = [
+                dict(zip(_DETECTION_COLUMNS, row[10:])) for row in group if row[10] is not None
+            ]
+        lines.append(json.dumps(record) + '\n')
+        if len(lines) >= Config.EXPORT_CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class _StreamSink:
+    """Destino de escrita que acumula os bytes até o próximo envio"""
+
+    def __init__(self):
+        self._chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _export_parquet(chunks: Iterator[List]) -> Iterator[bytes]:
+    """
+    Um row group por bloco do cursor. O Parquet é escrito sequencialmente
+    (rodapé no fim), então os bytes podem ser enviados à medida que saem.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = [pa.int64(), pa.string(), pa.timestamp('us'),
+             pa.int64(), pa.timestamp('us'), pa.float64(), pa.int64(), pa.float64(), pa.float64(),
+             pa.string(),
+             pa.int64(), pa.int64(), pa.string(), pa.float64(),
+             pa.float64(), pa.float64(), pa.float64(), pa.float64()]
+    schema = pa.schema(list(zip(EXPORT_COLUMNS, types)))
+
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='snappy')
+    try:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=type_) for column, type_ in zip(columns, types)], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', _export_csv),
+    'ndjson': ('application/x-ndjson', _export_ndjson),
+    'parquet': ('application/vnd.apache.parquet', _export_parquet)
+}
+
+def export_user_results(user_id: int, export_format: str, date_from: datetime = None,
+                        date_to: datetime = None) -> Tuple[Iterator, str, str]:
+    """
+    Gerador com o conteúdo da exportação, o mimetype e o nome do arquivo.
+    Nada é lido do banco até a resposta começar a ser enviada.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato inválido. Use: {', '.join(EXPORT_FORMATS)}")
+    mimetype, exporter = EXPORT_FORMATS[export_format]
+
+    chunks = iter_user_export_rows(user_id, date_from, date_to, Config.EXPORT_CHUNK_SIZE)
+    filename = f"neurovision-export-{datetime.utcnow():%Y%m%d%H%M%S}.{export_format}"
+    logger.info(f"Exportação {export_format} iniciada para o usuário {user_id}")
+    return exporter(chunks), mimetype, filename
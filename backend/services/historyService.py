@@ -0,0 +1,82 @@
+import json
+import base64
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from config.config import Config
+from repositories.neuralNetworkRepository import list_user_history
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(uploaded_at: datetime, image_id: int) -> str:
+    """Cursor opaco para a próxima página: (UploadedAt, ImageID) do último item"""
+    payload = json.dumps([uploaded_at.isoformat(), image_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverso de encode_cursor; ValueError se o cursor for inválido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        uploaded_at, image_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(uploaded_at), int(image_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Cursor inválido") from e
+
+def parse_date(value: Optional[str], field: str) -> Optional[datetime]:
+    """Data ISO 8601 (YYYY-MM-DD ou com horário, UTC); ValueError se inválida"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"{field} deve estar no formato ISO 8601 (YYYY-MM-DD)") from e
+
+
+def serialize_result(result) -> Dict:
+    return {
+        'result_id': result.ResultID,
+        'processed_image_url': result.ProcessedImagePath,
+        'analyzed_at': result.AnalyzedAt.isoformat() if result.AnalyzedAt else None,
+        'accuracy': result.Accuracy,
+        'objects_count': result.ObjectsCount,
+        'inference_time': result.InferenceTimeMs,
+        'total_time': result.TotalTimeMs,
+        'model_version': result.ModelVersion,
+        'detections': [detection.to_dict() for detection in result.detections]
+    }
+
+def serialize_image(image) -> Dict:
+    return {
+        'image_id': image.ImageID,
+        'image_url': image.ImagePath,
+        'uploaded_at': image.UploadedAt.isoformat(),
+        'results': [serialize_result(result) for result in image.recognition_results]
+    }
+
+def get_history(user_id: int, cursor: str = None, limit: int = None, date_from: datetime = None,
+                date_to: datetime = None, class_name: str = None) -> Dict:
+    """
+    Página do histórico de análises do usuário e o cursor da próxima
+    (None quando não há mais itens).
+    """
+    limit = max(1, min(limit or Config.HISTORY_PAGE_SIZE, Config.HISTORY_MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+
+    # Um item a mais indica se existe próxima página sem um COUNT(*)
+    images = list_user_history(user_id, limit + 1, after, date_from, date_to, class_name)
+    has_more = len(images) > limit
+    images = images[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = images[-1]
+        next_cursor = encode_cursor(last.UploadedAt, last.ImageID)
+
+    return {
+        'items': [serialize_image(image) for image in images],
+        'next_cursor': next_cursor,
+        'limit': limit
+    }
@@ -0,0 +1,118 @@
+import struct
+import logging
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from config.config import Config
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_MODEL_STRIDE = 32
+
+# Fatores de decodificação reduzida do OpenCV (JPEG decodifica direto em 1/2, 1/4 ou 1/8)
+_REDUCED_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+]
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def probe_image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Largura e altura lidas do cabeçalho (PNG IHDR ou marcador SOF do JPEG),
+    sem decodificar os pixels. Retorna None para formatos não reconhecidos.
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return width, height
+
+    if data[:2] == b'\xff\xd8':
+        offset = 2
+        while offset + 4 <= len(data):
+            if data[offset] != 0xFF:
+                offset += 1
+                continue
+            marker = data[offset + 1]
+            if marker == 0xFF:
+                offset += 1
+                continue
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                offset += 2
+                continue
+            (length,) = struct.unpack('>H', data[offset + 2:offset + 4])
+            if marker in _JPEG_SOF_MARKERS and offset + 9 <= len(data):
+                height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + length
+    return None
+
+def decode_downscaled(data: bytes, max_side: int = None) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Decodifica a imagem já reduzida para que o maior lado fique próximo de
+    `max_side`: JPEGs usam a decodificação em resolução reduzida do libjpeg e o
+    restante é ajustado com INTER_AREA. Retorna (imagem BGR, (largura, altura) originais).
+    """
+    max_side = max_side or Config.IMAGE_DECODE_MAX_SIDE
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    size = probe_image_size(data)
+    if size and size[0] * size[1] > Config.UPLOAD_MAX_PIXELS:
+        # Entradas que não passaram pelo upload em streaming (membros de .zip, jobs antigos)
+        raise ValueError(f"Imagem de {size[0]}x{size[1]} excede o limite de {Config.UPLOAD_MAX_PIXELS} pixels")
+
+    flag, factor = cv2.IMREAD_COLOR, 1
+    if size and max_side:
+        for candidate, reduced_flag in _REDUCED_FLAGS:
+            if max(size) // candidate >= max_side:
+                flag, factor = reduced_flag, candidate
+                break
+
+    image = cv2.imdecode(buffer, flag)
+    if image is None:
+        raise ValueError("Não foi possível decodificar a imagem enviada")
+
+    height, width = image.shape[:2]
+    if size is None:
+        size = (width * factor, height * factor)
+    elif (width > height) != (size[0] > size[1]) and width != height:
+        # A orientação EXIF foi aplicada na decodificação
+        size = (size[1], size[0])
+
+    if max_side and max(width, height) > max_side:
+        ratio = max_side / max(width, height)
+        image = cv2.resize(image, (max(1, round(width * ratio)), max(1, round(height * ratio))),
+                           interpolation=cv2.INTER_AREA)
+    return image, size
+
+def choose_inference_size(width: int, height: int, requested: int = None) -> int:
+    """
+    Tamanho de entrada do modelo (múltiplo do stride) dentro dos limites do servidor.
+    Sem pedido explícito, imagens menores que o padrão usam um tamanho menor.
+    """
+    if requested is None:
+        requested = min(Config.YOLO_EXPORT_IMGSZ, max(width, height))
+    imgsz = -(-int(requested) // _MODEL_STRIDE) * _MODEL_STRIDE
+    return max(Config.INFERENCE_IMGSZ_MIN, min(Config.INFERENCE_IMGSZ_MAX, imgsz))
+
+def validate_requested_imgsz(value) -> Optional[int]:
+    """Valida o imgsz enviado na requisição; ValueError se estiver fora dos limites"""
+    if value in (None, ''):
+        return None
+    try:
+        imgsz = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("imgsz deve ser um número inteiro")
+    if not Config.INFERENCE_IMGSZ_MIN <= imgsz <= Config.INFERENCE_IMGSZ_MAX:
+        raise ValueError(f"imgsz deve estar entre {Config.INFERENCE_IMGSZ_MIN} e {Config.INFERENCE_IMGSZ_MAX}")
+    return imgsz
+
+def scale_detections(detected_objects: List[Dict], scale_x: float, scale_y: float) -> List[Dict]:
+    """Leva as caixas da imagem decodificada (reduzida) para as coordenadas da original"""
+    if scale_x == 1 and scale_y == 1:
+        return detected_objects
+    for obj in detected_objects:
+        x1, y1, x2, y2 = obj['bbox']
+        obj['bbox'] = [x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y]
+    return detected_objects
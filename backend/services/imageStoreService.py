@@ -0,0 +1,225 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from config.config import Config
+from repositories.uploadTaskRepository import find_unreferenced_paths, delete_derivatives_by_path
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PUBLIC_URL_PREFIX = '/uploads/public/'
+_CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z0-9]+$')
+
+
+class ContentAddressedImageStore:
+    """
+    Armazenamento local endereçado por conteúdo: cada arquivo é gravado em
+    <raiz>/<aa>/<bb>/<sha256>.<ext>, de modo que conteúdos idênticos ocupam um
+    único arquivo e nenhum diretório cresce sem limite. Uma política de
+    retenção por tamanho remove os arquivos menos usados recentemente (o mtime
+    é atualizado em gravações, deduplicações, GETs e acertos de cache).
+    `find_unreferenced`, se informado, recebe URLs candidatas e devolve as que
+    podem sair; `release` é chamado com as URLs logo antes de removê-las.
+    """
+
+    # Atualizar o mtime a cada GET custaria uma escrita de metadados por acesso
+    _TOUCH_INTERVAL_SECONDS = 60
+    _RETENTION_CHUNK = 500
+
+    def __init__(self, root: str, max_bytes: int = 0, min_age_seconds: float = 86400,
+                 retention_interval_seconds: float = 3600,
+                 find_unreferenced: Optional[Callable[[List[str]], List[str]]] = None,
+                 release: Optional[Callable[[List[str]], object]] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.min_age_seconds = min_age_seconds
+        self.retention_interval_seconds = retention_interval_seconds
+        self.find_unreferenced = find_unreferenced
+        self.release = release
+        self._lock = threading.Lock()
+        self._counters = {'written': 0, 'deduplicated': 0, 'bytes_written': 0,
+                          'retention_runs': 0, 'retention_deleted': 0, 'retention_freed_bytes': 0}
+        self._retention_pid = None
+
+    @staticmethod
+    def relative_path(digest: str, extension: str) -> str:
+        return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def _count(self, **increments) -> None:
+        with self._lock:
+            for counter, value in increments.items():
+                self._counters[counter] += value
+
+    def put(self, data: bytes, extension: str = '.jpg') -> str:
+        """Grava o conteúdo (se ainda não existir) e retorna a URL pública"""
+        digest = hashlib.sha256(data).hexdigest()
+        relative = self.relative_path(digest, extension)
+        path = os.path.join(self.root, relative)
+
+        if os.path.exists(path):
+            # Reuso conta como acesso para a retenção (menos usados recentemente saem primeiro)
+            os.utime(path)
+            self._count(deduplicated=1)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+            with open(partial_path, 'wb') as f:
+                f.write(data)
+            os.replace(partial_path, path)
+            self._count(written=1, bytes_written=len(data))
+        return PUBLIC_URL_PREFIX + relative
+
+    def path_for_url(self, url: str) -> str:
+        """Caminho local de uma URL /uploads/public/..."""
+        relative = url.split('?', 1)[0]
+        if relative.startswith(PUBLIC_URL_PREFIX):
+            relative = relative[len(PUBLIC_URL_PREFIX):]
+        return os.path.join(self.root, *relative.split('/'))
+
+    def url_for_path(self, path: str) -> str:
+        """URL /uploads/public/... de um arquivo do armazenamento"""
+        return PUBLIC_URL_PREFIX + os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def touch(self, url: str) -> bool:
+        """Registra um acesso ao arquivo para a retenção; False se ele não existir"""
+        path = self.path_for_url(url)
+        try:
+            if time.time() - os.stat(path).st_mtime > self._TOUCH_INTERVAL_SECONDS:
+                os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def content_etag(relative_path: str) -> Optional[str]:
+        """ETag forte de arquivos endereçados por conteúdo: o próprio hash"""
+        match = _CONTENT_ADDRESSED.match(relative_path)
+        return match.group(1) if match else None
+
+    def _scan(self) -> Tuple[list, int]:
+        files, total = [], 0
+        stack = [self.root]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and not entry.name.endswith('.part') \
+                            and not entry.name.startswith('.'):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+        return files, total
+
+    def enforce_retention(self) -> Dict:
+        """
+        Remove os arquivos usados há mais tempo até o total caber em max_bytes.
+        Arquivos mais novos que min_age_seconds nunca são removidos, nem os que
+        o banco ainda referencia (imagens sem upload concluído, cache, uploads
+        pendentes). Só um processo executa por vez (flock).
+        """
+        if not self.max_bytes:
+            return {'deleted': 0, 'freed_bytes': 0}
+
+        import fcntl
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, '.retention.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return {'deleted': 0, 'freed_bytes': 0, 'skipped': True}
+
+            files, total = self._scan()
+            cutoff = time.time() - self.min_age_seconds
+            candidates = [entry for entry in sorted(files) if entry[0] <= cutoff]
+            deleted, freed = 0, 0
+            for start in range(0, len(candidates), self._RETENTION_CHUNK):
+                if total <= self.max_bytes:
+                    break
+                chunk = candidates[start:start + self._RETENTION_CHUNK]
+                urls = {path: self.url_for_path(path) for _, _, path in chunk}
+                evictable = set(self.find_unreferenced(list(urls.values()))) \
+                    if self.find_unreferenced else set(urls.values())
+
+                selected, excess = [], total - self.max_bytes
+                for mtime, size, path in chunk:
+                    if excess <= 0:
+                        break
+                    if urls[path] in evictable:
+                        selected.append((mtime, size, path))
+                        excess -= size
+                if not selected:
+                    continue
+                if self.release:
+                    self.release([urls[path] for _, _, path in selected])
+
+                for mtime, size, path in selected:
+                    try:
+                        if os.stat(path).st_mtime != mtime:
+                            # Reutilizado (deduplicação ou acesso) depois da varredura
+                            continue
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                    total -= size
+                    deleted += 1
+                    freed += size
+
+        self._count(retention_runs=1, retention_deleted=deleted, retention_freed_bytes=freed)
+        if deleted:
+            logger.info(f"Retenção: {deleted} arquivo(s) removidos, {freed // 2 ** 20}MB liberados")
+        return {'deleted': deleted, 'freed_bytes': freed, 'total_bytes': total}
+
+    def _retention_loop(self, app) -> None:
+        from extensions import db
+
+        while True:
+            try:
+                # As referências ficam no banco: a varredura roda num contexto da aplicação
+                with app.app_context():
+                    self.enforce_retention()
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Erro na retenção do armazenamento de imagens: {str(e)}", exc_info=True)
+            time.sleep(self.retention_interval_seconds)
+
+    def ensure_retention_started(self, app) -> None:
+        """Inicia a thread de retenção uma vez por processo (após o fork)"""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._retention_pid == os.getpid():
+                return
+            self._retention_pid = os.getpid()
+        threading.Thread(target=self._retention_loop, args=(app,), name='image-store-retention',
+                         daemon=True).start()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters['max_bytes'] = self.max_bytes
+        return counters
+
+
+# Instância global
+image_store = ContentAddressedImageStore(
+    os.path.join(Config.UPLOAD_FOLDER, 'public'),
+    max_bytes=Config.IMAGE_STORE_MAX_BYTES,
+    min_age_seconds=Config.IMAGE_STORE_MIN_AGE_SECONDS,
+    retention_interval_seconds=Config.IMAGE_STORE_RETENTION_INTERVAL_SECONDS,
+    find_unreferenced=find_unreferenced_paths,
+    release=delete_derivatives_by_path
+)
+
+def get_image_store_stats() -> Dict:
+    """Escritas, deduplicações e remoções da retenção neste processo"""
+    return image_store.stats()
@@ -0,0 +1,176 @@
+import os
+import argparse
+import logging
+from pathlib import Path
+from typing import Dict, List, Union
+from config.config import Config
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Backends suportados -> formato de exportação do ultralytics
+BACKEND_EXPORT_FORMATS = {
+    'torch': None,
+    'onnx': 'onnx',
+    'openvino': 'openvino',
+    # Variantes INT8: quantização dinâmica (ONNX Runtime) e estática calibrada (OpenVINO/NNCF)
+    'onnx-int8': 'onnx',
+    'openvino-int8': 'openvino'
+}
+
+
+def resolve_model_artifact(weights_path: Union[str, os.PathLike], backend: str) -> Path:
+    """
+    Caminho do artefato servido por um backend. Os artefatos exportados ficam
+    ao lado do .pt, com os nomes que o próprio ultralytics gera:
+    best.pt -> best.onnx | best_openvino_model/ | best_int8.onnx | best_int8_openvino_model/
+    """
+    weights_path = Path(weights_path)
+    if backend not in BACKEND_EXPORT_FORMATS:
+        raise ValueError(f"Backend de inferência desconhecido: {backend}. "
+                         f"Use um de: {', '.join(BACKEND_EXPORT_FORMATS)}")
+
+    if backend == 'torch':
+        return weights_path
+    if backend == 'onnx':
+        return weights_path.with_suffix('.onnx')
+    if backend == 'onnx-int8':
+        return weights_path.parent / f"{weights_path.stem}_int8.onnx"
+    if backend == 'openvino-int8':
+        return weights_path.parent / f"{weights_path.stem}_int8_openvino_model"
+    return weights_path.parent / f"{weights_path.stem}_openvino_model"
+
+def quantize_onnx_dynamic(onnx_path: Union[str, os.PathLike], output_path: Union[str, os.PathLike]) -> str:
+    """Quantização INT8 dinâmica (pesos em INT8, ativações quantizadas em tempo de execução)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(onnx_path), str(output_path), weight_type=QuantType.QUInt8)
+    return str(output_path)
+
+def export_model(weights_path: Union[str, os.PathLike], backends: List[str], imgsz: int = None,
+                 calibration_data: str = None) -> Dict[str, str]:
+    """
+    Exporta os pesos PyTorch para os backends pedidos, gravando os artefatos
+    em model_weights ao lado do .pt. Retorna backend -> caminho exportado.
+    A variante openvino-int8 é calibrada com as imagens do dataset de treino.
+    """
+    from ultralytics import YOLO
+
+    imgsz = imgsz or Config.YOLO_EXPORT_IMGSZ
+    calibration_data = calibration_data or str(Config.YOLO_DATASET_YAML)
+    model = YOLO(str(weights_path))
+    exported = {}
+    for backend in backends:
+        export_format = BACKEND_EXPORT_FORMATS.get(backend)
+        if not export_format:
+            continue
+        logger.info(f"Exportando {weights_path} para {backend} (imgsz={imgsz})")
+
+        if backend == 'onnx-int8':
+            onnx_path = resolve_model_artifact(weights_path, 'onnx')
+            if not onnx_path.exists():
+                # Eixos dinâmicos permitem lotes de tamanho variável no micro-batching
+                onnx_path = model.export(format='onnx', imgsz=imgsz, dynamic=True)
+            exported[backend] = quantize_onnx_dynamic(onnx_path, resolve_model_artifact(weights_path, backend))
+        elif backend == 'openvino-int8':
+            # Quantização estática pós-treino (NNCF) calibrada no dataset de treino
+            exported[backend] = str(model.export(format='openvino', imgsz=imgsz, dynamic=True,
+                                                 int8=True, data=calibration_data))
+        else:
+            exported[backend] = str(model.export(format=export_format, imgsz=imgsz, dynamic=True))
+        logger.info(f"Artefato {backend} gravado em {exported[backend]}")
+    return exported
+
+
+def _box_iou(a: List[float], b: List[float]) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+def compare_detections(reference: List[Dict], candidate: List[Dict],
+                       min_iou: float = 0.9, max_conf_delta: float = 0.05) -> Dict:
+    """
+    Compara duas listas de detected_objects: cada caixa de referência precisa
+    de uma caixa da mesma classe no candidato com IoU >= min_iou.
+    """
+    unmatched = list(candidate)
+    matched, conf_deltas, ious = 0, [], []
+    for ref in sorted(reference, key=lambda obj: -obj['confidence']):
+        best, best_iou = None, 0.0
+        for cand in unmatched:
+            if cand['class_id'] != ref['class_id']:
+                continue
+            iou = _box_iou(ref['bbox'], cand['bbox'])
+            if iou > best_iou:
+                best, best_iou = cand, iou
+        if best is not None and best_iou >= min_iou:
+            unmatched.remove(best)
+            matched += 1
+            ious.append(best_iou)
+            conf_deltas.append(abs(ref['confidence'] - best['confidence']))
+
+    return {
+        'reference_boxes': len(reference),
+        'candidate_boxes': len(candidate),
+        'matched': matched,
+        'min_iou': round(min(ious), 4) if ious else None,
+        'max_confidence_delta': round(max(conf_deltas), 4) if conf_deltas else None,
+        'passed': (matched == len(reference) == len(candidate)
+                   and all(delta <= max_conf_delta for delta in conf_deltas))
+    }
+
+def check_parity(weights_path: Union[str, os.PathLike], backend: str, images_dir: str,
+                 min_iou: float = 0.9, max_conf_delta: float = 0.05) -> Dict:
+    """Roda o backend torch e o backend pedido nas mesmas imagens e compara as caixas"""
+    from services.detectObjectService import YOLOv8Detector
+
+    reference = YOLOv8Detector(weights_path, backend='torch')
+    candidate = YOLOv8Detector(weights_path, backend=backend)
+    reference.load_model()
+    candidate.load_model()
+
+    report = {'backend': backend, 'images': 0, 'failed': []}
+    for img_path in YOLOv8Detector._iter_image_paths(images_dir):
+        _, ref_objects, _ = reference.detect(img_path)
+        _, cand_objects, _ = candidate.detect(img_path)
+        comparison = compare_detections(ref_objects, cand_objects, min_iou, max_conf_delta)
+        report['images'] += 1
+        if not comparison['passed']:
+            report['failed'].append({'path': img_path, **comparison})
+
+    report['passed'] = report['images'] > 0 and not report['failed']
+    return report
+
+
+if __name__ == "__main__":
+    # python -m services.inferenceBackends export --backends onnx openvino
+    # python -m services.inferenceBackends parity --backend onnx --images caminho/imagens
+    parser = argparse.ArgumentParser(description="Exportação e verificação de backends de inferência")
+    parser.add_argument('--weights', default=str(Config.YOLO_WEIGHTS_PATH))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export')
+    export_parser.add_argument('--backends', nargs='+', default=['onnx', 'openvino'],
+                               choices=[b for b, f in BACKEND_EXPORT_FORMATS.items() if f])
+    export_parser.add_argument('--imgsz', type=int, default=None)
+    export_parser.add_argument('--data', default=None, help="YAML do dataset usado na calibração INT8")
+
+    parity_parser = subparsers.add_parser('parity')
+    parity_parser.add_argument('--backend', required=True, choices=list(BACKEND_EXPORT_FORMATS))
+    parity_parser.add_argument('--images', required=True)
+    parity_parser.add_argument('--min-iou', type=float, default=0.9)
+    parity_parser.add_argument('--max-conf-delta', type=float, default=0.05)
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        export_model(args.weights, args.backends, args.imgsz, args.data)
+    else:
+        result = check_parity(args.weights, args.backend, args.images, args.min_iou, args.max_conf_delta)
+        logger.info(f"Paridade {args.backend}: {result['images']} imagens, "
+                    f"{len(result['failed'])} divergentes")
+        for failure in result['failed']:
+            logger.warning(f"Divergência em {failure['path']}: {failure}")
+        raise SystemExit(0 if result['passed'] else 1)
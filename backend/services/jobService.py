@@ -0,0 +1,202 @@
+import os
+import json
+import uuid
+import time
+import logging
+import threading
+import multiprocessing
+from typing import Dict, Optional
+from config.config import Config
+from services.supervisorService import SupervisedProcess
+from repositories.analysisJobRepository import (
+    create_job, get_job, claim_jobs, complete_job, fail_job, fail_abandoned_jobs
+)
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _job_input_path(job_id: str) -> str:
+    return os.path.join(Config.JOB_INPUT_FOLDER, f"{job_id}.bin")
+
+def submit_job(image_bytes: bytes, user_id: int) -> Dict:
+    """
+    Persiste os bytes enviados e enfileira um job de análise.
+    Retorna imediatamente; o processamento ocorre nos processos worker.
+    """
+    job_id = str(uuid.uuid4())
+    input_path = _job_input_path(job_id)
+    os.makedirs(Config.JOB_INPUT_FOLDER, exist_ok=True)
+
+    # Escrita atômica: o worker nunca enxerga um arquivo parcial
+    partial_path = f"{input_path}.part"
+    with open(partial_path, 'wb') as f:
+        f.write(image_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial_path, input_path)
+
+    try:
+        job = create_job(job_id, user_id, input_path)
+    except Exception:
+        os.remove(input_path)
+        raise
+
+    job_pool.ensure_started()
+    return serialize_job(job)
+
+def get_job_status(job_id: str, user_id: int) -> Optional[Dict]:
+    """Estado atual de um job do usuário, ou None se não existir"""
+    job = get_job(job_id, user_id)
+    return serialize_job(job) if job else None
+
+def serialize_job(job) -> Dict:
+    data = {
+        'job_id': job.JobID,
+        'status': job.Status,
+        'attempts': job.Attempts,
+        'created_at': job.CreatedAt.isoformat() if job.CreatedAt else None,
+        'started_at': job.StartedAt.isoformat() if job.StartedAt else None,
+        'finished_at': job.FinishedAt.isoformat() if job.FinishedAt else None
+    }
+    if job.Status == 'done' and job.ResultJson:
+        data['result'] = json.loads(job.ResultJson)
+    if job.Status == 'failed':
+        data['error'] = job.Error
+    return data
+
+
+def _process_jobs(jobs) -> None:
+    """
+    Processa os jobs reservados como um lote: uma inferência em lote e uma
+    única transação para gravar imagens, resultados e detecções.
+    """
+    from services.neuralNetworkService import analyze_jobs
+
+    loaded = []
+    for job in jobs:
+        try:
+            with open(job.InputPath, 'rb') as f:
+                loaded.append((job, f.read()))
+        except OSError as e:
+            fail_job(job.JobID, f"Entrada do job indisponível: {str(e)}")
+
+    if not loaded:
+        return
+
+    try:
+        outcomes = analyze_jobs([(job.JobID, job.UserID, image_bytes) for job, image_bytes in loaded])
+    except Exception as e:
+        logger.error(f"Lote de {len(loaded)} job(s) falhou: {str(e)}")
+        for job, _ in loaded:
+            fail_job(job.JobID, str(e))
+        return
+
+    jobs_by_id = {job.JobID: job for job, _ in loaded}
+    for outcome in outcomes:
+        job = jobs_by_id[outcome['filename']]
+        if outcome['status'] != 'ok':
+            logger.error(f"Job {job.JobID} falhou: {outcome['message']}")
+            fail_job(job.JobID, outcome['message'])
+            continue
+
+        complete_job(job.JobID, outcome['data'])
+        try:
+            os.remove(job.InputPath)
+        except OSError:
+            pass
+        logger.info(f"Job {job.JobID} concluído")
+
+def run_worker(poll_interval: float = None) -> None:
+    """
+    Laço principal de um processo worker: reserva jobs da tabela AnalysisJobs
+    e executa inferência, renderização, armazenamento e gravação no banco.
+    """
+    from app import app
+    from extensions import db
+    from services.detectObjectService import start_model_loading
+    from services.modelRegistryService import sync_active_model
+
+    start_model_loading()
+    poll_interval = poll_interval or Config.JOB_POLL_INTERVAL_SECONDS
+    logger.info(f"Worker de jobs iniciado (pid={os.getpid()})")
+
+    while True:
+        jobs = []
+        try:
+            with app.app_context():
+                sync_active_model()
+                fail_abandoned_jobs(Config.JOB_LEASE_SECONDS, Config.JOB_MAX_ATTEMPTS)
+                jobs = claim_jobs(Config.JOB_CLAIM_BATCH_SIZE, Config.JOB_LEASE_SECONDS, Config.JOB_MAX_ATTEMPTS)
+                if jobs:
+                    _process_jobs(jobs)
+                db.session.remove()
+        except Exception as e:
+            logger.error(f"Erro no worker de jobs: {str(e)}", exc_info=True)
+
+        if not jobs:
+            time.sleep(poll_interval)
+
+
+class JobWorkerPool:
+    """
+    Pool de processos worker para jobs de análise. Usa o contexto 'spawn'
+    para que cada processo carregue o próprio modelo, sem herdar threads
+    ou conexões do processo web. Workers que morrem são reiniciados com
+    backoff e até um limite de tentativas (ver SupervisedProcess).
+    """
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self._workers = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _supervised(self, index: int) -> SupervisedProcess:
+        context = multiprocessing.get_context('spawn')
+        name = f"job-worker-{index}"
+
+        def start():
+            process = context.Process(target=run_worker, name=name, daemon=True)
+            process.start()
+            return process
+
+        return SupervisedProcess(
+            name, start, lambda process: process.is_alive(),
+            max_restarts=Config.JOB_WORKER_MAX_RESTARTS,
+            backoff_max_seconds=Config.JOB_WORKER_RESTART_BACKOFF_MAX_SECONDS
+        )
+
+    def ensure_started(self) -> None:
+        if self.processes <= 0:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._workers = [self._supervised(index) for index in range(self.processes)]
+                self._pid = os.getpid()
+                logger.info(f"Pool de jobs com {self.processes} processo(s) worker")
+            for worker in self._workers:
+                worker.check()
+
+    def supervise(self, interval: float = 1.0) -> None:
+        """Mantém os workers no processo atual até todos desistirem (execução dedicada)"""
+        while True:
+            self.ensure_started()
+            if all(worker.gave_up for worker in self._workers):
+                logger.error("Todos os workers de jobs desistiram; encerrando o supervisor")
+                return
+            time.sleep(interval)
+
+
+# Instância global (processos embutidos no servidor web; 0 desabilita)
+job_pool = JobWorkerPool(Config.JOB_WORKER_PROCESSES)
+
+
+if __name__ == "__main__":
+    # Execução dedicada: python -m services.jobService (iniciada pelo mestre do gunicorn)
+    import signal
+    import sys
+    # SIGTERM do mestre: sai normalmente para que os workers (daemon) sejam encerrados junto
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    JobWorkerPool(max(1, Config.JOB_DEDICATED_WORKER_PROCESSES)).supervise()
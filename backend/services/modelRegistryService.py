@@ -0,0 +1,134 @@
+import os
+import csv
+import time
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+from config.config import Config
+from repositories.modelVersionRepository import (
+    register_model_version, list_model_versions, get_active_model_version, activate_model_version
+)
+from services.detectObjectService import compute_model_version, swap_model, get_model_status
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_sync_state = {'checked_at': 0.0}
+
+
+def _allowed_roots() -> List[Path]:
+    return [Path(d).resolve() for d in Config.MODEL_REGISTRY_SEARCH_DIRS]
+
+def _resolve_weights(weights_path: str) -> Path:
+    """Aceita apenas arquivos .pt dentro dos diretórios do registro (carregar um .pt executa código)"""
+    path = Path(weights_path).resolve()
+    if path.suffix != '.pt' or not path.is_file():
+        raise ValueError(f"Arquivo de pesos inválido: {weights_path}")
+    if not any(path.is_relative_to(root) for root in _allowed_roots()):
+        raise ValueError(f"Pesos fora dos diretórios do registro: {weights_path}")
+    return path
+
+def _training_metadata(weights_path: Path) -> Dict:
+    """Argumentos e métricas finais do treino (layout do ultralytics: <run>/weights/best.pt)"""
+    run_dir = weights_path.parent.parent if weights_path.parent.name == 'weights' else weights_path.parent
+    metadata = {'run': run_dir.name}
+
+    args_path = run_dir / 'args.yaml'
+    if args_path.exists():
+        import yaml
+        with open(args_path) as f:
+            args = yaml.safe_load(f) or {}
+        metadata['train_args'] = {k: args.get(k) for k in ('model', 'data', 'epochs', 'imgsz', 'batch') if k in args}
+
+    results_path = run_dir / 'results.csv'
+    if results_path.exists():
+        with open(results_path, newline='') as f:
+            rows = [{k.strip(): v.strip() for k, v in row.items()} for row in csv.DictReader(f)]
+        if rows:
+            last = rows[-1]
+            metadata['metrics'] = {
+                'epoch': int(last['epoch']),
+                'map50': float(last['metrics/mAP50(B)']),
+                'map50_95': float(last['metrics/mAP50-95(B)'])
+            }
+    return metadata
+
+def serialize_model_version(version) -> Dict:
+    return {
+        'id': version.VersionID,
+        'name': version.Name,
+        'weights_path': version.WeightsPath,
+        'backend': version.Backend,
+        'checksum': version.Checksum,
+        'size_bytes': version.SizeBytes,
+        'metadata': json.loads(version.MetadataJson) if version.MetadataJson else {},
+        'status': version.Status,
+        'created_at': version.CreatedAt.isoformat() if version.CreatedAt else None,
+        'activated_at': version.ActivatedAt.isoformat() if version.ActivatedAt else None
+    }
+
+def register_weights(weights_path: str, name: str = None, backend: str = None) -> Dict:
+    """Registra um arquivo de pesos (checksum, tamanho e metadados do treino)"""
+    path = _resolve_weights(weights_path)
+    backend = backend or Config.YOLO_BACKEND
+    # Mesma identidade usada por YOLOv8Detector.model_version
+    checksum = compute_model_version(path, backend)
+
+    version = register_model_version(
+        name=name or f"{path.parent.parent.name if path.parent.name == 'weights' else path.parent.name}/{path.stem}",
+        weights_path=str(path),
+        backend=backend,
+        checksum=checksum,
+        size_bytes=path.stat().st_size,
+        metadata=_training_metadata(path)
+    )
+    return serialize_model_version(version)
+
+def discover_models(backend: str = None) -> List[Dict]:
+    """Registra todos os .pt encontrados nos diretórios do registro"""
+    registered = []
+    for root in _allowed_roots():
+        if not root.exists():
+            continue
+        for weights_path in sorted(root.rglob('*.pt')):
+            try:
+                registered.append(register_weights(str(weights_path), backend=backend))
+            except Exception as e:
+                logger.warning(f"Não foi possível registrar {weights_path}: {str(e)}")
+    return registered
+
+def list_models() -> Dict:
+    """Versões registradas e o estado do modelo servido neste processo"""
+    return {
+        'versions': [serialize_model_version(v) for v in list_model_versions()],
+        'serving': get_model_status()
+    }
+
+def activate_model(version_id: int) -> Optional[Dict]:
+    """
+    Torna a versão ativa no registro e inicia a troca neste processo; os demais
+    processos (workers, servidor de modelo, jobs) a adotam em sync_active_model().
+    """
+    version = activate_model_version(version_id)
+    if version is None:
+        return None
+    started = swap_model(version.WeightsPath, version.Backend)
+    _sync_state['checked_at'] = time.monotonic()
+    logger.info(f"Versão {version.VersionID} ({version.Name}) ativada; troca iniciada: {started}")
+    return {**serialize_model_version(version), 'swap_started': started}
+
+def sync_active_model(force: bool = False) -> None:
+    """
+    Consulta (no máximo a cada MODEL_REGISTRY_POLL_SECONDS) a versão ativa no
+    registro e inicia a troca se este processo ainda serve outra.
+    """
+    now = time.monotonic()
+    if not force and now - _sync_state['checked_at'] < Config.MODEL_REGISTRY_POLL_SECONDS:
+        return
+    _sync_state['checked_at'] = now
+
+    active = get_active_model_version()
+    if active is not None and os.path.exists(active.WeightsPath):
+        swap_model(active.WeightsPath, active.Backend)
@@ -0,0 +1,311 @@
+import os
+import json
+import queue
+import socket
+import struct
+import logging
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config.config import Config
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('!I')
+
+
+def _send_message(sock: socket.socket, message: Dict) -> None:
+    payload = json.dumps(message).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Conexão encerrada pelo outro lado")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def _recv_message(sock: socket.socket) -> Dict:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+class SharedSlotRing:
+    """
+    Anel de slots de tamanho fixo sobre um único segmento de memória compartilhada.
+    Cada slot guarda uma imagem decodificada (uint8 HxWx3); o canal de controle
+    só transporta o índice do slot e a forma do array.
+    """
+
+    def __init__(self, name: str, slots: int, slot_bytes: int, create: bool):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        if create:
+            try:
+                # Segmento órfão de uma execução anterior
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            self._check_shm_capacity(slots * slot_bytes)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Clientes não são donos do segmento: evita que o resource_tracker o remova na saída
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.owner = create
+
+    @staticmethod
+    def _check_shm_capacity(size: int) -> None:
+        """
+        O segmento é esparso: um /dev/shm pequeno demais (64MB por padrão no Docker)
+        só falha com SIGBUS quando um slot é escrito. Falha na inicialização.
+        """
+        if not os.path.isdir('/dev/shm'):
+            return
+        stats = os.statvfs('/dev/shm')
+        available = stats.f_bavail * stats.f_frsize
+        if size > available:
+            raise MemoryError(
+                f"Memória compartilhada insuficiente: o anel precisa de {size // 2 ** 20}MB e o "
+                f"/dev/shm tem {available // 2 ** 20}MB livres. Reduza MODEL_SERVER_SLOTS/"
+                f"MODEL_SERVER_SLOT_BYTES ou aumente o --shm-size do contêiner")
+
+    def view(self, slot: int, shape: Tuple[int, ...]) -> np.ndarray:
+        size = int(np.prod(shape))
+        if size > self.slot_bytes:
+            raise ValueError(f"Imagem de {size} bytes excede o slot de {self.slot_bytes} bytes")
+        offset = slot * self.slot_bytes
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+
+    def close(self) -> None:
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class _ModelRequestHandler(socketserver.BaseRequestHandler):
+    """Uma conexão = um slot arrendado do anel durante toda a vida da conexão"""
+
+    def setup(self):
+        try:
+            self.slot = self.server.free_slots.get(timeout=Config.MODEL_SERVER_SLOT_WAIT_SECONDS)
+        except queue.Empty:
+            # Todos os slots arrendados: recusa em vez de bloquear a thread para sempre
+            self.slot = None
+            logger.warning("Conexão recusada: nenhum slot livre no anel de memória compartilhada")
+            _send_message(self.request, {'error': "Nenhum slot livre no servidor de modelo"})
+            return
+        _send_message(self.request, {
+            'shm': self.server.ring.shm.name,
+            'slot': self.slot,
+            'slot_bytes': self.server.ring.slot_bytes
+        })
+
+    def handle(self):
+        from services.detectObjectService import (
+            get_detection_results, get_model_version, get_model_status, get_batching_stats,
+            get_replica_stats, get_cascade_stats, swap_model
+        )
+
+        if self.slot is None:
+            return
+
+        while True:
+            try:
+                message = _recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            try:
+                if message['op'] == 'info':
+                    status = get_model_status()
+                    reply = {'status': status}
+                    if status['state'] == 'ready':
+                        reply['model_version'] = get_model_version()
+                elif message['op'] == 'stats':
+                    reply = {'stats': get_batching_stats()}
+                elif message['op'] == 'replicas':
+                    reply = {'stats': get_replica_stats()}
+                elif message['op'] == 'cascade':
+                    reply = {'stats': get_cascade_stats()}
+                elif message['op'] == 'swap':
+                    reply = {'started': swap_model(message['weights_path'], message['backend'])}
+                elif message['op'] == 'detect':
+                    image = self.server.ring.view(self.slot, tuple(message['shape']))
+                    render = message.get('render', True)
+                    detection_img, objects, metrics = get_detection_results(image, message.get('imgsz'), render)
+                    if render:
+                        # A imagem anotada volta pelo mesmo slot (mesmas dimensões da entrada)
+                        image[...] = detection_img
+                    reply = {'objects': objects, 'metrics': metrics}
+                else:
+                    reply = {'error': f"Operação desconhecida: {message['op']}"}
+            except Exception as e:
+                logger.error(f"Erro no servidor de modelo: {str(e)}", exc_info=True)
+                reply = {'error': str(e)}
+
+            _send_message(self.request, reply)
+
+    def finish(self):
+        if self.slot is not None:
+            self.server.free_slots.put(self.slot)
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, ring: SharedSlotRing):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.ring = ring
+        self.free_slots = queue.Queue()
+        for slot in range(ring.slots):
+            self.free_slots.put(slot)
+        super().__init__(socket_path, _ModelRequestHandler)
+
+
+def run_model_server() -> None:
+    """
+    Processo dedicado que possui o único modelo carregado. Os workers web
+    enviam imagens pelo anel de memória compartilhada e recebem as detecções
+    pelo socket Unix; as requisições concorrentes passam pelo micro-batching.
+    """
+    from services.detectObjectService import set_model_server_role, start_model_loading
+
+    set_model_server_role()
+    start_model_loading()
+
+    ring = SharedSlotRing(Config.MODEL_SERVER_SHM_NAME, Config.MODEL_SERVER_SLOTS,
+                          Config.MODEL_SERVER_SLOT_BYTES, create=True)
+    server = ModelServer(Config.MODEL_SERVER_SOCKET, ring)
+    logger.info(f"Servidor de modelo ouvindo em {Config.MODEL_SERVER_SOCKET} "
+                f"({ring.slots} slots de {ring.slot_bytes // 2 ** 20}MB)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        ring.close()
+        if os.path.exists(Config.MODEL_SERVER_SOCKET):
+            os.remove(Config.MODEL_SERVER_SOCKET)
+
+
+class _Connection:
+    def __init__(self, socket_path: str, timeout: float):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        try:
+            hello = _recv_message(self.sock)
+        except Exception:
+            self.sock.close()
+            raise
+        if 'error' in hello:
+            self.sock.close()
+            raise RuntimeError(hello['error'])
+        self.slot = hello['slot']
+        self.ring = SharedSlotRing(hello['shm'], hello['slot'] + 1, hello['slot_bytes'], create=False)
+
+    def request(self, message: Dict) -> Dict:
+        _send_message(self.sock, message)
+        reply = _recv_message(self.sock)
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        finally:
+            self.ring.shm.close()
+
+
+class ModelServerClient:
+    """Cliente usado pelos workers web; mantém um pool de conexões (cada uma com seu slot)"""
+
+    def __init__(self, socket_path: str, max_connections: int = 4, timeout: float = 120):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self.max_connections = max_connections
+        self._pid = os.getpid()
+
+    def _reset_after_fork(self) -> None:
+        if self._pid != os.getpid():
+            self._idle = queue.LifoQueue()
+            self._slots = threading.BoundedSemaphore(self.max_connections)
+            self._pid = os.getpid()
+
+    def _call(self, fn):
+        self._reset_after_fork()
+        self._slots.acquire()
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = _Connection(self.socket_path, self.timeout)
+            try:
+                result = fn(connection)
+            except RuntimeError:
+                # Erro respondido pelo servidor: a conexão continua em ordem
+                self._idle.put(connection)
+                raise
+            except Exception:
+                # Conexão caída ou em estado desconhecido: fecha e devolve o slot ao servidor
+                connection.close()
+                raise
+            self._idle.put(connection)
+            return result
+        finally:
+            self._slots.release()
+
+    def info(self) -> Dict:
+        return self._call(lambda connection: connection.request({'op': 'info'}))
+
+    def stats(self) -> Dict:
+        return self._call(lambda connection: connection.request({'op': 'stats'}))['stats']
+
+    def replica_stats(self) -> Dict:
+        return self._call(lambda connection: connection.request({'op': 'replicas'}))['stats']
+
+    def cascade_stats(self) -> Dict:
+        return self._call(lambda connection: connection.request({'op': 'cascade'}))['stats']
+
+    def swap(self, weights_path: str, backend: str) -> bool:
+        message = {'op': 'swap', 'weights_path': weights_path, 'backend': backend}
+        return self._call(lambda connection: connection.request(message))['started']
+
+    def detect(self, image: np.ndarray, imgsz: int = None,
+               render: bool = True) -> Tuple[Optional[np.ndarray], List[Dict], Dict]:
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+
+        def run(connection: _Connection):
+            view = connection.ring.view(connection.slot, image.shape)
+            view[...] = image
+            reply = connection.request({'op': 'detect', 'shape': list(image.shape),
+                                        'imgsz': imgsz, 'render': render})
+            return view.copy() if render else None, reply['objects'], reply['metrics']
+
+        return self._call(run)
+
+    def detect_batch(self, images: List[np.ndarray], sizes: List[int] = None,
+                     render: bool = True) -> List[Tuple[Optional[np.ndarray], List[Dict], Dict]]:
+        # Envios concorrentes para que o servidor os agrupe num único lote
+        sizes = sizes or [None] * len(images)
+        with ThreadPoolExecutor(max_workers=min(len(images), self.max_connections) or 1) as pool:
+            return list(pool.map(lambda image, imgsz: self.detect(image, imgsz, render), images, sizes))
+
+
+if __name__ == "__main__":
+    # Execução dedicada: python -m services.modelServerService
+    run_model_server()
@@ -1,155 +1,420 @@
-import os
 import uuid
 import logging
-import time
 from datetime import datetime
-from typing import Dict, List, Optional
-from imgurpython import ImgurClient
-from imgurpython.helpers.error import ImgurClientError
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from flask import current_app
 import cv2
-import json
+import numpy as np
 from config.config import Config
-from repositories.neuralNetworkRepository import save_image, save_recognition_result
-from services.detectObjectService import get_detection_results
+from repositories.neuralNetworkRepository import save_analyses
+from services.detectObjectService import (
+    get_detection_results, get_batch_detection_results, get_model_version
+)
+from services.resultCacheService import result_cache, compute_content_hash
+from services.uploadQueueService import upload_queue
+from repositories.uploadTaskRepository import get_remote_url
+from services.renderService import store_pending_render, has_pending_render
+from services.imageStoreService import image_store, PUBLIC_URL_PREFIX
+from services.derivativeService import derivative_generator
+from services.imageDecodeService import (
+    decode_downscaled, probe_image_size, choose_inference_size, scale_detections
+)
 
 logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class NeuralNetworkService:
-    def __init__(self):
-        """Inicializa o serviço com cliente Imgur"""
+    def _save_image_locally(self, image_data: bytes) -> str:
+        """Salva a imagem (já codificada) no armazenamento local e retorna a URL relativa"""
         try:
-            self.imgur_client = ImgurClient(
-                Config.IMGUR_CLIENT_ID, 
-                Config.IMGUR_CLIENT_SECRET
-            )
-            logger.info("Serviço neural configurado com Imgur")
+            return image_store.put(image_data, '.jpg')
         except Exception as e:
-            logger.error(f"Falha ao configurar Imgur: {str(e)}")
-            self.imgur_client = None  # Permite o funcionamento sem Imgur
+            logger.error(f"Falha ao salvar imagem localmente: {str(e)}")
+            raise Exception("Falha ao armazenar imagem localmente")
+
+    @staticmethod
+    def _decode_image(image_bytes: bytes) -> Tuple[np.ndarray, Tuple[float, float]]:
+        """
+        Decodifica os bytes enviados para um ndarray BGR já reduzido a
+        IMAGE_DECODE_MAX_SIDE; retorna também a escala (x, y) de volta à original.
+        """
+        image, (width, height) = decode_downscaled(image_bytes)
+        return image, (width / image.shape[1], height / image.shape[0])
+
+    @staticmethod
+    def _image_sizes(image: np.ndarray, scale: Tuple[float, float]) -> Dict:
+        """
+        (largura, altura) da original, espaço das caixas retornadas, e da imagem
+        processada/anotada (a decodificação reduzida), que é a servida em image_url
+        """
+        height, width = image.shape[:2]
+        return {
+            'image_size': (round(width * scale[0]), round(height * scale[1])),
+            'processed_size': (width, height)
+        }
 
-    def _upload_to_imgur(self, image_path: str, image_uuid: str, max_retries: int = 3) -> Optional[str]:
+    @staticmethod
+    def _plan_inference_size(image_bytes: bytes, requested_imgsz: int = None) -> int:
+        """imgsz da requisição, escolhido pelo cabeçalho antes de decodificar"""
+        size = probe_image_size(image_bytes)
+        if size is None:
+            return choose_inference_size(Config.YOLO_EXPORT_IMGSZ, Config.YOLO_EXPORT_IMGSZ, requested_imgsz)
+        longest = max(size)
+        if Config.IMAGE_DECODE_MAX_SIDE:
+            longest = min(longest, Config.IMAGE_DECODE_MAX_SIDE)
+        return choose_inference_size(longest, longest, requested_imgsz)
+
+    @staticmethod
+    def _encode_image(image: np.ndarray) -> bytes:
+        """Codifica a imagem anotada em JPEG, uma única vez, em memória"""
+        success, encoded = cv2.imencode('.jpg', image)
+        if not success:
+            raise ValueError("Falha ao codificar a imagem processada")
+        return encoded.tobytes()
+
+    def _lookup_cache(self, image_bytes: bytes, imgsz: int) -> Tuple[str, str, Optional[Dict]]:
+        """Consulta o cache endereçado por conteúdo antes de tocar no modelo"""
+        content_hash = compute_content_hash(image_bytes)
+        if imgsz != Config.YOLO_EXPORT_IMGSZ:
+            # O resultado depende do tamanho de entrada: a chave inclui o imgsz
+            content_hash = compute_content_hash(f"{content_hash}:{imgsz}".encode())
+        model_version = get_model_version()
+        return content_hash, model_version, self._usable_cached(result_cache.get(content_hash, model_version))
+
+    @staticmethod
+    def _usable_cached(cached: Optional[Dict]) -> Optional[Dict]:
         """
-        Faz upload de uma imagem para o Imgur com retentativas e tratamento robusto de erros
-        Retorna None se o upload falhar após todas as tentativas
+        Garante que a imagem de um acerto de cache ainda exista. Arquivos locais
+        têm o acesso registrado para a retenção; se já foram removidos (upload
+        concluído, mas este processo ainda guarda a URL local), usa a URL remota.
+        Sem nenhuma das duas, o acerto é descartado e a imagem é analisada de novo.
         """
-        if not self.imgur_client:
-            logger.warning("Upload ao Imgur desabilitado - cliente não configurado")
+        if cached is None or not cached['image_url'].startswith(PUBLIC_URL_PREFIX):
+            return cached
+        image_url = cached['image_url']
+        if image_store.touch(image_url) or has_pending_render(image_url):
+            return cached
+
+        remote_url = get_remote_url(image_url)
+        if remote_url is None:
+            logger.warning(f"Imagem em cache {image_url} não existe mais; analisando novamente")
             return None
+        result_cache.replace_url(image_url, remote_url)
+        return dict(cached, image_url=remote_url)
 
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Tentando upload para Imgur (tentativa {attempt + 1}/{max_retries})")
-                response = self.imgur_client.upload_from_path(image_path, anon=True)
-                
-                # Log detalhado da resposta (sem dados sensíveis)
-                logger.debug(f"Resposta do Imgur: { {k: v for k, v in response.items() if k not in ['deletehash', 'account_url']} }")
-                
-                image_url = f"{response['link']}?uuid={image_uuid}"
-                logger.info(f"Upload para Imgur bem-sucedido: {image_url}")
-                return image_url
-                
-            except ImgurClientError as e:
-                if 'rate limit' in str(e).lower():
-                    wait_time = (attempt + 1) * 5  # Backoff exponencial
-                    logger.warning(f"Limite de taxa do Imgur atingido. Tentando novamente em {wait_time} segundos...")
-                    time.sleep(wait_time)
-                    continue
-                
-                logger.error(f"Erro do cliente Imgur: {str(e)}")
-                return None
-                
-            except Exception as e:
-                logger.error(f"Erro inesperado ao enviar para Imgur: {str(e)}")
-                if attempt == max_retries - 1:
-                    return None
-                time.sleep(2)  # Pequena pausa antes de tentar novamente
+    def _store_processed(self, detection_img: np.ndarray, image_uuid: str) -> str:
+        """
+        Codifica a imagem anotada uma única vez e grava no armazenamento local;
+        o upload ao Imgur acontece depois, na fila em segundo plano.
+        """
+        processed_bytes = self._encode_image(detection_img)
+        return self._save_image_locally(processed_bytes)
 
-        return None
+    def _record_result(self, user_id: int, image_uuid: str, content_hash: str, model_version: str,
+                       detected_objects: List[Dict], image_url: str, raw_metrics: Dict,
+                       cached: bool, rendered: bool = True,
+                       processed_image: Optional[np.ndarray] = None, sizes: Optional[Dict] = None) -> Dict:
+        """Grava uma única análise (ver _record_results) e monta a resposta"""
+        return self._record_results([{
+            'user_id': user_id,
+            'image_uuid': image_uuid,
+            'content_hash': content_hash,
+            'model_version': model_version,
+            'detected_objects': detected_objects,
+            'image_url': image_url,
+            'raw_metrics': raw_metrics,
+            'cached': cached,
+            'rendered': rendered,
+            'processed_image': processed_image,
+            **(sizes or {})
+        }])[0]
+
+    def _record_results(self, entries: List[Dict]) -> List[Dict]:
+        """
+        Grava imagens, resultados e detecções de várias análises numa única
+        transação, depois agenda uploads e variantes e monta as respostas.
+        Cada entrada tem os mesmos campos dos argumentos de _record_result.
+        """
+        analyses = []
+        for entry in entries:
+            detected_objects = entry['detected_objects']
+            entry['accuracy'] = sum(obj['confidence'] for obj in detected_objects) / max(1, len(detected_objects))
+            # Uma troca de modelo pode ocorrer entre a consulta ao cache e a inferência
+            entry['model_version'] = entry['raw_metrics'].get('model_version') or entry['model_version']
+            analyses.append({
+                'user_id': entry['user_id'],
+                'image_path': entry['image_url'],
+                'detected_objects': detected_objects,
+                'processed_image_path': entry['image_url'],
+                'accuracy': entry['accuracy'],
+                'inference_time': entry['raw_metrics'].get('inference_time'),
+                'total_time': entry['raw_metrics'].get('total_time'),
+                'confidence_avg': entry['accuracy'],
+                'objects_count': len(detected_objects),
+                'model_version': entry['model_version']
+            })
+
+        # Salva no banco de dados
+        ids = save_analyses(analyses)
+        return [self._finish_result(entry, image_id, result_id)
+                for entry, (image_id, result_id) in zip(entries, ids)]
+
+    def _finish_result(self, entry: Dict, image_id: int, result_id: int) -> Dict:
+        """
+        Agenda o upload e as variantes (miniaturas/WebP) de uma análise já gravada.
+        Imagens ainda não renderizadas (modo render=false) não entram na fila de upload.
+        """
+        image_uuid, image_url, cached = entry['image_uuid'], entry['image_url'], entry['cached']
+        detected_objects, raw_metrics = entry['detected_objects'], entry['raw_metrics']
+        accuracy = entry['accuracy']
 
-    def _save_image_locally(self, image: bytes, filename: str) -> str:
-        """Salva a imagem localmente e retorna a URL relativa"""
         try:
-            public_dir = os.path.join(Config.UPLOAD_FOLDER, "public")
-            os.makedirs(public_dir, exist_ok=True)
-            local_path = os.path.join(public_dir, filename)
-            
-            cv2.imwrite(local_path, image)
-            return f"/uploads/public/{filename}"
+            if cached:
+                derivative_generator.submit(current_app._get_current_object(), result_id, source_url=image_url)
+            elif entry.get('processed_image') is not None:
+                derivative_generator.submit(current_app._get_current_object(), result_id,
+                                            image=entry['processed_image'])
         except Exception as e:
-            logger.error(f"Falha ao salvar imagem localmente: {str(e)}")
-            raise Exception("Falha ao armazenar imagem localmente")
+            # Sem variantes, os clientes recebem a imagem em tamanho original
+            logger.error(f"Falha ao agendar variantes da imagem {image_uuid}: {str(e)}")
 
-    def analyze_image(self, image_path: str, user_id: int, image_uuid: str = None) -> Dict:
+        if not cached:
+            if entry.get('rendered', True):
+                try:
+                    upload_queue.enqueue(current_app._get_current_object(), image_id, image_uuid, image_url)
+                except Exception as e:
+                    # A imagem continua disponível localmente mesmo sem o upload remoto
+                    logger.error(f"Falha ao agendar upload da imagem {image_uuid}: {str(e)}")
+            result_cache.put(
+                entry['content_hash'], entry['model_version'], result_id,
+                objects=detected_objects,
+                image_url=image_url,
+                accuracy=accuracy,
+                inference_time=raw_metrics.get('inference_time'),
+                total_time=raw_metrics.get('total_time'),
+                image_size=entry.get('image_size'),
+                processed_size=entry.get('processed_size')
+            )
+
+        metrics = {
+            'accuracy': round(accuracy, 4),
+            'inference_time': raw_metrics.get('inference_time'),
+            'total_time': raw_metrics.get('total_time'),
+            'imgsz': raw_metrics.get('imgsz')
+        }
+        # Nível que respondeu: cache, ou small/large quando a cascata está habilitada
+        tier = 'cache' if cached else raw_metrics.get('tier')
+
+        return {
+            'image_id': image_id,
+            'result_id': result_id,
+            'image_url': image_url,
+            'objects': [obj['class_name'] for obj in detected_objects],
+            # Caixas em coordenadas da original (image_size); image_url tem processed_image_size
+            'detections': detected_objects,
+            'image_size': self._size_dict(entry.get('image_size')),
+            'processed_image_size': self._size_dict(entry.get('processed_size')),
+            'accuracy': round(accuracy, 4),
+            'metrics': metrics,
+            'objects_count': len(detected_objects),
+            'cached': bool(cached),
+            'tier': tier
+        }
+
+    @staticmethod
+    def _size_dict(size: Optional[Tuple[int, int]]) -> Optional[Dict]:
+        # Entradas de cache anteriores ao registro das dimensões não as têm
+        return {'width': size[0], 'height': size[1]} if size else None
+
+    @staticmethod
+    def _cached_sizes(cached: Dict) -> Dict:
+        return {'image_size': cached.get('image_size'), 'processed_size': cached.get('processed_size')}
+
+    @staticmethod
+    def _cached_metrics(cached: Dict, imgsz: int) -> Dict:
+        return {
+            'inference_time': cached['inference_time'],
+            'total_time': cached['total_time'],
+            'imgsz': imgsz
+        }
+
+    def analyze_image(self, image_bytes: bytes, user_id: int, image_uuid: str = None,
+                      imgsz: int = None, render: bool = True) -> Dict:
         """
-        Processa imagem completa: detecção, upload (Imgur ou local) e salvamento.
+        Processa imagem completa: detecção, armazenamento local, salvamento e
+        agendamento do upload ao Imgur em segundo plano.
+        Todo o fluxo trabalha sobre buffers em memória, sem arquivos temporários.
+        As caixas retornadas estão nas coordenadas da imagem original (image_size);
+        a imagem anotada em image_url é a versão reduzida (processed_image_size).
+        Com render=False apenas as detecções são produzidas; a imagem anotada
+        é desenhada no primeiro GET da sua URL.
         """
         try:
             image_uuid = image_uuid or str(uuid.uuid4())
             logger.info(f"Iniciando análise da imagem {image_uuid}")
 
-            # Processa a imagem com YOLO
-            detection_img, detected_objects, raw_metrics = get_detection_results(image_path)
-            accuracy = sum(obj['confidence'] for obj in detected_objects) / max(1, len(detected_objects))
-            filename = f"processed_{image_uuid}.jpg"
-            temp_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-            
-            try:
-                # Salva a imagem processada temporariamente
-                cv2.imwrite(temp_path, detection_img)
-                
-                # Tenta upload no Imgur primeiro
-                image_url = self._upload_to_imgur(temp_path, image_uuid)
-                
-                # Fallback para armazenamento local se Imgur falhar
-                if not image_url:
-                    logger.warning("Usando fallback para armazenamento local")
-                    image_url = self._save_image_locally(detection_img, filename)
-                
-                # Salva no banco de dados
-                image_id = save_image(user_id, image_url)
-                detected_objects_json = json.dumps(detected_objects)
-                
-                save_recognition_result(
-                    image_id=image_id,
-                    recognized_objects=detected_objects_json,
-                    processed_image_path=image_url,
-                    accuracy=accuracy,
-                    inference_time=raw_metrics.get('inference_time'),
-                    total_time=raw_metrics.get('total_time'),  
-                    confidence_avg=accuracy,
-                    objects_count=len(detected_objects),
-                    detection_details=detected_objects_json
-                )
-
-                metrics = {
-                    'accuracy': round(accuracy, 4),
-                    'inference_time': raw_metrics.get('inference_time'),
-                    'total_time': raw_metrics.get('total_time') 
-                }
-
-                return {
-                    'image_id': image_id,
-                    'image_url': image_url,
-                    'objects': [obj['class_name'] for obj in detected_objects],
-                    'accuracy': round(accuracy, 4),
-                    'metrics': metrics,
-                    'objects_count': len(detected_objects) 
-                }
-                
-            finally:
-                # Limpeza do arquivo temporário
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+            imgsz = self._plan_inference_size(image_bytes, imgsz)
+            content_hash, model_version, cached = self._lookup_cache(image_bytes, imgsz)
+
+            if cached:
+                logger.info(f"Resultado em cache para a imagem {image_uuid}")
+                detected_objects = cached['objects']
+                image_url = cached['image_url']
+                raw_metrics = self._cached_metrics(cached, imgsz)
+                detection_img = None
+                sizes = self._cached_sizes(cached)
+            else:
+                # Processa a imagem com YOLO
+                image, (scale_x, scale_y) = self._decode_image(image_bytes)
+                sizes = self._image_sizes(image, (scale_x, scale_y))
+                detection_img, detected_objects, raw_metrics = get_detection_results(image, imgsz, render)
+                scale_detections(detected_objects, scale_x, scale_y)
+                raw_metrics['imgsz'] = imgsz
+                if render:
+                    image_url = self._store_processed(detection_img, image_uuid)
+                else:
+                    image_url = store_pending_render(image_uuid, image_bytes, detected_objects)
+
+            return self._record_result(
+                user_id, image_uuid, content_hash, model_version,
+                detected_objects, image_url, raw_metrics, cached, rendered=render,
+                processed_image=detection_img, sizes=sizes
+            )
                     
         except Exception as e:
             logger.error(f"Falha na análise da imagem {image_uuid}: {str(e)}", exc_info=True)
             raise Exception(f"Erro ao processar imagem: {str(e)}")
 
+    def analyze_images_batch(self, images: Iterable[Tuple[str, bytes]], user_id: int,
+                             batch_size: int = None) -> Iterator[Dict]:
+        """
+        Analisa várias imagens em lotes e produz um resultado por imagem assim
+        que o lote correspondente termina. Falhas individuais não interrompem o lote;
+        no lugar dos bytes pode vir a exceção de uma leitura que já falhou.
+        """
+        batch_size = batch_size or Config.INFERENCE_BATCH_MAX_SIZE
+        index = 0
+        chunk = []
+
+        for filename, image_bytes in images:
+            if isinstance(image_bytes, Exception):
+                yield {'index': index, 'filename': filename, 'status': 'error', 'message': str(image_bytes)}
+                index += 1
+                continue
+            chunk.append((index, filename, image_bytes, user_id, str(uuid.uuid4())))
+            index += 1
+            if len(chunk) >= batch_size:
+                yield from self._analyze_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            yield from self._analyze_chunk(chunk)
+
+    def analyze_jobs(self, jobs: List[Tuple[str, int, bytes]]) -> List[Dict]:
+        """
+        Analisa vários jobs (job_id, user_id, bytes) como um único lote, possivelmente
+        de usuários diferentes; o job_id identifica a imagem e o item do resultado.
+        """
+        chunk = [(index, job_id, image_bytes, user_id, job_id)
+                 for index, (job_id, user_id, image_bytes) in enumerate(jobs)]
+        return list(self._analyze_chunk(chunk))
+
+    def _record_chunk(self, items: List[Tuple[int, str, Dict]]) -> Iterator[Dict]:
+        """
+        Grava os itens (index, filename, entrada) de um lote numa única transação.
+        Se a gravação em conjunto falhar, regrava item a item para isolar o culpado.
+        """
+        if not items:
+            return
+        try:
+            results = self._record_results([entry for _, _, entry in items])
+        except Exception as e:
+            logger.warning(f"Gravação em lote falhou ({str(e)}); gravando item a item")
+            for index, filename, entry in items:
+                try:
+                    result = self._record_results([entry])[0]
+                    yield {'index': index, 'filename': filename, 'status': 'ok', 'data': result}
+                except Exception as item_error:
+                    logger.error(f"Falha ao gravar resultado de {filename}: {str(item_error)}")
+                    yield {'index': index, 'filename': filename, 'status': 'error', 'message': str(item_error)}
+            return
+
+        for (index, filename, _), result in zip(items, results):
+            yield {'index': index, 'filename': filename, 'status': 'ok', 'data': result}
+
+    def _analyze_chunk(self, chunk: List[Tuple[int, str, bytes, int, str]]) -> Iterator[Dict]:
+        pending = []  # Itens que precisam passar pelo modelo
+        cached_items = []
+
+        for index, filename, image_bytes, user_id, image_uuid in chunk:
+            try:
+                imgsz = self._plan_inference_size(image_bytes)
+                content_hash, model_version, cached = self._lookup_cache(image_bytes, imgsz)
+                if cached:
+                    cached_items.append((index, filename, {
+                        'user_id': user_id, 'image_uuid': image_uuid, 'content_hash': content_hash,
+                        'model_version': model_version, 'detected_objects': cached['objects'],
+                        'image_url': cached['image_url'], 'raw_metrics': self._cached_metrics(cached, imgsz),
+                        'cached': cached, **self._cached_sizes(cached)
+                    }))
+                    continue
+
+                image, scale = self._decode_image(image_bytes)
+                pending.append((index, filename, user_id, image_uuid, content_hash, model_version,
+                                imgsz, scale, image))
+            except Exception as e:
+                logger.error(f"Falha ao preparar {filename}: {str(e)}")
+                yield {'index': index, 'filename': filename, 'status': 'error', 'message': str(e)}
+
+        # Acertos no cache são gravados antes da inferência, numa transação própria
+        yield from self._record_chunk(cached_items)
+
+        if not pending:
+            return
+
+        try:
+            outputs = get_batch_detection_results([item[-1] for item in pending],
+                                                  [item[6] for item in pending])
+        except Exception as e:
+            logger.error(f"Falha na inferência em lote: {str(e)}", exc_info=True)
+            for index, filename, *_ in pending:
+                yield {'index': index, 'filename': filename, 'status': 'error', 'message': str(e)}
+            return
+
+        processed = []
+        for (index, filename, user_id, image_uuid, content_hash, model_version, imgsz, scale, _), output \
+                in zip(pending, outputs):
+            detection_img, detected_objects, raw_metrics = output
+            scale_detections(detected_objects, *scale)
+            raw_metrics['imgsz'] = imgsz
+            try:
+                image_url = self._store_processed(detection_img, image_uuid)
+            except Exception as e:
+                logger.error(f"Falha ao armazenar imagem de {filename}: {str(e)}")
+                yield {'index': index, 'filename': filename, 'status': 'error', 'message': str(e)}
+                continue
+            processed.append((index, filename, {
+                'user_id': user_id, 'image_uuid': image_uuid, 'content_hash': content_hash,
+                'model_version': model_version, 'detected_objects': detected_objects,
+                'image_url': image_url, 'raw_metrics': raw_metrics, 'cached': None,
+                'processed_image': detection_img, **self._image_sizes(detection_img, scale)
+            }))
+
+        yield from self._record_chunk(processed)
+
 # Instância global
 neural_service = NeuralNetworkService()
 
-def analyze_image(image_path: str, user_id: int, image_uuid: str = None) -> Dict:
+def analyze_image(image_bytes: bytes, user_id: int, image_uuid: str = None, imgsz: int = None,
+                  render: bool = True) -> Dict:
     """Interface pública para análise de imagens"""
-    return neural_service.analyze_image(image_path, user_id, image_uuid)
\ No newline at end of file
+    return neural_service.analyze_image(image_bytes, user_id, image_uuid, imgsz, render)
+
+def analyze_images_batch(images: Iterable[Tuple[str, bytes]], user_id: int) -> Iterator[Dict]:
+    """Interface pública para análise de várias imagens em lote"""
+    return neural_service.analyze_images_batch(images, user_id)
+
+def analyze_jobs(jobs: List[Tuple[str, int, bytes]]) -> List[Dict]:
+    """Interface pública para análise de vários jobs num único lote"""
+    return neural_service.analyze_jobs(jobs)
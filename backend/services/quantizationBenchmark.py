@@ -0,0 +1,162 @@
+import csv
+import json
+import time
+import argparse
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List, Optional
+from config.config import Config
+from services.benchmarkUtils import percentile, validation_images
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_training_reference(runs_dir: Path) -> Optional[Dict]:
+    """
+    mAP da última época do treino mais recente (treino-rede-neural-yolov8/trainN/results.csv),
+    usado como referência para os números medidos aqui.
+    """
+    runs = sorted(
+        (d for d in Path(runs_dir).glob('train*') if (d / 'results.csv').exists()),
+        key=lambda d: int(''.join(c for c in d.name if c.isdigit()) or 0)
+    )
+    if not runs:
+        return None
+
+    with open(runs[-1] / 'results.csv', newline='') as f:
+        rows = [{k.strip(): v.strip() for k, v in row.items()} for row in csv.DictReader(f)]
+    if not rows:
+        return None
+
+    last = rows[-1]
+    return {
+        'run': runs[-1].name,
+        'epoch': int(last['epoch']),
+        'map50': float(last['metrics/mAP50(B)']),
+        'map50_95': float(last['metrics/mAP50-95(B)'])
+    }
+
+def benchmark_backend(weights_path: str, backend: str, data_yaml: str,
+                      latency_images: int = 200, warmup: int = 5) -> Dict:
+    """
+    Mede um backend isoladamente: mAP50/mAP50-95 no split de validação,
+    latência p50/p95 por imagem e RSS do processo após carregar e rodar o modelo.
+    """
+    import psutil
+    from services.detectObjectService import YOLOv8Detector
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    detector = YOLOv8Detector(weights_path, backend=backend)
+    load_started = time.perf_counter()
+    detector.load_model()
+    load_ms = (time.perf_counter() - load_started) * 1000
+    rss_loaded = process.memory_info().rss
+
+    images = validation_images(Path(data_yaml), latency_images + warmup)
+    for img_path in images[:warmup]:
+        detector.detect(img_path)
+
+    latencies = []
+    for img_path in images[warmup:]:
+        started = time.perf_counter()
+        detector.detect(img_path)
+        latencies.append((time.perf_counter() - started) * 1000)
+    rss_peak = process.memory_info().rss
+
+    metrics = detector.model.val(data=str(data_yaml), imgsz=Config.YOLO_EXPORT_IMGSZ,
+                                 batch=1, plots=False, verbose=False)
+
+    return {
+        'backend': backend,
+        'map50': round(float(metrics.box.map50), 4),
+        'map50_95': round(float(metrics.box.map), 4),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'images': len(latencies)
+        },
+        'load_ms': round(load_ms, 1),
+        'rss_mb': {
+            'model': round((rss_loaded - rss_before) / 2 ** 20, 1),
+            'after_inference': round(rss_peak / 2 ** 20, 1)
+        }
+    }
+
+def _run_isolated(queue, *args) -> None:
+    try:
+        queue.put(benchmark_backend(*args))
+    except Exception as e:
+        queue.put({'backend': args[1], 'error': str(e)})
+
+def compare_backends(weights_path: str, backends: List[str], data_yaml: str,
+                     latency_images: int = 200) -> Dict:
+    """
+    Roda cada backend num processo próprio (RSS não contaminado pelos demais)
+    e monta o relatório comparativo, incluindo a referência do treino.
+    """
+    context = multiprocessing.get_context('spawn')
+    report = {
+        'weights': str(weights_path),
+        'dataset': str(data_yaml),
+        'training_reference': load_training_reference(Config.YOLO_TRAINING_RUNS_DIR),
+        'backends': []
+    }
+    for backend in backends:
+        logger.info(f"Medindo backend {backend}")
+        queue = context.Queue()
+        process = context.Process(target=_run_isolated,
+                                  args=(queue, str(weights_path), backend, str(data_yaml), latency_images))
+        process.start()
+        result = queue.get()
+        process.join()
+        report['backends'].append(result)
+
+    baseline = next((b for b in report['backends'] if b['backend'] == 'torch' and 'error' not in b), None)
+    if baseline:
+        for result in report['backends']:
+            if 'error' in result or result is baseline:
+                continue
+            result['delta_vs_torch'] = {
+                'map50': round(result['map50'] - baseline['map50'], 4),
+                'map50_95': round(result['map50_95'] - baseline['map50_95'], 4),
+                'p50_speedup': round(baseline['latency_ms']['p50'] / max(result['latency_ms']['p50'], 1e-6), 2)
+            }
+    return report
+
+def format_report(report: Dict) -> str:
+    lines = []
+    reference = report.get('training_reference')
+    if reference:
+        lines.append(f"Referência do treino ({reference['run']}, época {reference['epoch']}): "
+                     f"mAP50={reference['map50']:.4f} mAP50-95={reference['map50_95']:.4f}")
+    lines.append(f"{'backend':<15}{'mAP50':>8}{'mAP50-95':>10}{'p50 ms':>9}{'p95 ms':>9}{'RSS MB':>9}")
+    for result in report['backends']:
+        if 'error' in result:
+            lines.append(f"{result['backend']:<15}erro: {result['error']}")
+            continue
+        lines.append(f"{result['backend']:<15}{result['map50']:>8.4f}{result['map50_95']:>10.4f}"
+                     f"{result['latency_ms']['p50']:>9.1f}{result['latency_ms']['p95']:>9.1f}"
+                     f"{result['rss_mb']['after_inference']:>9.1f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python -m services.quantizationBenchmark --backends torch onnx-int8 openvino-int8
+    parser = argparse.ArgumentParser(description="Compara precisão e custo dos backends/quantizações")
+    parser.add_argument('--weights', default=str(Config.YOLO_WEIGHTS_PATH))
+    parser.add_argument('--data', default=str(Config.YOLO_DATASET_YAML))
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'onnx-int8', 'openvino-int8'])
+    parser.add_argument('--latency-images', type=int, default=200)
+    parser.add_argument('--output', default=None, help="Grava o relatório completo em JSON")
+    args = parser.parse_args()
+
+    report = compare_backends(args.weights, args.backends, args.data, args.latency_images)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
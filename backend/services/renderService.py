@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Dict, List
+import cv2
+import numpy as np
+from config.config import Config
+from services.imageDecodeService import decode_downscaled
+from services.imageStoreService import image_store, PUBLIC_URL_PREFIX
+from services.uploadQueueService import upload_queue
+from repositories.neuralNetworkRepository import get_image_id_by_path
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_PROCESSED_NAME = re.compile(r'^rendered/[0-9a-fA-F]{2}/processed_([0-9a-fA-F-]{36})\.jpg$')
+
+# Paleta fixa por classe (BGR), no estilo das cores usadas pelo ultralytics
+_PALETTE = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+    (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+    (255, 56, 132), (133, 0, 82), (255, 56, 203), (200, 149, 255), (199, 55, 255)
+]
+
+
+def _pending_paths(image_uuid: str) -> Dict[str, str]:
+    base = os.path.join(Config.RENDER_PENDING_FOLDER, image_uuid)
+    return {'original': f"{base}.orig", 'detections': f"{base}.json"}
+
+def _rendered_path(image_uuid: str) -> str:
+    # Fragmentado pelo início do UUID, como o armazenamento endereçado por conteúdo
+    return f"rendered/{image_uuid[:2].lower()}/processed_{image_uuid}.jpg"
+
+def render_detections(image: np.ndarray, detected_objects: List[Dict]) -> np.ndarray:
+    """Desenha caixas e rótulos (classe e confiança) sobre uma cópia da imagem"""
+    canvas = image.copy()
+    thickness = max(1, round(sum(canvas.shape[:2]) / 2 * 0.003))
+    font_scale = thickness / 3
+    for obj in detected_objects:
+        x1, y1, x2, y2 = (int(round(v)) for v in obj['bbox'])
+        color = _PALETTE[obj['class_id'] % len(_PALETTE)]
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), color, thickness, cv2.LINE_AA)
+
+        label = f"{obj['class_name']} {obj['confidence']:.2f}"
+        (text_w, text_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, max(1, thickness - 1))
+        top = y1 - text_h - baseline if y1 - text_h - baseline >= 0 else y1
+        cv2.rectangle(canvas, (x1, top), (x1 + text_w, top + text_h + baseline), color, -1, cv2.LINE_AA)
+        cv2.putText(canvas, label, (x1, top + text_h), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                    (255, 255, 255), max(1, thickness - 1), cv2.LINE_AA)
+    return canvas
+
+def store_pending_render(image_uuid: str, image_bytes: bytes, detected_objects: List[Dict]) -> str:
+    """
+    Guarda o original e as detecções (coordenadas da imagem original) para que a
+    imagem anotada seja desenhada só no primeiro GET. Retorna a URL pública.
+    """
+    os.makedirs(Config.RENDER_PENDING_FOLDER, exist_ok=True)
+    paths = _pending_paths(image_uuid)
+    with open(paths['original'], 'wb') as f:
+        f.write(image_bytes)
+    # O sidecar é gravado por último: sua presença indica uma renderização pendente completa
+    partial_path = f"{paths['detections']}.part"
+    with open(partial_path, 'w') as f:
+        json.dump(detected_objects, f)
+    os.replace(partial_path, paths['detections'])
+    return f"{PUBLIC_URL_PREFIX}{_rendered_path(image_uuid)}"
+
+def has_pending_render(url: str) -> bool:
+    """Se a URL é de uma imagem anotada que ainda aguarda a renderização preguiçosa"""
+    match = _PROCESSED_NAME.match(url.split('?', 1)[0][len(PUBLIC_URL_PREFIX):]) \
+        if url.startswith(PUBLIC_URL_PREFIX) else None
+    return bool(match) and os.path.exists(_pending_paths(match.group(1))['detections'])
+
+def render_pending(filename: str) -> bool:
+    """
+    Renderiza sob demanda a imagem anotada `filename` (caminho relativo a
+    uploads/public), se houver uma renderização
+    pendente para ela. O resultado é gravado em uploads/public e reaproveitado
+    nos GETs seguintes; o upload ao Imgur é agendado como no modo render=true.
+    Retorna True se o arquivo passou a existir.
+    """
+    match = _PROCESSED_NAME.match(filename)
+    if not match:
+        return False
+
+    paths = _pending_paths(match.group(1))
+    try:
+        with open(paths['detections']) as f:
+            detected_objects = json.load(f)
+        with open(paths['original'], 'rb') as f:
+            image_bytes = f.read()
+    except FileNotFoundError:
+        return False
+
+    image, (width, height) = decode_downscaled(image_bytes)
+    scale_x, scale_y = image.shape[1] / width, image.shape[0] / height
+    scaled = [
+        {**obj, 'bbox': [obj['bbox'][0] * scale_x, obj['bbox'][1] * scale_y,
+                         obj['bbox'][2] * scale_x, obj['bbox'][3] * scale_y]}
+        for obj in detected_objects
+    ]
+
+    success, encoded = cv2.imencode('.jpg', render_detections(image, scaled))
+    if not success:
+        raise ValueError("Falha ao codificar a imagem renderizada")
+
+    output_path = image_store.path_for_url(filename)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    partial_path = f"{output_path}.{os.getpid()}.part"
+    with open(partial_path, 'wb') as f:
+        f.write(encoded.tobytes())
+    os.replace(partial_path, output_path)
+
+    try:
+        # Quem remove o sidecar é o único a agendar o upload (GETs concorrentes renderizam juntos)
+        os.remove(paths['detections'])
+    except FileNotFoundError:
+        return True
+    try:
+        os.remove(paths['original'])
+    except OSError:
+        pass
+    logger.info(f"Imagem anotada {filename} renderizada sob demanda")
+    _enqueue_upload(PUBLIC_URL_PREFIX + filename, match.group(1))
+    return True
+
+def _enqueue_upload(image_url: str, image_uuid: str) -> None:
+    """Agenda o upload remoto da imagem recém-renderizada, como no modo render=true"""
+    from flask import current_app
+    try:
+        image_id = get_image_id_by_path(image_url)
+        if image_id is None:
+            return
+        upload_queue.enqueue(current_app._get_current_object(), image_id, image_uuid, image_url)
+    except Exception as e:
+        # A imagem continua disponível localmente mesmo sem o upload remoto
+        logger.error(f"Falha ao agendar upload da imagem {image_uuid}: {str(e)}")
+
+def purge_expired_pending(max_age_seconds: float) -> int:
+    """
+    Remove renderizações pendentes (original + detecções) mais antigas que
+    `max_age_seconds`, cuja URL nunca foi acessada. Retorna quantas foram removidas.
+    """
+    cutoff = time.time() - max_age_seconds
+    purged = set()
+    try:
+        entries = os.scandir(Config.RENDER_PENDING_FOLDER)
+    except FileNotFoundError:
+        return 0
+    with entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                if entry.stat().st_mtime > cutoff:
+                    continue
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            purged.add(entry.name.split('.', 1)[0])
+    if purged:
+        logger.info(f"{len(purged)} renderização(ões) pendente(s) expirada(s) removida(s)")
+    return len(purged)
+
+class _PendingPurger:
+    """Thread de expiração das renderizações pendentes, uma por processo (após o fork)"""
+
+    def __init__(self, max_age_seconds: float, interval_seconds: float):
+        self.max_age_seconds = max_age_seconds
+        self.interval_seconds = interval_seconds
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                purge_expired_pending(self.max_age_seconds)
+            except Exception as e:
+                logger.error(f"Erro ao expirar renderizações pendentes: {str(e)}", exc_info=True)
+            time.sleep(self.interval_seconds)
+
+    def ensure_started(self) -> None:
+        if self.max_age_seconds <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._loop, name='render-pending-purge', daemon=True).start()
+
+
+# Instância global
+pending_purger = _PendingPurger(Config.RENDER_PENDING_MAX_AGE_SECONDS, Config.RENDER_PENDING_PURGE_INTERVAL_SECONDS)
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from config.config import Config
+from repositories.detectionCacheRepository import (
+    get_cache_entry, increment_cache_hits, save_cache_entry
+)
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def compute_content_hash(image_bytes: bytes) -> str:
+    """Hash SHA-256 dos bytes enviados, usado como chave de conteúdo"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class DetectionResultCache:
+    """
+    Cache de resultados de detecção endereçado por conteúdo.
+    Camada 1: LRU limitado em memória. Camada 2: tabela DetectionCache no banco.
+    """
+
+    def __init__(self, max_entries: int = 1024, enabled: bool = True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'persistent_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'errors': 0
+        }
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _remember(self, key: tuple, value: Dict) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def get(self, content_hash: str, model_version: str) -> Optional[Dict]:
+        """Retorna o resultado em cache (detecções, URL e métricas) ou None"""
+        if not self.enabled:
+            return None
+
+        key = (content_hash, model_version)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return value
+
+        try:
+            entry = get_cache_entry(content_hash, model_version)
+        except Exception as e:
+            logger.error(f"Falha ao consultar cache persistente: {str(e)}")
+            self._count('errors')
+            entry = None
+
+        if entry is None:
+            self._count('misses')
+            return None
+
+        value = {
+            'objects': json.loads(entry.DetectionsJson),
+            'image_url': entry.ProcessedImagePath,
+            'accuracy': entry.Accuracy,
+            'inference_time': entry.InferenceTimeMs,
+            'total_time': entry.TotalTimeMs,
+            'image_size': (entry.ImageWidth, entry.ImageHeight) if entry.ImageWidth else None,
+            'processed_size': (entry.ProcessedWidth, entry.ProcessedHeight) if entry.ProcessedWidth else None
+        }
+        try:
+            increment_cache_hits(entry.CacheID)
+        except Exception as e:
+            logger.warning(f"Falha ao atualizar contador do cache: {str(e)}")
+
+        self._remember(key, value)
+        self._count('persistent_hits')
+        return value
+
+    def put(self, content_hash: str, model_version: str, result_id: int,
+            objects: List[Dict], image_url: str, accuracy: float,
+            inference_time: float, total_time: float,
+            image_size: Optional[Tuple[int, int]] = None,
+            processed_size: Optional[Tuple[int, int]] = None) -> None:
+        """Armazena um resultado nas duas camadas do cache"""
+        if not self.enabled:
+            return
+
+        value = {
+            'objects': objects,
+            'image_url': image_url,
+            'accuracy': accuracy,
+            'inference_time': inference_time,
+            'total_time': total_time,
+            'image_size': image_size,
+            'processed_size': processed_size
+        }
+        self._remember((content_hash, model_version), value)
+
+        try:
+            save_cache_entry(
+                content_hash=content_hash,
+                model_version=model_version,
+                result_id=result_id,
+                detections=objects,
+                processed_image_path=image_url,
+                accuracy=accuracy,
+                inference_time=inference_time,
+                total_time=total_time,
+                image_size=image_size,
+                processed_size=processed_size
+            )
+            self._count('stores')
+        except Exception as e:
+            # O cache nunca deve derrubar a análise
+            logger.error(f"Falha ao gravar cache persistente: {str(e)}")
+            self._count('errors')
+
+    def replace_url(self, old_url: str, new_url: str) -> None:
+        """Atualiza entradas em memória cuja imagem processada mudou de endereço"""
+        with self._lock:
+            for value in self._entries.values():
+                if value['image_url'] == old_url:
+                    value['image_url'] = new_url
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        hits = counters['memory_hits'] + counters['persistent_hits']
+        lookups = hits + counters['misses']
+        counters.update({
+            'enabled': self.enabled,
+            'hits': hits,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'memory_entries': size,
+            'memory_max_entries': self.max_entries
+        })
+        return counters
+
+
+# Instância global
+result_cache = DetectionResultCache(
+    max_entries=Config.RESULT_CACHE_MAX_ENTRIES,
+    enabled=Config.RESULT_CACHE_ENABLED
+)
+
+def get_cache_stats() -> Dict:
+    """Contadores de acerto/erro do cache de resultados"""
+    return result_cache.stats()
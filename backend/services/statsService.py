@@ -0,0 +1,69 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from config.config import Config
+from repositories.statsRepository import get_daily_stats, get_class_stats
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _average(total: float, count: int) -> Optional[float]:
+    return round(total / count, 4) if count else None
+
+def get_dashboard_stats(user_id: int, date_from: date = None, date_to: date = None) -> Dict:
+    """
+    Números do dashboard a partir das tabelas de resumo: o custo depende
+    apenas do número de dias (e classes) do intervalo, não do histórico.
+    Sem datas, usa os últimos STATS_DEFAULT_DAYS dias (UTC).
+    """
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=Config.STATS_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        raise ValueError("from deve ser anterior ou igual a to")
+    if (date_to - date_from).days >= Config.STATS_MAX_DAYS:
+        raise ValueError(f"O intervalo máximo é de {Config.STATS_MAX_DAYS} dias")
+
+    totals = {'analyses': 0, 'objects': 0, 'confidence_sum': 0.0, 'inference_sum': 0.0,
+              'inference_count': 0, 'total_sum': 0.0, 'total_count': 0}
+    daily = []
+    for row in get_daily_stats(user_id, date_from, date_to):
+        totals['analyses'] += row.Analyses
+        totals['objects'] += row.Objects
+        totals['confidence_sum'] += row.ConfidenceSum
+        totals['inference_sum'] += row.InferenceTimeSumMs
+        totals['inference_count'] += row.InferenceTimeCount
+        totals['total_sum'] += row.TotalTimeSumMs
+        totals['total_count'] += row.TotalTimeCount
+        daily.append({
+            'day': row.Day.isoformat(),
+            'analyses': row.Analyses,
+            'objects': row.Objects,
+            'avg_confidence': _average(row.ConfidenceSum, row.Objects),
+            'avg_inference_time_ms': _average(row.InferenceTimeSumMs, row.InferenceTimeCount),
+            'avg_total_time_ms': _average(row.TotalTimeSumMs, row.TotalTimeCount)
+        })
+
+    classes = [
+        {
+            'class_name': class_name,
+            'detections': int(detections),
+            'avg_confidence': _average(confidence_sum, detections)
+        }
+        for class_name, detections, confidence_sum in get_class_stats(user_id, date_from, date_to)
+    ]
+
+    return {
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'totals': {
+            'analyses': totals['analyses'],
+            'objects': totals['objects'],
+            'avg_confidence': _average(totals['confidence_sum'], totals['objects']),
+            'avg_inference_time_ms': _average(totals['inference_sum'], totals['inference_count']),
+            'avg_total_time_ms': _average(totals['total_sum'], totals['total_count'])
+        },
+        'daily': daily,
+        'classes': classes
+    }
@@ -0,0 +1,68 @@
+import time
+import logging
+from typing import Callable, Optional
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class SupervisedProcess:
+    """
+    Processo filho reiniciado com backoff exponencial quando morre. Um processo
+    que vive pelo menos `stable_seconds` zera a contagem; depois de `max_restarts`
+    falhas seguidas (ex.: banco inacessível, pesos ausentes) desiste de vez,
+    em vez de subir um processo novo (que carrega o modelo) a cada verificação.
+    """
+
+    def __init__(self, name: str, start: Callable[[], object], is_alive: Callable[[object], bool],
+                 max_restarts: int = 5, backoff_base_seconds: float = 1,
+                 backoff_max_seconds: float = 300, stable_seconds: float = 60):
+        self.name = name
+        self._start = start
+        self._is_alive = is_alive
+        self.max_restarts = max_restarts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.stable_seconds = stable_seconds
+        self.process = None
+        self.failures = 0
+        self.gave_up = False
+        self._started_at = 0.0
+        self._restart_at: Optional[float] = None
+
+    def _launch(self) -> None:
+        self.process = self._start()
+        self._started_at = time.monotonic()
+        self._restart_at = None
+
+    def check(self) -> bool:
+        """Inicia ou reinicia o processo se for a hora; retorna se ele está vivo"""
+        if self.gave_up:
+            return False
+        if self.process is None:
+            self._launch()
+            return True
+        if self._is_alive(self.process):
+            return True
+
+        now = time.monotonic()
+        if self._restart_at is None:
+            if now - self._started_at >= self.stable_seconds:
+                self.failures = 0
+            self.failures += 1
+            if self.failures > self.max_restarts:
+                self.gave_up = True
+                logger.error(f"{self.name} morreu {self.failures} vez(es) seguidas; reinício automático desativado")
+                return False
+            delay = min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (self.failures - 1))
+            self._restart_at = now + delay
+            logger.warning(f"{self.name} morreu; nova tentativa em {delay:.0f}s "
+                           f"({self.failures}/{self.max_restarts})")
+            return False
+
+        if now >= self._restart_at:
+            self._launch()
+            logger.info(f"{self.name} reiniciado")
+            return True
+        return False
@@ -0,0 +1,122 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional
+from config.config import Config
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class TokenBlocklist:
+    """
+    Lista de tokens JWT revogados (jti -> exp). A verificação de cada requisição
+    é um acesso a dict em memória; um arquivo SQLite compartilhado pelos workers
+    da máquina propaga as revogações, lido de forma incremental no máximo a cada
+    `sync_seconds`. As entradas deixam de valer (e são apagadas) quando o token expira.
+    """
+
+    def __init__(self, db_path: str, sync_seconds: float = 1.0, purge_seconds: float = 300.0):
+        self.db_path = db_path
+        self.sync_seconds = sync_seconds
+        self.purge_seconds = purge_seconds
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._last_id = 0
+        self._next_sync = 0.0
+        self._next_purge = 0.0
+        self._counters = {'checks': 0, 'revoked_hits': 0, 'syncs': 0, 'errors': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Uma conexão por processo (gunicorn faz fork depois do --preload)
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS revoked_tokens ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "jti TEXT NOT NULL UNIQUE, "
+                "expires_at REAL NOT NULL)")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires ON revoked_tokens (expires_at)")
+            self._connection, self._pid = connection, os.getpid()
+            self._revoked, self._last_id, self._next_sync = {}, 0, 0.0
+        return self._connection
+
+    def _sync(self, now: float) -> None:
+        """Traz as revogações feitas por outros workers desde a última leitura"""
+        connection = self._connect()
+        rows = connection.execute(
+            "SELECT id, jti, expires_at FROM revoked_tokens WHERE id > ? AND expires_at > ? ORDER BY id",
+            (self._last_id, now)).fetchall()
+        for row_id, jti, expires_at in rows:
+            self._revoked[jti] = expires_at
+            self._last_id = row_id
+        self._counters['syncs'] += 1
+
+        if now >= self._next_purge:
+            connection.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            self._next_purge = now + self.purge_seconds
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        """Revoga um token até o seu exp (epoch em segundos)"""
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+                (jti, expires_at))
+            # Vale imediatamente neste worker; os demais a leem na próxima sincronização
+            self._revoked[jti] = expires_at
+        logger.info(f"Token {jti} revogado")
+
+    def is_revoked(self, jti: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._counters['checks'] += 1
+            if self._pid != os.getpid() or now >= self._next_sync:
+                try:
+                    self._sync(now)
+                except sqlite3.Error as e:
+                    # Sem o arquivo compartilhado continua valendo o que já está em memória
+                    logger.error(f"Falha ao sincronizar a lista de tokens revogados: {str(e)}")
+                    self._counters['errors'] += 1
+                self._next_sync = now + self.sync_seconds
+
+            expires_at = self._revoked.get(jti)
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                del self._revoked[jti]
+                return False
+            self._counters['revoked_hits'] += 1
+            return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._counters, entries=len(self._revoked))
+
+
+# Instância global
+token_blocklist = TokenBlocklist(
+    Config.JWT_BLOCKLIST_DB_PATH,
+    sync_seconds=Config.JWT_BLOCKLIST_SYNC_SECONDS
+)
+
+def revoke_token(jwt_payload: Dict) -> None:
+    """Revoga o token descrito pelo payload (jti e exp)"""
+    token_blocklist.revoke(jwt_payload['jti'], float(jwt_payload.get('exp') or time.time() + 86400))
+
+def is_token_revoked(jwt_payload: Dict) -> bool:
+    return token_blocklist.is_revoked(jwt_payload['jti'])
+
+def get_blocklist_stats() -> Dict:
+    return token_blocklist.stats()
@@ -0,0 +1,199 @@
+import os
+import logging
+import threading
+from typing import Dict, Optional
+import requests
+from config.config import Config
+from services.imageStoreService import image_store
+from repositories.uploadTaskRepository import (
+    create_upload_task, claim_next_task, complete_task,
+    reschedule_task, fail_task, count_tasks_by_status
+)
+
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    """Falha de upload; `retryable` indica se vale a pena tentar novamente"""
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class ImgurUploader:
+    """Cliente HTTP mínimo da API de imagens do Imgur (URL base configurável)"""
+
+    def __init__(self, api_url: str, client_id: str, timeout: float = 30):
+        self.api_url = api_url.rstrip('/')
+        self.client_id = client_id
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def upload(self, image_data: bytes, image_uuid: str) -> str:
+        """Envia a imagem e retorna o link público"""
+        try:
+            response = self.session.post(
+                f"{self.api_url}/3/image",
+                headers={'Authorization': f"Client-ID {self.client_id}"},
+                files={'image': (f"{image_uuid}.jpg", image_data, 'image/jpeg')},
+                data={'type': 'file'},
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise UploadError(f"Erro de conexão com o Imgur: {str(e)}")
+
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            raise UploadError(
+                "Limite de taxa do Imgur atingido",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        if response.status_code >= 500:
+            raise UploadError(f"Imgur indisponível (HTTP {response.status_code})")
+        if response.status_code >= 400:
+            raise UploadError(f"Upload rejeitado pelo Imgur (HTTP {response.status_code})", retryable=False)
+
+        try:
+            link = response.json()['data']['link']
+        except (ValueError, KeyError, TypeError):
+            raise UploadError("Resposta inválida do Imgur")
+        return f"{link}?uuid={image_uuid}"
+
+
+class UploadQueue:
+    """
+    Fila persistente de uploads (tabela UploadTasks) consumida por um pool
+    de threads em segundo plano. A requisição responde com a URL local e,
+    quando o upload termina, as URLs gravadas são trocadas pela remota.
+    """
+
+    def __init__(self, uploader: ImgurUploader, workers: int = 2, max_attempts: int = 8,
+                 retry_base_seconds: float = 5, poll_interval: float = 2, lease_seconds: int = 300):
+        self.uploader = uploader
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._app = None
+        self._pid = None
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._counters = {'uploaded': 0, 'retried': 0, 'failed': 0}
+
+    def ensure_started(self, app) -> None:
+        """
+        Inicia os workers no processo atual. Threads não sobrevivem ao fork do
+        gunicorn (--preload), por isso o PID é verificado a cada chamada.
+        """
+        if self.workers <= 0 or (self._pid == os.getpid() and self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._threads:
+                return
+            self._app = app
+            self._pid = os.getpid()
+            self._threads = []
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"upload-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Fila de uploads iniciada com {self.workers} worker(s)")
+
+    def enqueue(self, app, image_id: int, image_uuid: str, local_path: str) -> int:
+        """Registra o upload de forma persistente e acorda os workers"""
+        task_id = create_upload_task(image_id, image_uuid, local_path)
+        self.ensure_started(app)
+        self._wakeup.set()
+        return task_id
+
+    @staticmethod
+    def _local_file(local_path: str) -> str:
+        return image_store.path_for_url(local_path)
+
+    def _retry_delay(self, attempts: int, error: UploadError) -> float:
+        if error.retry_after:
+            return error.retry_after
+        return min(3600, self.retry_base_seconds * (2 ** max(0, attempts - 1)))
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _process(self, task) -> None:
+        try:
+            with open(self._local_file(task.LocalPath), 'rb') as f:
+                image_data = f.read()
+        except OSError as e:
+            fail_task(task.TaskID, f"Arquivo local indisponível: {str(e)}")
+            self._count('failed')
+            return
+
+        try:
+            remote_url = self.uploader.upload(image_data, task.ImageUUID)
+        except UploadError as e:
+            if not e.retryable or task.Attempts >= self.max_attempts:
+                logger.error(f"Upload {task.TaskID} falhou definitivamente: {str(e)}")
+                fail_task(task.TaskID, str(e))
+                self._count('failed')
+                return
+            delay = self._retry_delay(task.Attempts, e)
+            logger.warning(f"Upload {task.TaskID} reagendado em {delay:.0f}s: {str(e)}")
+            reschedule_task(task.TaskID, str(e), delay)
+            self._count('retried')
+            return
+
+        complete_task(task.TaskID, remote_url)
+        self._count('uploaded')
+        logger.info(f"Upload {task.TaskID} concluído: {remote_url}")
+
+        # Evita que o cache em memória continue apontando para a URL local
+        from services.resultCacheService import result_cache
+        result_cache.replace_url(task.LocalPath, remote_url)
+
+    def _worker_loop(self) -> None:
+        from extensions import db
+
+        while True:
+            try:
+                with self._app.app_context():
+                    task = claim_next_task(self.lease_seconds)
+                    if task is not None:
+                        self._process(task)
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Erro no worker de upload: {str(e)}", exc_info=True)
+                task = None
+
+            if task is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+        stats['workers'] = self.workers
+        try:
+            stats['tasks'] = count_tasks_by_status()
+        except Exception as e:
+            stats['tasks'] = f"indisponível: {str(e)}"
+        return stats
+
+
+# Instância global
+upload_queue = UploadQueue(
+    ImgurUploader(Config.IMGUR_API_URL, Config.IMGUR_CLIENT_ID, timeout=Config.UPLOAD_REQUEST_TIMEOUT),
+    workers=Config.UPLOAD_WORKERS,
+    max_attempts=Config.UPLOAD_MAX_ATTEMPTS,
+    retry_base_seconds=Config.UPLOAD_RETRY_BASE_SECONDS,
+    poll_interval=Config.UPLOAD_POLL_INTERVAL_SECONDS
+)
+
+def get_upload_stats() -> Dict:
+    """Contadores da fila de uploads"""
+    return upload_queue.stats()
@@ -4,9 +4,11 @@ from models.userModel import User
 from schemas.UserRegistrationSchema import UserRegistrationSchema
 from schemas.userLoginSchema import UserLoginSchema
 from repositories.userRepository import create_user, get_user_by_email
+from services.tokenBlocklistService import revoke_token
 from flask_jwt_extended import (
     create_access_token,
-    create_refresh_token  
+    create_refresh_token,
+    decode_token
 )
 
 def validate_registration_data(data):
@@ -65,4 +67,23 @@ def login_user(email, password):
     except ValidationError as e:
         raise e
     except Exception as e:
-        raise Exception(f"Erro durante o login: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Erro durante o login: {str(e)}")
+
+def logout_user(jwt_payload, refresh_token=None):
+    """
+    Revoga o token de acesso da requisição e, se enviado, o refresh token
+    do mesmo usuário, até o fim da validade de cada um. O refresh token é
+    validado antes: se for inválido, nenhum token é revogado.
+    """
+    refresh_payload = None
+    if refresh_token:
+        try:
+            refresh_payload = decode_token(refresh_token)
+        except Exception:
+            raise ValidationError({"refresh_token": ["Refresh token inválido"]})
+        if refresh_payload.get('type') != 'refresh' or refresh_payload.get('sub') != jwt_payload.get('sub'):
+            raise ValidationError({"refresh_token": ["Refresh token inválido"]})
+
+    revoke_token(jwt_payload)
+    if refresh_payload is not None:
+        revoke_token(refresh_payload)
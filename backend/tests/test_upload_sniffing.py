@@ -0,0 +1,89 @@
+import io
+import struct
+import zlib
+import pytest
+from schemas.fileSchema import ImageSniffingStream, UploadRejected
+from services.imageDecodeService import probe_image_size
+
+MAX_PIXELS = 40_000_000
+SNIFF_BYTES = 256 * 1024
+
+
+def png_bytes(width: int, height: int) -> bytes:
+    """Assinatura + IHDR válidos (os pixels não importam para a inspeção)"""
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    chunk = b'IHDR' + ihdr
+    return (b'\x89PNG\r\n\x1a\n' + struct.pack('>I', len(ihdr)) + chunk
+            + struct.pack('>I', zlib.crc32(chunk)) + b'\x00' * 64)
+
+def jpeg_bytes(width: int, height: int, app1_size: int = 0) -> bytes:
+    """SOI, um APP1 (EXIF) opcional de `app1_size` bytes e o SOF0 com as dimensões"""
+    data = b'\xff\xd8'
+    if app1_size:
+        data += b'\xff\xe1' + struct.pack('>H', app1_size + 2) + b'E' * app1_size
+    sof = struct.pack('>BHHB', 8, height, width, 3) + b'\x01\x22\x00' * 3
+    data += b'\xff\xc0' + struct.pack('>H', len(sof) + 2) + sof
+    return data + b'\x00' * 64
+
+def stream_upload(data: bytes, filename: str = 'foto.jpg', chunk_size: int = 4096,
+                  fail_fast: bool = True, sniff_bytes: int = SNIFF_BYTES) -> ImageSniffingStream:
+    """Simula o Werkzeug: escreve em pedaços e volta ao início no fim do arquivo"""
+    stream = ImageSniffingStream(io.BytesIO(), filename, MAX_PIXELS, sniff_bytes, fail_fast=fail_fast)
+    for offset in range(0, len(data), chunk_size):
+        stream.write(data[offset:offset + chunk_size])
+    stream.seek(0)
+    return stream
+
+
+def test_probe_png_size():
+    assert probe_image_size(png_bytes(640, 480)) == (640, 480)
+
+def test_probe_jpeg_size_after_large_app1_segment():
+    assert probe_image_size(jpeg_bytes(1920, 1080, app1_size=60_000)) == (1920, 1080)
+
+def test_probe_truncated_and_unknown_inputs():
+    assert probe_image_size(jpeg_bytes(1920, 1080, app1_size=60_000)[:30_000]) is None
+    assert probe_image_size(b'\x89PNG\r\n\x1a\n') is None
+    assert probe_image_size(b'GIF89a' + b'\x00' * 32) is None
+
+def test_png_upload_is_accepted():
+    data = png_bytes(800, 600)
+    stream = stream_upload(data, 'foto.png')
+    assert stream.dimensions == (800, 600)
+    assert stream.rejection is None
+    assert stream.read() == data
+
+def test_jpeg_with_large_app1_split_across_chunks_is_accepted():
+    stream = stream_upload(jpeg_bytes(1920, 1080, app1_size=60_000), chunk_size=1000)
+    assert stream.dimensions == (1920, 1080)
+
+def test_jpeg_whose_header_exceeds_sniff_limit_is_rejected():
+    with pytest.raises(UploadRejected):
+        stream_upload(jpeg_bytes(1920, 1080, app1_size=60_000), sniff_bytes=16 * 1024)
+
+def test_truncated_jpeg_is_rejected():
+    with pytest.raises(UploadRejected):
+        stream_upload(jpeg_bytes(1920, 1080, app1_size=60_000)[:30_000])
+
+def test_truncated_png_is_rejected():
+    with pytest.raises(UploadRejected):
+        stream_upload(b'\x89PNG\r\n\x1a\n\x00\x00', 'foto.png')
+
+def test_non_image_is_rejected():
+    with pytest.raises(UploadRejected):
+        stream_upload(b'GIF89a' + b'\x00' * 1024, 'foto.png')
+
+def test_empty_file_is_rejected():
+    with pytest.raises(UploadRejected):
+        stream_upload(b'')
+
+def test_image_over_pixel_limit_is_rejected():
+    with pytest.raises(UploadRejected):
+        stream_upload(png_bytes(10_000, 10_000), 'foto.png')
+
+def test_batch_mode_records_rejection_and_keeps_the_content():
+    data = b'GIF89a' + b'\x00' * 1024
+    stream = stream_upload(data, 'foto.png', fail_fast=False)
+    assert stream.rejection
+    assert stream.dimensions is None
+    assert stream.read() == data